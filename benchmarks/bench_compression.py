@@ -0,0 +1,84 @@
+"""Measure bandwidth and CPU per request for compressed `GET /snippets` responses.
+
+Each coding is timed with an empty compressed-bytes cache (every request
+compresses) and with a warm cache (the unchanged listing is served from it).
+Bytes are counted as sent on the wire, before the client decodes them.
+
+Run with `make bench` or `PYTHONPATH=. uv run python benchmarks/bench_compression.py`.
+"""
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+from sqlmodel import Session, create_engine
+
+from benchmarks.corpus import make_snippets
+from src.snipster.api import app, get_repo
+from src.snipster.middleware import CompressionMiddleware
+from src.snipster.models import SQLModel
+from src.snipster.repo import DBSnippetRepository
+
+
+def find_middleware(client: TestClient) -> CompressionMiddleware:
+    client.get("/")  # builds the middleware stack
+    layer = client.app.middleware_stack
+    while not isinstance(layer, CompressionMiddleware):
+        layer = layer.app
+    return layer
+
+
+def fetch(client: TestClient, encoding: str) -> int:
+    headers = {"Accept-Encoding": encoding}
+    with client.stream("GET", "/snippets", headers=headers) as response:
+        return sum(len(chunk) for chunk in response.iter_raw())
+
+
+def cpu_per_request(
+    client: TestClient,
+    middleware: CompressionMiddleware,
+    encoding: str,
+    warm: bool,
+    requests: int,
+) -> float:
+    fetch(client, encoding)
+    start = time.process_time()
+    for _ in range(requests):
+        if not warm:
+            middleware.cache.clear()
+        fetch(client, encoding)
+    return (time.process_time() - start) / requests
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--count", type=int, default=2_000)
+    parser.add_argument("--requests", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        engine = create_engine(f"sqlite:///{Path(tmp_dir) / 'bench.sqlite'}")
+        SQLModel.metadata.create_all(engine)
+        with Session(engine) as session:
+            session.add_all(make_snippets(args.count))
+            session.commit()
+
+        app.dependency_overrides[get_repo] = lambda: DBSnippetRepository(engine)
+        client = TestClient(app)
+        middleware = find_middleware(client)
+
+        print(f"GET /snippets with {args.count} snippets\n")
+        print(f"{'coding':<10} {'bytes':>12} {'cold cpu':>10} {'warm cpu':>10}")
+        for encoding in ("identity", *middleware.compressors):
+            size = fetch(client, encoding)
+            cold = cpu_per_request(client, middleware, encoding, False, args.requests)
+            warm = cpu_per_request(client, middleware, encoding, True, args.requests)
+            cold_ms, warm_ms = cold * 1000, warm * 1000
+            print(f"{encoding:<10} {size:>12,} {cold_ms:>8.1f}ms {warm_ms:>8.1f}ms")
+        app.dependency_overrides.clear()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Compare concurrent read and write throughput of a default SQLite engine and
+one from `create_db_engine`, with WAL and the other tuned pragmas.
+
+Reader threads fetch snippets and run searches while writer threads toggle
+favorites, all for a fixed time, on a file database.
+
+Run with `make bench` or `PYTHONPATH=. uv run python benchmarks/bench_engine.py`.
+"""
+
+import argparse
+import random
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from sqlmodel import Session, SQLModel, create_engine
+
+from benchmarks.corpus import make_snippets
+from src.snipster.db import create_db_engine
+from src.snipster.repo import DBSnippetRepository
+
+
+def run(engine, count: int, readers: int, writers: int, seconds: float) -> tuple:
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.add_all(make_snippets(count))
+        session.commit()
+    repo = DBSnippetRepository(engine)
+    stop = threading.Event()
+    reads, writes, errors = [0] * readers, [0] * writers, []
+
+    def read(i: int) -> None:
+        rng = random.Random(i)
+        while not stop.is_set():
+            try:
+                repo.get(rng.randint(1, count))
+                repo.search("cache", limit=20)
+                reads[i] += 2
+            except Exception as e:
+                errors.append(e)
+
+    def write(i: int) -> None:
+        rng = random.Random(-i)
+        while not stop.is_set():
+            try:
+                repo.toggle_favorite(rng.randint(1, count))
+                writes[i] += 1
+            except Exception as e:
+                errors.append(e)
+
+    threads = [threading.Thread(target=read, args=(i,)) for i in range(readers)]
+    threads += [threading.Thread(target=write, args=(i,)) for i in range(writers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    engine.dispose()
+    return sum(reads) / seconds, sum(writes) / seconds, len(errors)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--count", type=int, default=5_000)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--writers", type=int, default=2)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    args = parser.parse_args()
+
+    print(
+        f"{args.count} snippets, {args.readers} readers, {args.writers} writers, "
+        f"{args.seconds:g}s each\n"
+    )
+    print(f"{'engine':<10} {'reads':>10} {'writes':>10} {'errors':>8}")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        engines = {
+            "default": lambda url: create_engine(url),
+            "tuned": lambda url: create_db_engine(url),
+        }
+        for name, make_engine in engines.items():
+            engine = make_engine(f"sqlite:///{Path(tmp_dir) / f'{name}.sqlite'}")
+            reads, writes, errors = run(
+                engine, args.count, args.readers, args.writers, args.seconds
+            )
+            print(f"{name:<10} {reads:>8.0f}/s {writes:>8.0f}/s {errors:>8}")
+
+
+if __name__ == "__main__":
+    main()
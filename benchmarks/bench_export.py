@@ -0,0 +1,73 @@
+"""Compare the `/snippets` JSON listing with columnar exports.
+
+Reports output size, time and peak traced memory of listing every snippet as
+JSON, and of streaming them in batches to Parquet and Arrow. Needs pyarrow.
+
+Run with `make bench` or `PYTHONPATH=. uv run python benchmarks/bench_export.py`.
+"""
+
+import argparse
+import io
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable
+
+from sqlmodel import Session, create_engine
+
+from benchmarks.corpus import make_snippets
+from src.snipster.export import ExportFormat, export_snippets
+from src.snipster.models import SQLModel
+from src.snipster.repo import DBSnippetRepository
+from src.snipster.responses import dumps
+
+
+def measure(run: Callable[[], bytes]) -> tuple[int, float, float]:
+    """Return the output size, seconds and peak traced MiB of one run."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    size = len(run())
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return size, elapsed, peak / 1024 / 1024
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--count", type=int, default=10_000)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        engine = create_engine(f"sqlite:///{Path(tmp_dir) / 'bench.sqlite'}")
+        SQLModel.metadata.create_all(engine)
+        with Session(engine) as session:
+            session.add_all(make_snippets(args.count))
+            session.commit()
+        repo = DBSnippetRepository(engine)
+
+        def export(format: ExportFormat) -> Callable[[], bytes]:
+            def run() -> bytes:
+                sink = io.BytesIO()
+                export_snippets(repo, sink, format, args.batch_size)
+                return sink.getvalue()
+
+            return run
+
+        runs = {
+            "json listing": lambda: dumps(repo.list()),
+            "parquet export": export(ExportFormat.PARQUET),
+            "arrow export": export(ExportFormat.ARROW),
+        }
+        print(f"{args.count} snippets, batches of {args.batch_size}\n")
+        print(f"{'output':<16}{'bytes':>12}{'time':>10}{'peak MiB':>10}")
+        for label, run in runs.items():
+            size, elapsed, peak = measure(run)
+            print(f"{label:<16}{size:>12}{elapsed:>9.2f}s{peak:>10.1f}")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Compare typing search terms one keystroke at a time with full searches and
+with an incremental search session, on the database and tiered repositories.
+
+Every prefix of a term is searched in turn for a page of 20, as a search box
+would send them. Broad prefixes fill their page early either way; the session
+pays off on narrow ones, which a full search scans the whole corpus for.
+
+Run with `make bench` or `PYTHONPATH=. uv run python benchmarks/bench_incremental.py`.
+"""
+
+import argparse
+import itertools
+import tempfile
+from pathlib import Path
+
+from sqlmodel import Session, SQLModel, create_engine
+
+from benchmarks.corpus import best_of, make_snippets
+from src.snipster.incremental import SearchSessions
+from src.snipster.repo import (
+    ConsistencyMode,
+    DBSnippetRepository,
+    TieredSnippetRepository,
+)
+
+TERMS = ["window cache 12", "select_user", "parse json"]
+LIMIT = 20
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--count", type=int, default=10_000)
+    args = parser.parse_args()
+
+    session_ids = itertools.count()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        engine = create_engine(f"sqlite:///{Path(tmp_dir) / 'bench.sqlite'}")
+        SQLModel.metadata.create_all(engine)
+        with Session(engine) as session:
+            session.add_all(make_snippets(args.count))
+            session.commit()
+        db_repo = DBSnippetRepository(engine)
+        tiered_repo = TieredSnippetRepository(db_repo, ConsistencyMode.EXCLUSIVE)
+        tiered_repo.warm_up()
+
+        print(f"{args.count} snippets, {LIMIT} results per keystroke\n")
+        print(f"{'repository':<10} {'term':<18} {'full':>10} {'incremental':>12}")
+        for name, repo in {"db": db_repo, "tiered": tiered_repo}.items():
+            sessions = SearchSessions(debounce=0)
+            for term in TERMS:
+                prefixes = [term[:end] for end in range(1, len(term) + 1)]
+
+                def full() -> None:
+                    for prefix in prefixes:
+                        repo.search(prefix, limit=LIMIT)
+
+                def incremental() -> None:
+                    session_id = str(next(session_ids))
+                    for prefix in prefixes:
+                        sessions.search(repo, session_id, prefix, limit=LIMIT)
+
+                full_ms = best_of(full) * 1000
+                incremental_ms = best_of(incremental) * 1000
+                print(
+                    f"{name:<10} {term!r:<18} {full_ms:>8.1f}ms "
+                    f"{incremental_ms:>10.1f}ms"
+                )
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
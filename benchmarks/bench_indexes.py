@@ -0,0 +1,95 @@
+"""Compare tag and language filtered queries with and without the query indexes.
+
+Run with `make bench` or `PYTHONPATH=. uv run python benchmarks/bench_indexes.py`.
+"""
+
+import argparse
+import tempfile
+from pathlib import Path
+
+from sqlalchemy import Engine, text
+from sqlmodel import Session, create_engine, select
+
+from benchmarks.corpus import best_of, make_snippets
+from src.snipster.models import LangEnum, Snippet, SnippetTagLink, SQLModel, Tag
+
+QUERY_INDEXES = [
+    "ix_tag_name",
+    "ix_snippettaglink_tag_id",
+    "ix_snippet_language",
+    "ix_snippet_favorite",
+    "ix_snippet_created_at",
+    "ix_snippet_updated_at",
+]
+
+
+def build_database(path: Path, count: int, with_indexes: bool) -> Engine:
+    engine = create_engine(f"sqlite:///{path}")
+    SQLModel.metadata.create_all(engine)
+    if not with_indexes:
+        with engine.begin() as connection:
+            for index_name in QUERY_INDEXES:
+                connection.execute(text(f"DROP INDEX {index_name}"))
+    with Session(engine) as session:
+        session.add_all(make_snippets(count))
+        session.commit()
+    with engine.begin() as connection:
+        connection.execute(text("ANALYZE"))
+    return engine
+
+
+def queries(tag_name: str) -> dict:
+    tagged_ids = (
+        select(SnippetTagLink.snippet_id)
+        .join(Tag, Tag.id == SnippetTagLink.tag_id)
+        .where(Tag.name == tag_name)
+    )
+    return {
+        "tag via any()": select(Snippet).where(Snippet.tags.any(Tag.name == tag_name)),
+        "tag via IN subquery": select(Snippet).where(Snippet.id.in_(tagged_ids)),
+        "language": select(Snippet).where(Snippet.language == LangEnum.RUST),
+        "favorites": select(Snippet).where(Snippet.favorite),
+    }
+
+
+def query_plan(engine: Engine, query) -> list[str]:
+    compiled = query.compile(engine, compile_kwargs={"literal_binds": True})
+    with engine.connect() as connection:
+        rows = connection.execute(text(f"EXPLAIN QUERY PLAN {compiled}")).all()
+    return [row[-1] for row in rows]
+
+
+def run_query(engine: Engine, query) -> int:
+    with engine.connect() as connection:
+        return len(connection.execute(query).all())
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--count", type=int, default=20_000)
+    parser.add_argument("--tag-count", type=int, default=500)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        engines = {
+            "no indexes": build_database(
+                Path(tmp_dir) / "plain.sqlite", args.count, with_indexes=False
+            ),
+            "indexes": build_database(
+                Path(tmp_dir) / "indexed.sqlite", args.count, with_indexes=True
+            ),
+        }
+        print(f"{args.count} snippets\n")
+        for name, query in queries("tag-7").items():
+            print(f"== {name}")
+            for label, engine in engines.items():
+                seconds = best_of(lambda: run_query(engine, query))
+                rows = run_query(engine, query)
+                print(f"  {label:<11} {seconds * 1000:8.2f} ms  ({rows} rows)")
+                for step in query_plan(engine, query):
+                    print(f"      {step}")
+            print()
+
+
+if __name__ == "__main__":
+    main()
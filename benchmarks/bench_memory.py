@@ -0,0 +1,76 @@
+"""Measure memory per snippet held by `InMemorySnippetRepository`.
+
+Compares the compact record store with keeping full `Snippet` objects in a dict,
+which is how the repository stored snippets before.
+
+Run with `PYTHONPATH=. uv run python benchmarks/bench_memory.py`.
+"""
+
+import argparse
+import gc
+import time
+import tracemalloc
+from typing import Callable
+
+from benchmarks.corpus import make_snippets
+from src.snipster.models import Snippet
+from src.snipster.repo import InMemorySnippetRepository
+
+
+def store_snippet_objects(snippets: list[Snippet]) -> dict[int, Snippet]:
+    store = {}
+    for i, snippet in enumerate(snippets, start=1):
+        snippet.id = i
+        store[snippet.id] = snippet
+    return store
+
+
+def store_records(snippets: list[Snippet]) -> InMemorySnippetRepository:
+    repo = InMemorySnippetRepository()
+    for snippet in snippets:
+        repo.add(snippet)
+    return repo
+
+
+def bytes_per_snippet(build: Callable[[list[Snippet]], object], count: int) -> float:
+    """Return memory retained per snippet once the store is built.
+    Snippets are created while tracing so the baseline counts their full cost,
+    then the caller's list is dropped so only what the store keeps is counted.
+    """
+    gc.collect()
+    tracemalloc.start()
+    snippets = make_snippets(count)
+    store = build(snippets)
+    del snippets
+    gc.collect()
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del store
+    return retained / count
+
+
+def seconds_to_store(build: Callable[[list[Snippet]], object], count: int) -> float:
+    snippets = make_snippets(count)
+    start = time.perf_counter()
+    build(snippets)
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--count", type=int, default=20_000)
+    args = parser.parse_args()
+
+    print(f"{args.count} snippets\n")
+    print(f"{'store':<16} {'bytes/snippet':>14} {'store time':>12}")
+    for label, build in (
+        ("Snippet objects", store_snippet_objects),
+        ("compact records", store_records),
+    ):
+        per_snippet = bytes_per_snippet(build, args.count)
+        elapsed = seconds_to_store(build, args.count)
+        print(f"{label:<16} {per_snippet:>14,.0f} {elapsed:>11.2f}s")
+
+
+if __name__ == "__main__":
+    main()
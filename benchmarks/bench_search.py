@@ -0,0 +1,54 @@
+"""Compare simple, fuzzy and ranked searches on the in-memory repository.
+
+Ranked searches ask for the top 10 results, which lets WAND skip snippets
+that can't make it, and for all results, which scores every match. The first
+ranked search builds the full-text index; its time is reported separately.
+
+Run with `make bench` or `PYTHONPATH=. uv run python benchmarks/bench_search.py`.
+"""
+
+import argparse
+import time
+
+from benchmarks.corpus import best_of, make_snippets
+from src.snipster.repo import InMemorySnippetRepository, SearchMode
+
+TERM = "window cache"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--counts", type=int, nargs="+", default=[1_000, 10_000])
+    parser.add_argument("--max-fuzzy", type=int, default=1_000)
+    args = parser.parse_args()
+
+    print(
+        f"{'snippets':>10} {'simple':>10} {'fuzzy':>10} {'index build':>12} "
+        f"{'ranked top10':>13} {'ranked all':>11}"
+    )
+    for count in args.counts:
+        repo = InMemorySnippetRepository()
+        for snippet in make_snippets(count):
+            repo.add(snippet)
+
+        simple_ms = best_of(lambda: repo.search(TERM)) * 1000
+        if count <= args.max_fuzzy:
+            fuzzy_ms = (
+                f"{best_of(lambda: repo.search(TERM, fuzzy=True), 1) * 1000:.0f}ms"
+            )
+        else:
+            fuzzy_ms = "skipped"
+        start = time.perf_counter()
+        repo.search(TERM, mode=SearchMode.RANKED, limit=10)
+        build_ms = (time.perf_counter() - start) * 1000
+        top_ms = best_of(lambda: repo.search(TERM, mode=SearchMode.RANKED, limit=10))
+        all_ms = best_of(lambda: repo.search(TERM, mode=SearchMode.RANKED))
+
+        print(
+            f"{count:>10} {simple_ms:>8.1f}ms {fuzzy_ms:>10} {build_ms:>10.0f}ms "
+            f"{top_ms * 1000:>11.1f}ms {all_ms * 1000:>9.1f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
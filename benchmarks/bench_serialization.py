@@ -0,0 +1,67 @@
+"""Compare JSON encoding of snippet list responses.
+
+The default FastAPI path validates each row into `SnippetRead`, runs
+`jsonable_encoder` and encodes with `json`. The orjson path encodes the rows
+directly with `snippet_to_dict`.
+
+Run with `make bench` or `PYTHONPATH=. uv run python benchmarks/bench_serialization.py`.
+"""
+
+import argparse
+import json
+import tempfile
+from pathlib import Path
+
+from fastapi.encoders import jsonable_encoder
+from sqlmodel import Session, create_engine
+
+from benchmarks.corpus import best_of, make_snippets
+from src.snipster.models import Snippet, SnippetRead, SQLModel
+from src.snipster.repo import DBSnippetRepository
+from src.snipster.responses import dumps
+
+
+def load_snippets(path: Path, count: int) -> list[Snippet]:
+    engine = create_engine(f"sqlite:///{path}")
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.add_all(make_snippets(count))
+        session.commit()
+    return list(DBSnippetRepository(engine).list())
+
+
+def encode_via_pydantic(snippets: list[Snippet]) -> bytes:
+    validated = [SnippetRead.model_validate(snippet) for snippet in snippets]
+    content = jsonable_encoder(validated)
+    # the same call starlette's JSONResponse.render makes
+    return json.dumps(
+        content, ensure_ascii=False, allow_nan=False, separators=(",", ":")
+    ).encode("utf-8")
+
+
+def encode_via_orjson(snippets: list[Snippet]) -> bytes:
+    return dumps(snippets)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--count", type=int, default=10_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        snippets = load_snippets(Path(tmp_dir) / "bench.sqlite", args.count)
+
+    print(f"{args.count} snippets\n")
+    print(f"{'encoder':<22} {'bytes':>12} {'time':>10} {'MB/s':>10}")
+    for label, encode in (
+        ("SnippetRead + json", encode_via_pydantic),
+        ("orjson direct", encode_via_orjson),
+    ):
+        size = len(encode(snippets))
+        elapsed = best_of(lambda: encode(snippets))
+        rate = size / elapsed / 1_000_000
+        print(f"{label:<22} {size:>12,} {elapsed * 1000:>8.1f}ms {rate:>10,.1f}")
+
+
+if __name__ == "__main__":
+    main()
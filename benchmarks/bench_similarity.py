@@ -0,0 +1,83 @@
+"""Compare near-duplicate detection by pairwise `difflib` and by MinHash LSH.
+
+Every tenth snippet of the corpus gets a copy with one word changed. Pairwise
+matching compares every pair of snippets, so it is only run up to
+`--max-pairwise` snippets; the LSH repositories only compare pairs sharing a
+bucket.
+
+Run with `make bench` or `PYTHONPATH=. uv run python benchmarks/bench_similarity.py`.
+"""
+
+import argparse
+import random
+import tempfile
+from difflib import SequenceMatcher
+from itertools import combinations
+from pathlib import Path
+
+from sqlmodel import Session, create_engine
+
+from benchmarks.corpus import WORDS, best_of, make_snippets
+from src.snipster.models import Snippet, SQLModel
+from src.snipster.repo import DBSnippetRepository, InMemorySnippetRepository
+
+THRESHOLD = 0.8
+
+
+def make_corpus(count: int, seed: int = 7) -> list[Snippet]:
+    rng = random.Random(seed)
+    snippets = make_snippets(count - count // 10)
+    for original in snippets[: count // 10]:
+        words = original.code.split(" ")
+        words[rng.randrange(len(words))] = rng.choice(WORDS)
+        snippets.append(
+            Snippet(
+                title=f"Copy of {original.title}",
+                code=" ".join(words),
+                language=original.language,
+            )
+        )
+    return snippets
+
+
+def pairwise(snippets: list[Snippet]) -> int:
+    return sum(
+        SequenceMatcher(a=a.code, b=b.code).ratio() >= THRESHOLD
+        for a, b in combinations(snippets, 2)
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--counts", type=int, nargs="+", default=[250, 1_000, 5_000])
+    parser.add_argument("--max-pairwise", type=int, default=250)
+    args = parser.parse_args()
+
+    print(f"{'snippets':>10} {'pairwise':>12} {'lsh memory':>12} {'lsh db':>12}")
+    for count in args.counts:
+        snippets = make_corpus(count)
+        memory_repo = InMemorySnippetRepository()
+        for snippet in snippets:
+            memory_repo.add(snippet)
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            engine = create_engine(f"sqlite:///{Path(tmp_dir) / 'bench.sqlite'}")
+            SQLModel.metadata.create_all(engine)
+            with Session(engine) as session:
+                session.add_all(make_corpus(count))
+                session.commit()
+            db_repo = DBSnippetRepository(engine)
+
+            if count <= args.max_pairwise:
+                pairwise_ms = f"{best_of(lambda: pairwise(snippets), 1) * 1000:.0f}ms"
+            else:
+                pairwise_ms = "skipped"
+            memory_ms = best_of(lambda: memory_repo.near_duplicates(THRESHOLD)) * 1000
+            db_ms = best_of(lambda: db_repo.near_duplicates(THRESHOLD)) * 1000
+            engine.dispose()
+
+        print(f"{count:>10} {pairwise_ms:>12} {memory_ms:>10.0f}ms {db_ms:>10.0f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""Compare tier warm-up from the database with loading it from a snapshot.
+
+Run with `make bench` or `PYTHONPATH=. uv run python benchmarks/bench_snapshot.py`.
+"""
+
+import argparse
+import tempfile
+from pathlib import Path
+
+from sqlmodel import Session, create_engine
+
+from benchmarks.corpus import best_of, make_snippets
+from src.snipster.models import SQLModel
+from src.snipster.repo import DBSnippetRepository, TieredSnippetRepository
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--count", type=int, default=10_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        engine = create_engine(f"sqlite:///{Path(tmp_dir) / 'bench.sqlite'}")
+        SQLModel.metadata.create_all(engine)
+        with Session(engine) as session:
+            session.add_all(make_snippets(args.count))
+            session.commit()
+
+        db_repo = DBSnippetRepository(engine)
+        snapshot_path = Path(tmp_dir) / "tier.snap"
+        from_db = best_of(TieredSnippetRepository(db_repo).warm_up, repeat=3)
+        TieredSnippetRepository(db_repo, snapshot_path=snapshot_path).warm_up()
+        from_snapshot = best_of(
+            TieredSnippetRepository(db_repo, snapshot_path=snapshot_path).warm_up,
+            repeat=3,
+        )
+
+        size = snapshot_path.stat().st_size / 1024 / 1024
+        print(f"{args.count} snippets, snapshot {size:.1f} MiB\n")
+        print(f"{'warm-up from database':<26}{from_db:>8.3f}s")
+        print(f"{'warm-up from snapshot':<26}{from_snapshot:>8.3f}s")
+        print(f"{'speedup':<26}{from_db / from_snapshot:>8.1f}x")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
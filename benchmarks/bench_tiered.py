@@ -0,0 +1,63 @@
+"""Compare read latency of the database repository and the tiered repository.
+
+Run with `make bench` or `PYTHONPATH=. uv run python benchmarks/bench_tiered.py`.
+"""
+
+import argparse
+import tempfile
+from pathlib import Path
+
+from sqlmodel import Session, create_engine
+
+from benchmarks.corpus import best_of, make_snippets
+from src.snipster.models import LangEnum, SQLModel
+from src.snipster.repo import (
+    ConsistencyMode,
+    DBSnippetRepository,
+    SnippetRepository,
+    TieredSnippetRepository,
+)
+
+
+def reads(repo: SnippetRepository, count: int) -> dict:
+    ids = range(1, count + 1, max(count // 100, 1))
+    return {
+        "get x100": lambda: [repo.get(snippet_id) for snippet_id in ids],
+        "search term": lambda: repo.search("cache"),
+        "search tag+lang": lambda: repo.search(
+            "", tag_name="tag-7", language=LangEnum.RUST
+        ),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--count", type=int, default=10_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        engine = create_engine(f"sqlite:///{Path(tmp_dir) / 'bench.sqlite'}")
+        SQLModel.metadata.create_all(engine)
+        with Session(engine) as session:
+            session.add_all(make_snippets(args.count))
+            session.commit()
+
+        db_repo = DBSnippetRepository(engine)
+        repos = {"db": db_repo}
+        for mode in ConsistencyMode:
+            repos[f"tiered {mode.value}"] = TieredSnippetRepository(db_repo, mode)
+
+        warm_up = best_of(repos["tiered exclusive"].warm_up, repeat=1)
+        print(f"{args.count} snippets, tier warm-up {warm_up:.2f}s\n")
+        labels = list(reads(db_repo, args.count))
+        print(f"{'repository':<20}" + "".join(f"{label:>18}" for label in labels))
+        for name, repo in repos.items():
+            timings = [
+                best_of(read) * 1000 for read in reads(repo, args.count).values()
+            ]
+            print(f"{name:<20}" + "".join(f"{ms:>16.2f}ms" for ms in timings))
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
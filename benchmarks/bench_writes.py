@@ -0,0 +1,82 @@
+"""Compare concurrent write throughput with and without a write coalescer.
+
+Threads add snippets to a SQLite file as fast as they can, like concurrent API
+requests during an import. Without a coalescer every add is a transaction of
+its own; with one, adds arriving within the window share a commit.
+
+Run with `make bench` or `PYTHONPATH=. uv run python benchmarks/bench_writes.py`.
+"""
+
+import argparse
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from sqlmodel import SQLModel, create_engine
+
+from benchmarks.corpus import make_snippets
+from src.snipster.coalescer import WriteCoalescer
+from src.snipster.repo import DBSnippetRepository
+
+
+def run(path: Path, threads: int, per_thread: int, window_ms: float | None) -> None:
+    engine = create_engine(f"sqlite:///{path}")
+    SQLModel.metadata.create_all(engine)
+    coalescer = (
+        WriteCoalescer(engine, window=window_ms / 1000, max_batch=threads)
+        if window_ms is not None
+        else None
+    )
+    repo = DBSnippetRepository(engine, coalescer)
+    snippets = make_snippets(threads * per_thread, tag_count=0, tags_per_snippet=0)
+    chunks = [snippets[i::threads] for i in range(threads)]
+
+    def write(chunk):
+        for snippet in chunk:
+            repo.add(snippet)
+
+    workers = [threading.Thread(target=write, args=(chunk,)) for chunk in chunks]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - start
+    engine.dispose()
+
+    label = "off" if window_ms is None else f"{window_ms:g}ms"
+    line = f"{label:>8} {len(snippets) / elapsed:>12.0f}/s"
+    if coalescer is not None:
+        stats = coalescer.stats()
+        line += (
+            f" {stats.mean_batch_size:>11.1f} {stats.mean_commit_ms:>11.1f}ms"
+            f" {stats.max_commit_ms:>11.1f}ms"
+        )
+    print(line)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--per-thread", type=int, default=50)
+    parser.add_argument("--windows", type=float, nargs="+", default=[1, 2, 5])
+    args = parser.parse_args()
+
+    print(f"{args.threads} threads x {args.per_thread} adds\n")
+    print(
+        f"{'window':>8} {'throughput':>14} {'mean batch':>11} "
+        f"{'mean commit':>13} {'max commit':>13}"
+    )
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for i, window_ms in enumerate([None, *args.windows]):
+            run(
+                Path(tmp_dir) / f"bench-{i}.sqlite",
+                args.threads,
+                args.per_thread,
+                window_ms,
+            )
+
+
+if __name__ == "__main__":
+    main()
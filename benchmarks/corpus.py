@@ -0,0 +1,47 @@
+"""Synthetic snippet corpus shared by the benchmark scripts."""
+
+import random
+import time
+from typing import Callable
+
+from src.snipster.models import LangEnum, Snippet, Tag
+
+WORDS = [
+    "select", "join", "filter", "window", "async", "await", "trait", "impl",
+    "vector", "parse", "cache", "index", "query", "stream", "buffer", "lock",
+]  # fmt: skip
+
+
+def make_snippets(
+    count: int, tag_count: int = 50, tags_per_snippet: int = 3, seed: int = 42
+) -> list[Snippet]:
+    """Build `count` snippets with random words, languages and tags.
+    Tags are shared `Tag` objects so every name is stored once in the database.
+    """
+    rng = random.Random(seed)
+    tags = [Tag(name=f"tag-{i}") for i in range(tag_count)]
+    languages = list(LangEnum)
+    snippets = []
+    for i in range(count):
+        words = rng.choices(WORDS, k=12)
+        snippets.append(
+            Snippet(
+                title=f"{words[0]} {words[1]} {i}",
+                code="\n".join(" ".join(words[j : j + 4]) for j in range(0, 12, 4)),
+                description=" ".join(rng.choices(WORDS, k=6)),
+                language=rng.choice(languages),
+                favorite=rng.random() < 0.1,
+                tags=rng.sample(tags, k=tags_per_snippet),
+            )
+        )
+    return snippets
+
+
+def best_of(func: Callable[[], object], repeat: int = 5) -> float:
+    """Return the fastest wall-clock time of `repeat` calls, in seconds."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
@@ -3,10 +3,11 @@ from logging.config import fileConfig
 
 from alembic import context
 from dotenv import load_dotenv
-from sqlalchemy import engine_from_config, pool
+from sqlalchemy import pool
 
 # add your model's MetaData object here
 # for 'autogenerate' support
+from src.snipster.db import create_db_engine
 from src.snipster.models import SQLModel
 
 load_dotenv()
@@ -64,13 +65,17 @@ def run_migrations_online() -> None:
     and associate a connection with the context.
 
     """
-    connectable = engine_from_config(
-        config.get_section(config.config_ini_section, {}),
-        prefix="sqlalchemy.",
-        poolclass=pool.NullPool,
+    connectable = create_db_engine(
+        config.get_main_option("sqlalchemy.url"), poolclass=pool.NullPool
     )
 
     with connectable.connect() as connection:
+        if connection.dialect.name == "sqlite":
+            # batch operations drop and recreate tables, which fails while
+            # other tables reference their rows; SQLite ignores this pragma
+            # inside a transaction, so it is committed on its own first
+            connection.exec_driver_sql("PRAGMA foreign_keys = OFF")
+            connection.commit()
         context.configure(connection=connection, target_metadata=target_metadata)
 
         with context.begin_transaction():
@@ -0,0 +1,147 @@
+"""Add snippet MinHash signatures and LSH buckets
+
+Revision ID: 07bfc58e2377
+Revises: e2f6f7807b75
+Create Date: 2026-10-19 13:02:47.561208
+
+"""
+
+import base64
+import hashlib
+import re
+from array import array
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+import sqlmodel
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "07bfc58e2377"
+down_revision: Union[str, None] = "e2f6f7807b75"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 500
+
+# copied from snipster.similarity at the time of this revision, so later changes
+# to the application code don't alter what this migration does
+NUM_HASHES = 64
+BANDS = 16
+ROWS = NUM_HASHES // BANDS
+SHINGLE_SIZE = 3
+TOKEN = re.compile(r"\w+|[^\w\s]")
+EMPTY = 0xFFFFFFFF
+ROTATION = 0x9E3779B1
+
+
+def hash64(data: bytes) -> int:
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), "little")
+
+
+def minhash(code: str | None) -> array:
+    tokens = TOKEN.findall((code or "").casefold())
+    count = max(len(tokens) - SHINGLE_SIZE + 1, 1) if tokens else 0
+    bins = [EMPTY] * NUM_HASHES
+    for i in range(count):
+        shingle = hash64(" ".join(tokens[i : i + SHINGLE_SIZE]).encode())
+        slot, value = shingle % NUM_HASHES, shingle >> 32
+        if value < bins[slot]:
+            bins[slot] = value
+
+    signature = array("I", bins)
+    if all(value == EMPTY for value in bins):
+        return signature
+    for slot, value in enumerate(bins):
+        if value != EMPTY:
+            continue
+        distance = 1
+        while bins[(slot + distance) % NUM_HASHES] == EMPTY:
+            distance += 1
+        borrowed = bins[(slot + distance) % NUM_HASHES]
+        signature[slot] = (borrowed + distance * ROTATION) & 0xFFFFFFFF
+    return signature
+
+
+def band_buckets(signature: array) -> list[int]:
+    raw = signature.tobytes()
+    width = ROWS * signature.itemsize
+    return [
+        hash64(band.to_bytes(1, "little") + raw[band * width : (band + 1) * width])
+        - (1 << 63)
+        for band in range(BANDS)
+    ]
+
+
+def backfill_signatures() -> None:
+    """Sign existing snippets and bucket their signatures, in batches by ID."""
+    connection = op.get_bind()
+    snippet = sa.table(
+        "snippet",
+        sa.column("id", sa.Integer),
+        sa.column("code", sa.String),
+        sa.column("minhash", sa.String),
+    )
+    snippetbucket = sa.table(
+        "snippetbucket",
+        sa.column("bucket", sa.BigInteger),
+        sa.column("snippet_id", sa.Integer),
+    )
+    last_id = 0
+    while True:
+        rows = connection.execute(
+            sa.select(snippet.c.id, snippet.c.code)
+            .where(snippet.c.id > last_id)
+            .order_by(snippet.c.id)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        buckets = []
+        for row in rows:
+            signature = minhash(row.code)
+            connection.execute(
+                snippet.update()
+                .where(snippet.c.id == row.id)
+                .values(minhash=base64.b64encode(signature.tobytes()).decode("ascii"))
+            )
+            buckets += [
+                {"bucket": bucket, "snippet_id": row.id}
+                for bucket in band_buckets(signature)
+            ]
+        connection.execute(snippetbucket.insert(), buckets)
+        last_id = rows[-1].id
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "snippetbucket",
+        sa.Column("bucket", sa.BigInteger(), nullable=False),
+        sa.Column("snippet_id", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("bucket", "snippet_id"),
+    )
+    op.create_index(
+        op.f("ix_snippetbucket_snippet_id"),
+        "snippetbucket",
+        ["snippet_id"],
+        unique=False,
+    )
+    op.add_column(
+        "snippet",
+        sa.Column(
+            "minhash",
+            sqlmodel.sql.sqltypes.AutoString(),
+            nullable=False,
+            server_default="",
+        ),
+    )
+    backfill_signatures()
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table("snippet") as batch_op:
+        batch_op.drop_column("minhash")
+    op.drop_index(op.f("ix_snippetbucket_snippet_id"), table_name="snippetbucket")
+    op.drop_table("snippetbucket")
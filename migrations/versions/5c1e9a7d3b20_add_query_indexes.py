@@ -0,0 +1,77 @@
+"""Add query indexes
+
+Revision ID: 5c1e9a7d3b20
+Revises: 81db7767ffae
+Create Date: 2026-10-19 09:12:44.518203
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "5c1e9a7d3b20"
+down_revision: Union[str, None] = "81db7767ffae"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def merge_duplicate_tags() -> None:
+    """Point links at the oldest tag of each name and drop the other copies,
+    so the unique index on tag.name can be created."""
+    connection = op.get_bind()
+    duplicates = connection.execute(
+        sa.text(
+            "SELECT t.id, keeper.id FROM tag t "
+            "JOIN (SELECT name, MIN(id) AS id FROM tag GROUP BY name) keeper "
+            "ON t.name = keeper.name AND t.id <> keeper.id"
+        )
+    ).all()
+    for duplicate_id, keeper_id in duplicates:
+        params = {"duplicate_id": duplicate_id, "keeper_id": keeper_id}
+        # drop links that would collide with an existing link to the keeper
+        connection.execute(
+            sa.text(
+                "DELETE FROM snippettaglink WHERE tag_id = :duplicate_id "
+                "AND snippet_id IN (SELECT snippet_id FROM snippettaglink "
+                "WHERE tag_id = :keeper_id)"
+            ),
+            params,
+        )
+        connection.execute(
+            sa.text(
+                "UPDATE snippettaglink SET tag_id = :keeper_id "
+                "WHERE tag_id = :duplicate_id"
+            ),
+            params,
+        )
+        connection.execute(sa.text("DELETE FROM tag WHERE id = :duplicate_id"), params)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    merge_duplicate_tags()
+    op.create_index(op.f("ix_tag_name"), "tag", ["name"], unique=True)
+    op.create_index(
+        op.f("ix_snippettaglink_tag_id"), "snippettaglink", ["tag_id"], unique=False
+    )
+    op.create_index(op.f("ix_snippet_language"), "snippet", ["language"], unique=False)
+    op.create_index(op.f("ix_snippet_favorite"), "snippet", ["favorite"], unique=False)
+    op.create_index(
+        op.f("ix_snippet_created_at"), "snippet", ["created_at"], unique=False
+    )
+    op.create_index(
+        op.f("ix_snippet_updated_at"), "snippet", ["updated_at"], unique=False
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f("ix_snippet_updated_at"), table_name="snippet")
+    op.drop_index(op.f("ix_snippet_created_at"), table_name="snippet")
+    op.drop_index(op.f("ix_snippet_favorite"), table_name="snippet")
+    op.drop_index(op.f("ix_snippet_language"), table_name="snippet")
+    op.drop_index(op.f("ix_snippettaglink_tag_id"), table_name="snippettaglink")
+    op.drop_index(op.f("ix_tag_name"), table_name="tag")
@@ -0,0 +1,73 @@
+"""Add snippet change log
+
+Revision ID: 635c73a9d9a9
+Revises: 9e4b2f61c8a7
+Create Date: 2026-10-19 09:52:30.397629
+
+"""
+
+from datetime import datetime, timezone
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+import sqlmodel
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "635c73a9d9a9"
+down_revision: Union[str, None] = "9e4b2f61c8a7"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def backfill_change_log() -> None:
+    """Log an upsert for every existing snippet, so a client syncing from
+    cursor 0 receives the whole collection.
+    """
+    snippet = sa.table("snippet", sa.column("id", sa.Integer))
+    snippetchange = sa.table(
+        "snippetchange",
+        sa.column("snippet_id", sa.Integer),
+        sa.column("operation", sa.String),
+        sa.column("changed_at", sa.DateTime),
+    )
+    op.get_bind().execute(
+        snippetchange.insert().from_select(
+            ["snippet_id", "operation", "changed_at"],
+            sa.select(
+                snippet.c.id,
+                sa.literal("upsert"),
+                sa.literal(datetime.now(timezone.utc), sa.DateTime),
+            ).order_by(snippet.c.id),
+        )
+    )
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "snippetchange",
+        sa.Column("cursor", sa.Integer(), nullable=False),
+        sa.Column("snippet_id", sa.Integer(), nullable=False),
+        sa.Column(
+            "operation",
+            sa.Enum("upsert", "delete", name="changeoperation"),
+            nullable=False,
+        ),
+        sa.Column("changed_at", sqlmodel.sql.sqltypes.UTCDateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("cursor"),
+        sqlite_autoincrement=True,
+    )
+    op.create_index(
+        op.f("ix_snippetchange_snippet_id"),
+        "snippetchange",
+        ["snippet_id"],
+        unique=False,
+    )
+    backfill_change_log()
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f("ix_snippetchange_snippet_id"), table_name="snippetchange")
+    op.drop_table("snippetchange")
@@ -0,0 +1,90 @@
+"""Add normalized search fields
+
+Revision ID: 9e4b2f61c8a7
+Revises: 5c1e9a7d3b20
+Create Date: 2026-10-19 10:41:07.902615
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+import sqlmodel
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "9e4b2f61c8a7"
+down_revision: Union[str, None] = "5c1e9a7d3b20"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 500
+
+# copied from the models at the time of this revision, so later changes to the
+# application code don't alter what this migration does
+SEARCH_FIELDS = {
+    "title": "title_norm",
+    "code": "code_norm",
+    "description": "description_norm",
+}
+
+
+def normalize_text(value: str | None) -> str:
+    if not value:
+        return ""
+    return " ".join(value.casefold().split())
+
+
+def backfill_search_fields() -> None:
+    """Compute normalized fields for existing snippets, in batches by ID."""
+    connection = op.get_bind()
+    snippet = sa.table(
+        "snippet",
+        sa.column("id", sa.Integer),
+        *(sa.column(field, sa.String) for field in SEARCH_FIELDS),
+        *(sa.column(norm_field, sa.String) for norm_field in SEARCH_FIELDS.values()),
+    )
+    last_id = 0
+    while True:
+        rows = connection.execute(
+            sa.select(snippet.c.id, *(snippet.c[field] for field in SEARCH_FIELDS))
+            .where(snippet.c.id > last_id)
+            .order_by(snippet.c.id)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        for row in rows:
+            connection.execute(
+                snippet.update()
+                .where(snippet.c.id == row.id)
+                .values(
+                    {
+                        norm_field: normalize_text(getattr(row, field))
+                        for field, norm_field in SEARCH_FIELDS.items()
+                    }
+                )
+            )
+        last_id = rows[-1].id
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for norm_field in SEARCH_FIELDS.values():
+        op.add_column(
+            "snippet",
+            sa.Column(
+                norm_field,
+                sqlmodel.sql.sqltypes.AutoString(),
+                nullable=False,
+                server_default="",
+            ),
+        )
+    backfill_search_fields()
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table("snippet") as batch_op:
+        for norm_field in SEARCH_FIELDS.values():
+            batch_op.drop_column(norm_field)
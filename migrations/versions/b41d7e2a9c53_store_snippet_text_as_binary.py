@@ -0,0 +1,122 @@
+"""Store snippet code and description in binary columns
+
+Revision ID: b41d7e2a9c53
+Revises: 07bfc58e2377
+Create Date: 2026-10-19 16:20:31.804412
+
+"""
+
+import zlib
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+try:
+    from compression import zstd  # Python 3.14+
+except ImportError:
+    try:
+        import zstandard as zstd
+    except ImportError:
+        zstd = None
+
+# revision identifiers, used by Alembic.
+revision: str = "b41d7e2a9c53"
+down_revision: Union[str, None] = "07bfc58e2377"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 500
+COLUMNS = ("code", "description")
+
+
+# copied from snipster.compressed at the time of this revision, so later changes
+# to the application code don't alter what this migration does
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+
+def decode_stored(data: bytes | str | None) -> str | None:
+    if not isinstance(data, bytes):
+        return data
+    if data.startswith(ZSTD_MAGIC):
+        if zstd is None:
+            raise RuntimeError(
+                "Downgrading zstd compressed snippets needs Python 3.14+ "
+                "or the zstandard package"
+            )
+        return zstd.decompress(data).decode()
+    if len(data) >= 2 and data[0] & 0x0F == 8 and (data[0] << 8 | data[1]) % 31 == 0:
+        try:
+            return zlib.decompress(data).decode()
+        except (zlib.error, UnicodeDecodeError):
+            pass
+    return data.decode()
+
+
+def decompress_rows() -> None:
+    """Replace compressed values with their plain UTF-8 bytes, in batches by ID."""
+    connection = op.get_bind()
+    # untyped columns, so values come back as stored
+    snippet = sa.table("snippet", sa.column("id"), *map(sa.column, COLUMNS))
+    last_id = 0
+    while True:
+        rows = connection.execute(
+            sa.select(snippet)
+            .where(snippet.c.id > last_id)
+            .order_by(snippet.c.id)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        for row in rows:
+            values = {}
+            for column in COLUMNS:
+                value = getattr(row, column)
+                text = decode_stored(value)
+                if text is not None and text.encode() != value:
+                    values[column] = text.encode()
+            if values:
+                connection.execute(
+                    snippet.update().where(snippet.c.id == row.id).values(**values)
+                )
+        last_id = rows[-1].id
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table("snippet") as batch_op:
+        for column in COLUMNS:
+            batch_op.alter_column(
+                column,
+                existing_type=sa.String(),
+                type_=sa.LargeBinary(),
+                existing_nullable=column == "description",
+                postgresql_using=f"convert_to({column}, 'UTF8')",
+            )
+    if op.get_bind().dialect.name == "sqlite":
+        # SQLite keeps each value's storage class, so plain text is still text
+        for column in COLUMNS:
+            op.execute(
+                f"UPDATE snippet SET {column} = CAST({column} AS BLOB) "
+                f"WHERE typeof({column}) = 'text'"
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    decompress_rows()
+    with op.batch_alter_table("snippet") as batch_op:
+        for column in COLUMNS:
+            batch_op.alter_column(
+                column,
+                existing_type=sa.LargeBinary(),
+                type_=sa.String(),
+                existing_nullable=column == "description",
+                postgresql_using=f"convert_from({column}, 'UTF8')",
+            )
+    if op.get_bind().dialect.name == "sqlite":
+        for column in COLUMNS:
+            op.execute(
+                f"UPDATE snippet SET {column} = CAST({column} AS TEXT) "
+                f"WHERE typeof({column}) = 'blob'"
+            )
@@ -0,0 +1,125 @@
+"""Drop normalized copies of large text
+
+Revision ID: d5a8c3f1e604
+Revises: b41d7e2a9c53
+Create Date: 2026-10-19 18:05:44.217930
+
+"""
+
+import zlib
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+try:
+    from compression import zstd  # Python 3.14+
+except ImportError:
+    try:
+        import zstandard as zstd
+    except ImportError:
+        zstd = None
+
+# revision identifiers, used by Alembic.
+revision: str = "d5a8c3f1e604"
+down_revision: Union[str, None] = "b41d7e2a9c53"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 500
+NORM_FIELDS = {"code": "code_norm", "description": "description_norm"}
+
+
+# copied from snipster.compressed and snipster.models at the time of this
+# revision, so later changes to the application code don't alter what this
+# migration does
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+
+def decode_stored(data: bytes | None) -> tuple[str | None, bool]:
+    """Return the text of a stored value and whether it was compressed."""
+    if data is None:
+        return None, False
+    if data.startswith(ZSTD_MAGIC):
+        if zstd is None:
+            raise RuntimeError(
+                "Migrating zstd compressed snippets needs Python 3.14+ "
+                "or the zstandard package"
+            )
+        return zstd.decompress(data).decode(), True
+    if len(data) >= 2 and data[0] & 0x0F == 8 and (data[0] << 8 | data[1]) % 31 == 0:
+        try:
+            return zlib.decompress(data).decode(), True
+        except (zlib.error, UnicodeDecodeError):
+            pass
+    return data.decode(), False
+
+
+def normalize_text(value: str | None) -> str:
+    if not value:
+        return ""
+    return " ".join(value.casefold().split())
+
+
+def update_norms(upgrading: bool) -> None:
+    """Clear the normalized copies of compressed text when upgrading, or fill
+    in the missing ones when downgrading, in batches by ID.
+    """
+    connection = op.get_bind()
+    snippet = sa.table(
+        "snippet",
+        sa.column("id"),
+        *map(sa.column, NORM_FIELDS),
+        *map(sa.column, NORM_FIELDS.values()),
+    )
+    last_id = 0
+    while True:
+        rows = connection.execute(
+            sa.select(snippet)
+            .where(snippet.c.id > last_id)
+            .order_by(snippet.c.id)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        for row in rows:
+            values = {}
+            for field, norm_field in NORM_FIELDS.items():
+                if upgrading:
+                    _, compressed = decode_stored(getattr(row, field))
+                    if compressed:
+                        values[norm_field] = None
+                elif getattr(row, norm_field) is None:
+                    text, _ = decode_stored(getattr(row, field))
+                    values[norm_field] = normalize_text(text)
+            if values:
+                connection.execute(
+                    snippet.update().where(snippet.c.id == row.id).values(**values)
+                )
+        last_id = rows[-1].id
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table("snippet") as batch_op:
+        for norm_field in NORM_FIELDS.values():
+            batch_op.alter_column(
+                norm_field,
+                existing_type=sa.String(),
+                nullable=True,
+                server_default=None,
+            )
+    update_norms(upgrading=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    update_norms(upgrading=False)
+    with op.batch_alter_table("snippet") as batch_op:
+        for norm_field in NORM_FIELDS.values():
+            batch_op.alter_column(
+                norm_field,
+                existing_type=sa.String(),
+                nullable=False,
+                server_default="",
+            )
@@ -0,0 +1,88 @@
+"""Add snippet content hash
+
+Revision ID: e2f6f7807b75
+Revises: 635c73a9d9a9
+Create Date: 2026-10-19 11:18:03.214957
+
+"""
+
+import hashlib
+import textwrap
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+import sqlmodel
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "e2f6f7807b75"
+down_revision: Union[str, None] = "635c73a9d9a9"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 500
+
+
+# copied from the models at the time of this revision, so later changes to the
+# application code don't alter what this migration does
+def hash_content(code: str | None, language: str | None) -> str:
+    code = (code or "").replace("\r\n", "\n").replace("\r", "\n")
+    lines = textwrap.dedent(code).split("\n")
+    normalized = "\n".join(line.rstrip() for line in lines).strip("\n")
+    data = f"{language}\n{normalized}".encode()
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def backfill_content_hashes() -> None:
+    """Compute content hashes for existing snippets, in batches by ID."""
+    connection = op.get_bind()
+    snippet = sa.table(
+        "snippet",
+        sa.column("id", sa.Integer),
+        sa.column("code", sa.String),
+        sa.column("language", sa.String),
+        sa.column("content_hash", sa.String),
+    )
+    last_id = 0
+    while True:
+        rows = connection.execute(
+            sa.select(snippet.c.id, snippet.c.code, snippet.c.language)
+            .where(snippet.c.id > last_id)
+            .order_by(snippet.c.id)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        for row in rows:
+            connection.execute(
+                snippet.update()
+                .where(snippet.c.id == row.id)
+                .values(content_hash=hash_content(row.code, row.language))
+            )
+        last_id = rows[-1].id
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        "snippet",
+        sa.Column(
+            "content_hash",
+            sqlmodel.sql.sqltypes.AutoString(),
+            nullable=False,
+            server_default="",
+        ),
+    )
+    op.add_column("snippet", sa.Column("duplicate_of", sa.Integer(), nullable=True))
+    backfill_content_hashes()
+    op.create_index(
+        op.f("ix_snippet_content_hash"), "snippet", ["content_hash"], unique=False
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f("ix_snippet_content_hash"), table_name="snippet")
+    with op.batch_alter_table("snippet") as batch_op:
+        batch_op.drop_column("duplicate_of")
+        batch_op.drop_column("content_hash")
@@ -0,0 +1,76 @@
+"""Add snippet facet counts
+
+Revision ID: f3b9e07c2d81
+Revises: d5a8c3f1e604
+Create Date: 2026-10-19 18:42:13.580126
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+import sqlmodel
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "f3b9e07c2d81"
+down_revision: Union[str, None] = "d5a8c3f1e604"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def backfill_facet_counts() -> None:
+    """Count the existing snippets per facet value, once."""
+    snippet = sa.table(
+        "snippet",
+        sa.column("id", sa.Integer),
+        sa.column("language", sa.String),
+        sa.column("favorite", sa.Boolean),
+    )
+    tag = sa.table("tag", sa.column("id", sa.Integer), sa.column("name", sa.String))
+    snippettaglink = sa.table(
+        "snippettaglink",
+        sa.column("snippet_id", sa.Integer),
+        sa.column("tag_id", sa.Integer),
+    )
+    snippetfacetcount = sa.table(
+        "snippetfacetcount",
+        sa.column("facet", sa.String),
+        sa.column("value", sa.String),
+        sa.column("count", sa.Integer),
+    )
+    count = sa.func.count().label("count")
+    counts = [
+        sa.select(sa.literal("total"), sa.literal(""), count).select_from(snippet),
+        sa.select(sa.literal("favorite"), sa.literal(""), count)
+        .select_from(snippet)
+        .where(snippet.c.favorite),
+        sa.select(sa.literal("language"), snippet.c.language, count).group_by(
+            snippet.c.language
+        ),
+        sa.select(sa.literal("tag"), tag.c.name, count)
+        .select_from(tag.join(snippettaglink, snippettaglink.c.tag_id == tag.c.id))
+        .group_by(tag.c.name),
+    ]
+    connection = op.get_bind()
+    for query in counts:
+        connection.execute(
+            snippetfacetcount.insert().from_select(["facet", "value", "count"], query)
+        )
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "snippetfacetcount",
+        sa.Column("facet", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column("value", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column("count", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("facet", "value"),
+    )
+    backfill_facet_counts()
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("snippetfacetcount")
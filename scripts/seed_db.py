@@ -1,14 +1,12 @@
-from decouple import config
-from sqlmodel import Session, create_engine
+from sqlmodel import Session
 
+from src.snipster.db import create_db_engine
 from src.snipster.models import LangEnum, Snippet, SQLModel, Tag
 
 
 def main() -> None:
     def get_engine():
-        database_url = config("DATABASE_URL", default="sqlite:///snipster.sqlite")
-        engine = create_engine(database_url, echo=True)
-        return engine
+        return create_db_engine(echo=True)
 
     def create_db_and_tables(engine):
         SQLModel.metadata.drop_all(engine)
@@ -1,26 +1,132 @@
+import asyncio
+from contextlib import asynccontextmanager
 from typing import Annotated
 
 from decouple import config
-from fastapi import Depends, FastAPI, HTTPException
-from sqlmodel import create_engine
+from fastapi import Depends, FastAPI, Header, HTTPException, Query, Request
+from fastapi.responses import Response, StreamingResponse
+from starlette.concurrency import run_in_threadpool
 
-from .exceptions import SnippetNotFoundError
-from .models import DeleteResponse, LangEnum, Snippet, SnippetCreate, SnippetRead, Tag
-from .repo import DBSnippetRepository
+from .autocomplete import CompletionField
+from .coalescer import WriteCoalescer
+from .db import create_db_engine
+from .exceptions import (
+    DuplicateSnippetError,
+    InvalidFieldsError,
+    InvalidSearchPatternError,
+    InvalidTagQueryError,
+    SearchTimeoutError,
+    SnippetNotFoundError,
+)
+from .export import MEDIA_TYPES, ExportFormat, iter_export
+from .incremental import SearchSessions
+from .middleware import CompressionMiddleware
+from .models import (
+    ChangePage,
+    DeleteResponse,
+    LangEnum,
+    RelatedSnippet,
+    Snippet,
+    SnippetCreate,
+    SnippetFacets,
+    SnippetRead,
+    SnippetSummary,
+    Suggestion,
+    Tag,
+    WriteStats,
+)
+from .repo import (
+    ConsistencyMode,
+    DBSnippetRepository,
+    DuplicatePolicy,
+    SearchMode,
+    SnippetRepository,
+    TieredSnippetRepository,
+)
+from .responses import SnippetJSONResponse, parse_fields
+from .sync import change_events, change_page
 
-app = FastAPI()
+engine = create_db_engine()
 
-database_url = config("DATABASE_URL", default="sqlite:///snipster.sqlite")
-engine = create_engine(database_url, echo=False)
+# let concurrent writes share transactions when a batching window is set
+write_window_ms = config("SNIPSTER_WRITE_COALESCE_MS", default=0.0, cast=float)
+write_coalescer = (
+    WriteCoalescer(
+        engine,
+        window=write_window_ms / 1000,
+        max_batch=config("SNIPSTER_WRITE_MAX_BATCH", default=100, cast=int),
+    )
+    if write_window_ms > 0
+    else None
+)
+
+# serve reads from an in-memory tier shared by all requests when enabled
+tier_consistency = config("SNIPSTER_TIER_CONSISTENCY", default="off")
+tiered_repo = (
+    TieredSnippetRepository(
+        DBSnippetRepository(engine, write_coalescer),
+        consistency=ConsistencyMode(tier_consistency),
+        max_staleness=config("SNIPSTER_TIER_MAX_STALENESS", default=1.0, cast=float),
+        snapshot_path=config("SNIPSTER_TIER_SNAPSHOT", default=None),
+    )
+    if tier_consistency != "off"
+    else None
+)
+
+
+search_sessions = SearchSessions(
+    debounce=config("SNIPSTER_SEARCH_DEBOUNCE", default=0.05, cast=float)
+)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if tiered_repo is not None:
+        tiered_repo.warm_up()
+    yield
+    if tiered_repo is not None and tiered_repo.snapshot_path is not None:
+        tiered_repo.save_snapshot()
+
+
+app = FastAPI(default_response_class=SnippetJSONResponse, lifespan=lifespan)
+app.add_middleware(CompressionMiddleware)
 
 
 def get_repo():
-    repo = DBSnippetRepository(engine)
+    if tiered_repo is not None:
+        yield tiered_repo
+        return
+    repo = DBSnippetRepository(engine, write_coalescer)
     yield repo
     del repo
 
 
-RepoDep = Annotated[DBSnippetRepository, Depends(get_repo)]
+RepoDep = Annotated[SnippetRepository, Depends(get_repo)]
+
+
+def get_fields(
+    fields: Annotated[
+        str | None,
+        Query(
+            description="Comma-separated fields to return, e.g. `title,tags`; "
+            "`summary` selects the `SnippetSummary` fields"
+        ),
+    ] = None,
+) -> tuple[str, ...] | None:
+    try:
+        return parse_fields(fields)
+    except InvalidFieldsError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+
+FieldsDep = Annotated[tuple[str, ...] | None, Depends(get_fields)]
+
+
+def get_search_sessions() -> SearchSessions:
+    return search_sessions
+
+
+SearchSessionsDep = Annotated[SearchSessions, Depends(get_search_sessions)]
 
 
 @app.get("/")
@@ -28,9 +134,114 @@ def root():
     return {"message": "Snipster API is alive!"}
 
 
-@app.get("/snippets", response_model=list[SnippetRead])
-def get_snippets(repo: RepoDep):
-    return repo.list()
+@app.get("/snippets", response_model=list[SnippetRead] | list[SnippetSummary])
+def get_snippets(
+    repo: RepoDep,
+    fields: FieldsDep,
+    ids: Annotated[
+        list[int] | None,
+        Query(description="Only return these snippets, e.g. `?ids=1&ids=5`"),
+    ] = None,
+):
+    if ids is not None:
+        snippets = repo.get_many(ids, fields=fields)
+    else:
+        snippets = repo.list(fields=fields)
+    return SnippetJSONResponse(snippets, fields=fields)
+
+
+@app.get(
+    "/snippets/export",
+    response_class=StreamingResponse,
+    responses={
+        200: {"content": {media_type: {} for media_type in MEDIA_TYPES.values()}}
+    },
+)
+def export_snippets(
+    repo: RepoDep,
+    format: ExportFormat = ExportFormat.PARQUET,
+    batch_size: Annotated[int, Query(ge=1, le=10_000)] = 1000,
+):
+    try:
+        chunks = iter_export(repo, format, batch_size)
+    except ValueError as e:  # pyarrow is not installed
+        raise HTTPException(status_code=501, detail=str(e))
+    extension = "parquet" if format == ExportFormat.PARQUET else "arrows"
+    return StreamingResponse(
+        chunks,
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="snippets.{extension}"'},
+    )
+
+
+@app.get("/snippets/facets", response_model=SnippetFacets)
+def get_facets(repo: RepoDep, term: str | None = None):
+    return repo.facets(term)
+
+
+@app.get("/autocomplete", response_model=list[Suggestion])
+def autocomplete(
+    field: CompletionField,
+    prefix: str,
+    repo: RepoDep,
+    limit: Annotated[int, Query(ge=1, le=100)] = 10,
+):
+    return [
+        {"value": value, "count": count}
+        for value, count in repo.autocomplete(field, prefix, limit)
+    ]
+
+
+@app.get("/tags/suggestions", response_model=list[Suggestion])
+def suggest_tags(
+    name: str,
+    repo: RepoDep,
+    max_distance: Annotated[int | None, Query(ge=0, le=3)] = None,
+    limit: Annotated[int, Query(ge=1, le=100)] = 5,
+):
+    """Suggest tag names in use that are close to `name`, for "did you mean" hints.
+    Empty when `name` is itself a tag in use.
+    """
+    return [
+        {"value": value, "count": count}
+        for value, count in repo.suggest_tags(name, max_distance, limit)
+    ]
+
+
+@app.get("/metrics/writes", response_model=WriteStats)
+def get_write_stats():
+    if write_coalescer is None:
+        raise HTTPException(status_code=404, detail="Write coalescing is disabled")
+    return write_coalescer.stats()
+
+
+@app.get("/snippets/changes", response_model=ChangePage)
+def get_changes(
+    repo: RepoDep,
+    since: Annotated[
+        int, Query(ge=0, description="Cursor of the last change seen")
+    ] = 0,
+    limit: Annotated[int, Query(ge=1, le=1000)] = 100,
+):
+    return SnippetJSONResponse(change_page(repo, since, limit))
+
+
+@app.get("/snippets/changes/stream")
+async def stream_changes(
+    request: Request,
+    repo: RepoDep,
+    since: Annotated[
+        int, Query(ge=0, description="Cursor of the last change seen")
+    ] = 0,
+    last_event_id: Annotated[int | None, Header()] = None,
+):
+    if last_event_id is not None:
+        since = last_event_id
+    return StreamingResponse(
+        change_events(repo, since, request.is_disconnected),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache"},
+    )
 
 
 @app.get("/snippets/{snippet_id}", response_model=SnippetRead)
@@ -40,14 +251,48 @@ def get_snippet(snippet_id: int, repo: RepoDep):
         raise HTTPException(
             status_code=404, detail=f"Snippet with ID {snippet_id} not found"
         )
-    return snippet
+    return SnippetJSONResponse(snippet)
+
+
+@app.get("/snippets/{snippet_id}/related", response_model=list[RelatedSnippet])
+def get_related_snippets(
+    snippet_id: int,
+    repo: RepoDep,
+    fields: FieldsDep,
+    limit: Annotated[int, Query(ge=1, le=100)] = 10,
+    threshold: Annotated[
+        float, Query(ge=0, le=1, description="Minimum estimated similarity")
+    ] = 0.5,
+):
+    try:
+        related = repo.related(snippet_id, limit=limit, threshold=threshold)
+    except SnippetNotFoundError:
+        raise HTTPException(
+            status_code=404, detail=f"Snippet with ID {snippet_id} not found"
+        )
+    return SnippetJSONResponse(
+        [{"similarity": score, "snippet": snippet} for snippet, score in related],
+        fields=fields,
+    )
 
 
 @app.post("/snippets", response_model=SnippetRead)
-def create_snippet(snippet: SnippetCreate, repo: RepoDep):
+def create_snippet(
+    snippet: SnippetCreate,
+    repo: RepoDep,
+    duplicates: Annotated[
+        DuplicatePolicy,
+        Query(description="What to do if the code duplicates a stored snippet"),
+    ] = DuplicatePolicy.ALLOW,
+):
     new_snippet = Snippet.create(**snippet.model_dump())
-    repo.add(new_snippet)
-    return new_snippet
+    try:
+        repo.add(new_snippet, duplicates)
+    except DuplicateSnippetError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    if new_snippet.id is None:  # merged into the snippet it duplicates
+        new_snippet = repo.get(new_snippet.duplicate_of)
+    return SnippetJSONResponse(new_snippet)
 
 
 @app.delete("/snippets/{snippet_id}")
@@ -70,19 +315,93 @@ def toggle_favorite(snippet_id: int, repo: RepoDep):
             status_code=404, detail=f"Snippet with ID {snippet_id} not found"
         )
     snippet = repo.get(snippet_id)
-    return snippet
+    return SnippetJSONResponse(snippet)
 
 
-@app.get("/snippets/search/", response_model=list[SnippetRead])
+@app.get("/snippets/search/", response_model=list[SnippetRead] | list[SnippetSummary])
 def search_snippets(
     term: str,
     repo: RepoDep,
+    fields: FieldsDep,
     tag_name: str | None = None,
     language: LangEnum | None = None,
     fuzzy: bool = False,
+    tags: Annotated[
+        str | None,
+        Query(description="Tag expression, e.g. `(sql AND perf) OR rust NOT legacy`"),
+    ] = None,
+    mode: Annotated[
+        SearchMode | None,
+        Query(description="Matching mode; `ranked` orders results by relevance"),
+    ] = None,
+    limit: Annotated[int | None, Query(ge=1, le=1000)] = None,
+):
+    try:
+        snippets = repo.search(
+            term,
+            tag_name=tag_name,
+            language=language,
+            fuzzy=fuzzy,
+            tags=tags,
+            fields=fields,
+            mode=mode,
+            limit=limit,
+        )
+    except (InvalidTagQueryError, InvalidSearchPatternError) as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except SearchTimeoutError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    return SnippetJSONResponse(snippets, fields=fields)
+
+
+@app.get(
+    "/snippets/search/incremental",
+    response_model=list[SnippetRead] | list[SnippetSummary],
+    responses={204: {"description": "Superseded by a newer request of the session"}},
+)
+async def search_snippets_incremental(
+    term: str,
+    session: Annotated[
+        str,
+        Query(min_length=1, max_length=64, description="ID chosen by the client"),
+    ],
+    request: Request,
+    repo: RepoDep,
+    sessions: SearchSessionsDep,
+    fields: FieldsDep,
+    tag_name: str | None = None,
+    language: LangEnum | None = None,
+    tags: Annotated[
+        str | None,
+        Query(description="Tag expression, e.g. `(sql AND perf) OR rust NOT legacy`"),
+    ] = None,
+    limit: Annotated[int, Query(ge=1, le=100)] = 20,
 ):
-    snippets = repo.search(term, tag_name=tag_name, language=language, fuzzy=fuzzy)
-    return snippets
+    """Search as the user types. Send every keystroke with the same `session`;
+    terms extending an earlier one are refined from its matches. A request
+    answers 204 if a newer one of its session arrives before it is done.
+    """
+    generation = sessions.begin(session)
+    await asyncio.sleep(sessions.debounce)
+    if not sessions.is_current(session, generation) or await request.is_disconnected():
+        return Response(status_code=204)
+    try:
+        snippets = await run_in_threadpool(
+            sessions.search,
+            repo,
+            session,
+            term,
+            tag_name=tag_name,
+            language=language,
+            tags=tags,
+            limit=limit,
+            fields=fields,
+        )
+    except InvalidTagQueryError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    if not sessions.is_current(session, generation):
+        return Response(status_code=204)
+    return SnippetJSONResponse(snippets, fields=fields)
 
 
 @app.post("/snippets/{snippet_id}/tags", response_model=SnippetRead)
@@ -100,4 +419,4 @@ def tag(
             status_code=404, detail=f"Snippet with ID {snippet_id} not found"
         )
     snippet = repo.get(snippet_id)
-    return snippet
+    return SnippetJSONResponse(snippet)
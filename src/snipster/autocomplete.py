@@ -0,0 +1,151 @@
+"""Prefix completion of tag names and title words, weighted by popularity.
+
+Keys are held in a sorted list, so the keys sharing a prefix form one slice
+found by binary search, and a count per key records how many snippets use it.
+Both are updated as snippets are written, so a lookup never scans snippets.
+Tag names in use are also kept in a BK-tree, which finds the names within a
+small edit distance of a misspelled one.
+"""
+
+import heapq
+from bisect import bisect_left, insort
+from enum import StrEnum
+from typing import Iterable
+
+from .fulltext import tokenize
+from .models import TagBase
+from .spelling import BKTree
+
+
+class CompletionField(StrEnum):
+    TAG = "tag"
+    TITLE = "title"
+
+
+class PrefixIndex:
+    """Sorted keys with the number of snippets using each of them.
+    Keys whose count drops to zero are removed.
+
+    Short prefixes can match many keys, so results for prefixes matching more
+    than `CACHE_MIN_MATCHES` keys are cached until the next change.
+    """
+
+    CACHE_MIN_MATCHES = 64
+    CACHE_SIZE = 1024
+
+    def __init__(self) -> None:
+        self._keys: list[str] = []
+        self._counts: dict[str, int] = {}
+        self._cache: dict[tuple[str, int], list[tuple[str, int]]] = {}
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._counts
+
+    def count(self, key: str) -> int:
+        return self._counts.get(key, 0)
+
+    def add(self, key: str) -> None:
+        self._cache.clear()
+        count = self._counts.get(key, 0)
+        if not count:
+            insort(self._keys, key)
+        self._counts[key] = count + 1
+
+    def discard(self, key: str) -> None:
+        count = self._counts.get(key)
+        if count is None:
+            return
+        self._cache.clear()
+        if count > 1:
+            self._counts[key] = count - 1
+        else:
+            del self._counts[key]
+            del self._keys[bisect_left(self._keys, key)]
+
+    def complete(self, prefix: str, limit: int = 10) -> list[tuple[str, int]]:
+        """Return up to `limit` keys starting with `prefix`, most used first,
+        with ties in alphabetical order.
+        """
+        cached = self._cache.get((prefix, limit))
+        if cached is not None:
+            return cached
+        start = bisect_left(self._keys, prefix)
+        # every key from `start` on sorts after the prefix, so the matches end
+        # at the first key sorting after all strings starting with it
+        end = bisect_left(self._keys, prefix + "\U0010ffff", start)
+        matches = ((key, self._counts[key]) for key in self._keys[start:end])
+        results = heapq.nsmallest(
+            limit, matches, key=lambda match: (-match[1], match[0])
+        )
+        if end - start > self.CACHE_MIN_MATCHES:
+            if len(self._cache) >= self.CACHE_SIZE:
+                self._cache.clear()
+            self._cache[(prefix, limit)] = results
+        return results
+
+
+def title_words(title: str | None) -> set[str]:
+    """Return the distinct search tokens of a title that are words."""
+    return {token for token in tokenize(title) if token[0].isalnum()}
+
+
+class CompletionIndex:
+    """Prefix indexes of the tag names and title words of a set of snippets,
+    and a BK-tree of the tag names for spelling suggestions.
+    """
+
+    def __init__(self) -> None:
+        self.tags = PrefixIndex()
+        self.titles = PrefixIndex()
+        self.tag_names = BKTree()
+
+    def add(self, title: str | None, tag_names: Iterable[str]) -> None:
+        for tag_name in tag_names:
+            if tag_name not in self.tags:
+                self.tag_names.add(tag_name)
+            self.tags.add(tag_name)
+        for word in title_words(title):
+            self.titles.add(word)
+
+    def remove(self, title: str | None, tag_names: Iterable[str]) -> None:
+        """Remove a snippet using the title and tag names it was added with."""
+        for tag_name in tag_names:
+            self.tags.discard(tag_name)
+            if tag_name not in self.tags:
+                self.tag_names.remove(tag_name)
+        for word in title_words(title):
+            self.titles.discard(word)
+
+    def complete(
+        self, field: CompletionField, prefix: str, limit: int = 10
+    ) -> list[tuple[str, int]]:
+        """Complete a prefix, normalized the way tag names or title words are."""
+        if field == CompletionField.TAG:
+            return self.tags.complete(TagBase.clean_tag_name(prefix), limit)
+        return self.titles.complete(prefix.strip().casefold(), limit)
+
+    def suggest_tags(
+        self, tag_name: str, max_distance: int | None = None, limit: int = 5
+    ) -> list[tuple[str, int]]:
+        """Suggest tag names in use that are close to an unknown one.
+
+        Args:
+            tag_name (str): tag name, normalized like `Tag.name`
+            max_distance (int | None): largest edit distance to suggest; by
+                default 1 for names of up to 4 characters and 2 for longer ones
+            limit (int): number of suggestions to return
+
+        Returns:
+            list[tuple[str, int]]: names with their snippet counts, closest
+                first, then most used; empty if the name is already in use
+        """
+        tag_name = TagBase.clean_tag_name(tag_name)
+        if not tag_name or tag_name in self.tags:
+            return []
+        if max_distance is None:
+            max_distance = 1 if len(tag_name) <= 4 else 2
+        matches = sorted(
+            self.tag_names.search(tag_name, max_distance),
+            key=lambda match: (match[0], -self.tags.count(match[1]), match[1]),
+        )
+        return [(name, self.tags.count(name)) for _, name in matches[:limit]]
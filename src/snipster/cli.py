@@ -1,19 +1,28 @@
+from pathlib import Path
 from typing import List
 
 import typer
-from decouple import config
 from rich import print
 from rich.console import Group
 from rich.panel import Panel
-from rich.syntax import Syntax
+from rich.table import Table
 from rich.text import Text
-from sqlmodel import create_engine
 from typer import Typer
 from typing_extensions import Annotated
 
-from .exceptions import SnippetNotFoundError
+from .db import create_db_engine
+from .exceptions import (
+    DuplicateSnippetError,
+    InvalidSearchPatternError,
+    InvalidTagQueryError,
+    SearchTimeoutError,
+    SnippetNotFoundError,
+)
+from .export import ExportFormat, export_snippets
+from .highlight import get_highlighter
 from .models import LangEnum, Snippet, SQLModel, Tag
-from .repo import DBSnippetRepository
+from .query import parse_tag_query, tag_names
+from .repo import DBSnippetRepository, DuplicatePolicy, SearchMode
 
 app = Typer()
 
@@ -30,8 +39,8 @@ def generate_panel(snippet: Snippet) -> Panel:
     if snippet.description is not None:
         body_elements.append(Text(snippet.description, style="dim"))
 
-    code_block = Syntax(
-        snippet.code, snippet.language, theme="monokai", line_numbers=False
+    code_block = get_highlighter().syntax(
+        snippet.code, snippet.language, line_numbers=False
     )
     body_elements.append(code_block)
 
@@ -59,10 +68,18 @@ def print_panel(snippet: Snippet) -> None:
     print(panel)
 
 
+def print_tag_suggestions(repo: DBSnippetRepository, names: List[str]) -> None:
+    """Print "did you mean" hints for tag names that no snippet uses."""
+    for name in names:
+        suggestions = repo.suggest_tags(name)
+        if suggestions:
+            hints = " or ".join(f"#{value}" for value, _ in suggestions)
+            print(f"No snippet is tagged #{name}. Did you mean {hints}?")
+
+
 @app.callback()
 def init(ctx: typer.Context):
-    database_url = config("DATABASE_URL", default="sqlite:///snipster.sqlite")
-    engine = create_engine(database_url, echo=False)
+    engine = create_db_engine()
     SQLModel.metadata.create_all(engine)
     ctx.obj = DBSnippetRepository(engine)
 
@@ -76,6 +93,10 @@ def add(
     description: Annotated[
         str | None, typer.Option(help="Brief description of what code does")
     ] = None,
+    duplicates: Annotated[
+        DuplicatePolicy,
+        typer.Option(help="What to do if the code duplicates a stored snippet"),
+    ] = DuplicatePolicy.ALLOW,
 ):
     """Add a code snippet."""
     repo: DBSnippetRepository = ctx.obj
@@ -85,9 +106,18 @@ def add(
         description=description,
         language=language,
     )
-    repo.add(snippet)
-    print(f"Snippet '{snippet.title}' added with ID {snippet.id}.")
-    snippet = repo.get(snippet.id)
+    try:
+        repo.add(snippet, duplicates)
+    except DuplicateSnippetError as e:
+        print(f"Snippet '{snippet.title}' not added: {e}.")
+        raise typer.Exit(code=1)
+    if snippet.id is None:
+        print(f"Snippet '{snippet.title}' merged into snippet {snippet.duplicate_of}.")
+        snippet_id = snippet.duplicate_of
+    else:
+        print(f"Snippet '{snippet.title}' added with ID {snippet.id}.")
+        snippet_id = snippet.id
+    snippet = repo.get(snippet_id)
     print_panel(snippet)
 
 
@@ -140,22 +170,51 @@ def search(
         typer.Argument(help="Text to search title, code, and description of snippets"),
     ],
     ctx: typer.Context,
-    tag: Annotated[str | None, typer.Option(help="Filter results by tag name")] = None,
+    tag: Annotated[
+        str | None,
+        typer.Option(
+            help="Filter results by tag name or expression, "
+            "e.g. '(sql AND perf) OR rust NOT legacy'"
+        ),
+    ] = None,
     language: Annotated[
         LangEnum | None, typer.Option(help="Filter results by language")
     ] = None,
     fuzzy: Annotated[
         bool, typer.Option(help="Perform fuzzy search instead of strict search")
     ] = False,
+    mode: Annotated[
+        SearchMode | None,
+        typer.Option(help="Matching mode; 'ranked' lists the best matches first"),
+    ] = None,
+    regex: Annotated[
+        bool, typer.Option(help="Match the term as a regular expression")
+    ] = False,
+    limit: Annotated[
+        int | None, typer.Option(min=1, help="Maximum number of results")
+    ] = None,
 ):
     """Search for code snippets by title, code, description, tag, or language."""
     repo: DBSnippetRepository = ctx.obj
-    results = repo.search(term, tag_name=tag, language=language, fuzzy=fuzzy)
+    if regex:
+        mode = SearchMode.REGEX
+    try:
+        results = repo.search(
+            term, language=language, fuzzy=fuzzy, tags=tag, mode=mode, limit=limit
+        )
+    except InvalidTagQueryError as e:
+        print(f"Invalid tag filter: {e}")
+        raise typer.Exit(code=1)
+    except (InvalidSearchPatternError, SearchTimeoutError) as e:
+        print(f"Regex search failed: {e}")
+        raise typer.Exit(code=1)
     if results:
         for snippet in results:
             print_panel(snippet)
     else:
         print("No snippets found matching the search criteria.")
+        if tag is not None:
+            print_tag_suggestions(repo, tag_names(parse_tag_query(tag)))
 
 
 @app.command()
@@ -187,9 +246,110 @@ def tag(
     repo: DBSnippetRepository = ctx.obj
     try:
         tag_objs = [Tag(name=tag) for tag in tags]
+        # suggest before tagging, while misspelled names are still unknown
+        print_tag_suggestions(repo, [tag_obj.name for tag_obj in tag_objs])
         repo.tag(snippet_id, *tag_objs, remove=remove)
         snippet = repo.get(snippet_id)
         print_panel(snippet)
     except SnippetNotFoundError:
         print(f"Snippet {snippet_id} not found.")
         raise typer.Exit(code=1)
+
+
+@app.command()
+def stats(
+    ctx: typer.Context,
+    term: Annotated[
+        str | None, typer.Option(help="Only count snippets matching this search term")
+    ] = None,
+):
+    """Show snippet counts per language, tag, and favorite status."""
+    repo: DBSnippetRepository = ctx.obj
+    facets = repo.facets(term)
+    if facets.total == 0:
+        print("No snippets found.")
+        return
+
+    table = Table(title=f"{facets.total} snippets, {facets.favorites} favorites")
+    table.add_column("Facet", style="cyan")
+    table.add_column("Value")
+    table.add_column("Snippets", justify="right")
+    for language, count in facets.languages.items():
+        table.add_row("language", language.value, str(count))
+    for tag_name, count in facets.tags.items():
+        table.add_row("tag", f"#{tag_name}", str(count))
+    print(table)
+
+
+@app.command()
+def dedupe(
+    ctx: typer.Context,
+    dry_run: Annotated[
+        bool, typer.Option("--dry-run", help="Show duplicates without merging them")
+    ] = False,
+):
+    """Merge snippets with the same code and language into the oldest copy."""
+    repo: DBSnippetRepository = ctx.obj
+    merged = repo.dedupe(dry_run=dry_run)
+    if not merged:
+        print("No duplicate snippets found.")
+        return
+
+    action = "Would merge" if dry_run else "Merged"
+    kept = len(set(merged.values()))
+    print(f"{action} {len(merged)} duplicates into {kept} snippets.")
+    table = Table()
+    table.add_column("Duplicate", justify="right")
+    table.add_column("Kept", justify="right")
+    for duplicate_id, kept_id in merged.items():
+        table.add_row(str(duplicate_id), str(kept_id))
+    print(table)
+
+
+@app.command()
+def near_dupes(
+    ctx: typer.Context,
+    threshold: Annotated[
+        float,
+        typer.Option(min=0, max=1, help="Minimum estimated similarity, from 0 to 1"),
+    ] = 0.8,
+):
+    """List pairs of snippets with similar code."""
+    repo: DBSnippetRepository = ctx.obj
+    pairs = repo.near_duplicates(threshold)
+    if not pairs:
+        print("No near-duplicate snippets found.")
+        return
+
+    ids = {snippet_id for first, second, _ in pairs for snippet_id in (first, second)}
+    titles = {snippet.id: snippet.title for snippet in repo.get_many(sorted(ids))}
+    table = Table(title=f"{len(pairs)} near-duplicate pairs")
+    table.add_column("Snippet")
+    table.add_column("Similar to")
+    table.add_column("Similarity", justify="right")
+    for first, second, score in pairs:
+        table.add_row(
+            f"{first}: {titles[first]}", f"{second}: {titles[second]}", f"{score:.0%}"
+        )
+    print(table)
+
+
+@app.command()
+def export(
+    output: Annotated[Path, typer.Argument(help="File to write", dir_okay=False)],
+    ctx: typer.Context,
+    format: Annotated[
+        ExportFormat, typer.Option(help="Parquet file or Arrow IPC stream")
+    ] = ExportFormat.PARQUET,
+    batch_size: Annotated[
+        int, typer.Option(min=1, help="Snippets read and written at a time")
+    ] = 1000,
+):
+    """Export all snippets to a columnar file for analytics."""
+    repo: DBSnippetRepository = ctx.obj
+    try:
+        count = export_snippets(repo, output, format, batch_size)
+    except ValueError as e:
+        print(f"{e}.")
+        raise typer.Exit(code=1)
+    print(f"Exported {count} snippets to {output}.")
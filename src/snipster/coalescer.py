@@ -0,0 +1,154 @@
+"""Group commit for snippet writes to the database.
+
+Every write is its own transaction by default, and SQLite runs them one at a
+time, each waiting for its own sync to disk. A `WriteCoalescer` lets writes
+arriving within a short window share one: the first writer of a batch waits
+for the window to pass, or for the batch to fill, then commits every snippet
+of the batch at once and wakes the others. Each writer returns once the shared
+commit lands, or raises its own error.
+
+If the batch fails to commit, its writes are retried one transaction each, so
+one bad write doesn't fail the writes it was batched with.
+"""
+
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Sequence
+
+from sqlalchemy import Engine
+from sqlmodel import Session
+
+from .models import Snippet, WriteStats
+
+
+@dataclass
+class _Write:
+    snippet: Snippet
+    done: threading.Event = field(default_factory=threading.Event)
+    error: Exception | None = None
+
+
+class WriteCoalescer:
+    """Batches snippet writes into shared transactions.
+
+    Args:
+        engine (Engine): engine of the database written to
+        window (float): seconds the first write of a batch waits for others
+        max_batch (int): writes in a batch that commit without waiting further
+    """
+
+    def __init__(self, engine: Engine, window: float = 0.002, max_batch: int = 100):
+        self._engine = engine
+        self.window = window
+        self.max_batch = max_batch
+        self._lock = threading.Lock()
+        self._pending: list[_Write] = []
+        self._full = threading.Event()
+        # totals behind `stats`
+        self._batches = 0
+        self._writes = 0
+        self._failed_batches = 0
+        self._max_batch_size = 0
+        self._commit_seconds = 0.0
+        self._max_commit_seconds = 0.0
+
+    def store(self, snippet: Snippet) -> None:
+        """Write a snippet in the next batch and wait for its commit.
+        The snippet is refreshed from the database afterwards, as with a
+        transaction of its own.
+        """
+        write = _Write(snippet)
+        with self._lock:
+            self._pending.append(write)
+            leader = len(self._pending) == 1
+            if len(self._pending) >= self.max_batch:
+                self._full.set()
+        if leader:
+            self._full.wait(self.window)
+            with self._lock:
+                batch, self._pending = self._pending, []
+                self._full.clear()
+            try:
+                self._commit(batch)
+            finally:
+                for pending in batch:
+                    pending.done.set()
+        else:
+            write.done.wait()
+        if write.error is not None:
+            raise write.error
+
+    def _commit(self, batch: Sequence[_Write]) -> None:
+        start = time.perf_counter()
+        # a snippet written twice in a batch can't join the same session twice,
+        # and neither can two copies of it, so repeats commit on their own after
+        shared, repeats, seen_ids = [], [], set()
+        for write in batch:
+            snippet_id = write.snippet.id
+            if snippet_id is not None and snippet_id in seen_ids:
+                repeats.append(write)
+            else:
+                seen_ids.add(snippet_id)
+                shared.append(write)
+        self._share_new_tags(shared)
+
+        failed = False
+        try:
+            self._commit_session(shared)
+        except Exception:
+            failed = True
+            for write in shared:
+                self._commit_alone(write)
+        for write in repeats:
+            self._commit_alone(write)
+
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self._batches += 1
+            self._writes += len(batch)
+            self._failed_batches += failed
+            self._max_batch_size = max(self._max_batch_size, len(batch))
+            self._commit_seconds += elapsed
+            self._max_commit_seconds = max(self._max_commit_seconds, elapsed)
+
+    @staticmethod
+    def _share_new_tags(batch: Sequence[_Write]) -> None:
+        """Give snippets tagged with the same new name the same `Tag` object,
+        so the batch inserts one row for it instead of two conflicting ones.
+        """
+        new_tags = {}
+        for write in batch:
+            tags = write.snippet.tags
+            if any(tag.id is None for tag in tags):
+                write.snippet.tags = [
+                    new_tags.setdefault(tag.name, tag) if tag.id is None else tag
+                    for tag in tags
+                ]
+
+    def _commit_session(self, batch: Sequence[_Write]) -> None:
+        with Session(self._engine) as session:
+            session.add_all([write.snippet for write in batch])
+            session.commit()
+            for write in batch:
+                session.refresh(write.snippet)
+
+    def _commit_alone(self, write: _Write) -> None:
+        try:
+            self._commit_session([write])
+        except Exception as e:
+            write.error = e
+
+    def stats(self) -> WriteStats:
+        """Return batch sizes and commit latencies since the coalescer started."""
+        with self._lock:
+            batches = max(self._batches, 1)  # the means are 0 before any batch
+            return WriteStats(
+                batches=self._batches,
+                writes=self._writes,
+                failed_batches=self._failed_batches,
+                mean_batch_size=self._writes / batches,
+                max_batch_size=self._max_batch_size,
+                mean_commit_ms=self._commit_seconds / batches * 1000,
+                max_commit_ms=self._max_commit_seconds * 1000,
+            )
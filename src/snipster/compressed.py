@@ -0,0 +1,150 @@
+import base64
+import zlib
+from enum import StrEnum
+from functools import cache
+
+from decouple import config
+from sqlalchemy.types import LargeBinary, TypeDecorator
+
+try:
+    from compression import zstd  # Python 3.14+
+except ImportError:  # pragma: no cover
+    try:
+        import zstandard as zstd
+    except ImportError:
+        zstd = None
+
+# every zstd frame starts with these bytes; zlib streams never do
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+
+def _has_zlib_header(data: bytes) -> bool:
+    # a deflate method byte, and a check byte making the pair a multiple of 31
+    return len(data) >= 2 and data[0] & 0x0F == 8 and (data[0] << 8 | data[1]) % 31 == 0
+
+
+class Codec(StrEnum):
+    OFF = "off"
+    ZLIB = "zlib"
+    ZSTD = "zstd"
+
+
+class TextCompressor:
+    """Compresses large text fields for storage.
+    Text shorter than `min_size` bytes, or that doesn't shrink, is kept as it
+    is, so only large bodies pay for decompression. Compressed values are bytes
+    and identify their codec, so they can be read whatever the current setting.
+    """
+
+    def __init__(self, codec: Codec = Codec.ZLIB, min_size: int = 4096) -> None:
+        self.codec = Codec(codec)
+        self.min_size = min_size
+        if self.codec == Codec.ZSTD and zstd is None:
+            raise ValueError(
+                "zstd compression needs Python 3.14+ or the zstandard package"
+            )
+
+    def is_large(self, text: str | None) -> bool:
+        """Check whether text is long enough to be compressed, if it shrinks."""
+        return (
+            text is not None
+            and self.codec != Codec.OFF
+            and len(text) * 4 >= self.min_size  # cheap bound before encoding
+            and len(text.encode()) >= self.min_size
+        )
+
+    def compress(self, text: str | None) -> str | bytes | None:
+        if not self.is_large(text):
+            return text
+        data = text.encode()
+        if self.codec == Codec.ZSTD:
+            compressed = zstd.compress(data, level=3)
+        else:
+            compressed = zlib.compress(data, 6)
+        return compressed if len(compressed) < len(data) else text
+
+    @staticmethod
+    def decompress(value: str | bytes | None) -> str | None:
+        if not isinstance(value, bytes):
+            return value
+        if value.startswith(ZSTD_MAGIC):
+            if zstd is None:
+                raise ValueError(
+                    "Reading zstd compressed text needs Python 3.14+ "
+                    "or the zstandard package"
+                )
+            return zstd.decompress(value).decode()
+        return zlib.decompress(value).decode()
+
+
+def pack_text(value: str | bytes | None) -> str | dict | None:
+    """Make a value returned by `TextCompressor.compress` JSON serializable.
+    Compressed bytes become a dictionary naming the codec, plain text is kept.
+    """
+    if not isinstance(value, bytes):
+        return value
+    codec = Codec.ZSTD if value.startswith(ZSTD_MAGIC) else Codec.ZLIB
+    return {"codec": codec, "data": base64.b64encode(value).decode("ascii")}
+
+
+def unpack_text(value: str | dict | None) -> str | None:
+    """Return the text of a value packed with `pack_text`."""
+    if not isinstance(value, dict):
+        return value
+    return TextCompressor.decompress(base64.b64decode(value["data"]))
+
+
+@cache
+def get_compressor() -> TextCompressor:
+    """Return the process-wide compressor for snippet text.
+    `SNIPSTER_COMPRESSION` picks the codec (`off`, `zlib` or `zstd`) and
+    `SNIPSTER_COMPRESS_MIN_SIZE` the size in bytes from which text is compressed.
+    """
+    return TextCompressor(
+        codec=config("SNIPSTER_COMPRESSION", default=Codec.OFF),
+        min_size=config("SNIPSTER_COMPRESS_MIN_SIZE", default=4096, cast=int),
+    )
+
+
+def decode_stored(data: bytes | None) -> str | None:
+    """Return the text of a binary column value, compressed or plain UTF-8.
+
+    Plain text never starts like a zstd frame, as its second byte would be a
+    UTF-8 continuation byte after an ASCII one. Text starting like a zlib
+    stream, such as `x^`, fails to decompress and is decoded instead.
+    """
+    if data is None:
+        return None
+    if data.startswith(ZSTD_MAGIC):
+        return TextCompressor.decompress(data)
+    if _has_zlib_header(data):
+        try:
+            return zlib.decompress(data).decode()
+        except (zlib.error, UnicodeDecodeError):
+            pass
+    return data.decode()
+
+
+class CompressedText(TypeDecorator):
+    """A text column whose large values are stored compressed.
+
+    The column is binary on every backend: plain values are stored as UTF-8
+    and compressed ones as the codec's output, which `decode_stored` tells
+    apart. Existing rows are compressed when next written. Values are
+    decompressed as rows are loaded, so columns left unloaded, like code in a
+    sparse listing, are never decompressed.
+
+    Large text has no stored normalized copy, such as `code_norm`, as an
+    uncompressed copy would take more space than compression saves; searches
+    normalize it when they need it. See `models.normalize_stored`.
+    """
+
+    impl = LargeBinary
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        value = get_compressor().compress(value)
+        return value.encode() if isinstance(value, str) else value
+
+    def process_result_value(self, value, dialect):
+        return decode_stored(value)
@@ -0,0 +1,106 @@
+"""Engine setup shared by the API, the CLI, the seed script and migrations.
+
+SQLite's defaults don't suit a server. Its rollback journal blocks readers
+while a write commits, every commit waits for a full sync to disk, and a busy
+database fails at once instead of waiting for the lock. Each new SQLite
+connection gets the pragmas in `SQLITE_PRAGMAS` instead, which switch to WAL
+so readers and a writer don't block each other. Each pragma can be overridden
+with a `SNIPSTER_SQLITE_<PRAGMA>` setting, and an empty value keeps SQLite's
+own default. Connection pools are sized with `SNIPSTER_DB_<OPTION>` settings
+for the options in `POOL_OPTIONS`.
+"""
+
+import re
+
+from decouple import config
+from sqlalchemy import Engine, event
+from sqlalchemy.engine import make_url
+from sqlmodel import create_engine
+
+DEFAULT_DATABASE_URL = "sqlite:///snipster.sqlite"
+
+SQLITE_PRAGMAS = {
+    "journal_mode": "wal",
+    # with WAL, a crash may lose the last commits but can't corrupt the file
+    "synchronous": "normal",
+    "cache_size": "-65536",  # KiB when negative
+    "mmap_size": "268435456",
+    "temp_store": "memory",
+    "busy_timeout": "5000",
+    "foreign_keys": "on",
+}
+
+POOL_OPTIONS = {
+    "pool_size": 5,
+    "max_overflow": 10,
+    "pool_timeout": 30,
+    "pool_recycle": -1,
+}
+
+_PRAGMA_VALUE = re.compile(r"-?\w+")
+
+
+def sqlite_pragmas() -> dict[str, str]:
+    """Return the pragmas to set on SQLite connections, with environment
+    overrides applied and empty ones left out.
+
+    Raises:
+        ValueError: if a value is not a plain word or number
+    """
+    pragmas = {}
+    for name, default in SQLITE_PRAGMAS.items():
+        value = config(f"SNIPSTER_SQLITE_{name.upper()}", default=default).strip()
+        if not value:
+            continue
+        if not _PRAGMA_VALUE.fullmatch(value):
+            raise ValueError(f"Invalid value '{value}' for SQLite pragma {name}")
+        pragmas[name] = value
+    return pragmas
+
+
+def pool_options() -> dict[str, int]:
+    """Return the connection pool settings, with environment overrides applied."""
+    return {
+        name: config(f"SNIPSTER_DB_{name.upper()}", default=default, cast=int)
+        for name, default in POOL_OPTIONS.items()
+    }
+
+
+def _set_pragmas(pragmas: dict[str, str]):
+    def listener(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name} = {value}")
+        cursor.close()
+
+    return listener
+
+
+def create_db_engine(
+    database_url: str | None = None, echo: bool = False, **kwargs
+) -> Engine:
+    """Create an engine with tuned pragmas for SQLite and a sized pool.
+
+    Args:
+        database_url (str | None): database to connect to; defaults to the
+            `DATABASE_URL` setting
+        echo (bool): log SQL statements
+        **kwargs: further `create_engine` arguments; a `poolclass` replaces
+            the pool settings
+
+    Returns:
+        Engine: engine for the database
+    """
+    if database_url is None:
+        database_url = config("DATABASE_URL", default=DEFAULT_DATABASE_URL)
+    url = make_url(database_url)
+    is_sqlite = url.get_backend_name() == "sqlite"
+    # in-memory SQLite databases live in a single connection, so keep the
+    # pool SQLAlchemy picks for them
+    in_memory = is_sqlite and url.database in (None, "", ":memory:")
+    if "poolclass" not in kwargs and not in_memory:
+        kwargs = {**pool_options(), **kwargs}
+    engine = create_engine(url, echo=echo, **kwargs)
+    if is_sqlite:
+        event.listen(engine, "connect", _set_pragmas(sqlite_pragmas()))
+    return engine
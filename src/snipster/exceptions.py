@@ -1,2 +1,28 @@
 class SnippetNotFoundError(Exception):
     pass
+
+
+class InvalidTagQueryError(ValueError):
+    pass
+
+
+class InvalidFieldsError(ValueError):
+    pass
+
+
+class DuplicateSnippetError(Exception):
+    def __init__(self, existing_id: int) -> None:
+        super().__init__(f"Snippet duplicates snippet with ID {existing_id}")
+        self.existing_id = existing_id
+
+
+class InvalidSearchPatternError(ValueError):
+    pass
+
+
+class SearchTimeoutError(Exception):
+    pass
+
+
+class InvalidSnapshotError(Exception):
+    pass
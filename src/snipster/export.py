@@ -0,0 +1,209 @@
+"""Columnar export of snippets for analytics, as Parquet or Arrow IPC streams.
+
+Snippets are read from a repository a batch at a time and each batch becomes
+one Arrow record batch, so memory use depends on the batch size rather than on
+the number of snippets. Languages and tag names repeat a lot, so both are
+dictionary encoded: each value is stored once per batch and rows hold small
+integer indexes to it. Parquet files are also compressed with zstd.
+
+Exports need the `pyarrow` package, installed with the `export` extra.
+"""
+
+from enum import StrEnum
+from pathlib import Path
+from typing import IO, Iterator, Sequence
+
+from .models import LangEnum, Snippet
+from .repo import SnippetRepository
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover
+    pa = pq = None
+
+
+class ExportFormat(StrEnum):
+    PARQUET = "parquet"
+    ARROW = "arrow"  # Arrow IPC stream
+
+
+MEDIA_TYPES = {
+    ExportFormat.PARQUET: "application/vnd.apache.parquet",
+    ExportFormat.ARROW: "application/vnd.apache.arrow.stream",
+}
+
+# fields loaded for export; normalized copies and signatures are left unloaded
+EXPORT_FIELDS = (
+    "id",
+    "title",
+    "code",
+    "description",
+    "language",
+    "favorite",
+    "created_at",
+    "updated_at",
+    "content_hash",
+    "duplicate_of",
+    "tags",
+)
+
+_LANGUAGES = [language.value for language in LangEnum]
+_LANGUAGE_INDEXES = {language: index for index, language in enumerate(LangEnum)}
+
+
+def _require_pyarrow() -> None:
+    if pa is None:
+        raise ValueError("Exporting snippets needs the pyarrow package")
+
+
+def export_schema() -> "pa.Schema":
+    """Return the Arrow schema of exported snippets."""
+    _require_pyarrow()
+    return pa.schema(
+        [
+            pa.field("id", pa.int64(), nullable=False),
+            pa.field("title", pa.string(), nullable=False),
+            pa.field("code", pa.string(), nullable=False),
+            pa.field("description", pa.string()),
+            pa.field("language", pa.dictionary(pa.int8(), pa.string()), nullable=False),
+            pa.field("favorite", pa.bool_(), nullable=False),
+            pa.field("created_at", pa.timestamp("us", tz="UTC"), nullable=False),
+            pa.field("updated_at", pa.timestamp("us", tz="UTC")),
+            pa.field("content_hash", pa.string(), nullable=False),
+            pa.field("duplicate_of", pa.int64()),
+            pa.field(
+                "tags", pa.list_(pa.dictionary(pa.int32(), pa.string())), nullable=False
+            ),
+        ]
+    )
+
+
+def record_batch(snippets: Sequence[Snippet], schema: "pa.Schema") -> "pa.RecordBatch":
+    """Convert snippets to a record batch of `export_schema`."""
+    # every batch shares the dictionary of all languages, so language indexes
+    # mean the same in every batch
+    languages = pa.DictionaryArray.from_arrays(
+        pa.array(
+            [_LANGUAGE_INDEXES[snippet.language] for snippet in snippets], pa.int8()
+        ),
+        pa.array(_LANGUAGES, pa.string()),
+    )
+    tag_names = [[tag.name for tag in snippet.tags] for snippet in snippets]
+    tag_offsets = [0]
+    for names in tag_names:
+        tag_offsets.append(tag_offsets[-1] + len(names))
+    tags = pa.ListArray.from_arrays(
+        pa.array(tag_offsets, pa.int32()),
+        pa.array(
+            [name for names in tag_names for name in names], pa.string()
+        ).dictionary_encode(),
+    )
+    columns = {
+        name: pa.array(
+            [getattr(snippet, name) for snippet in snippets], schema.field(name).type
+        )
+        for name in schema.names
+        if name not in ("language", "tags")
+    }
+    columns["language"] = languages
+    columns["tags"] = tags
+    return pa.RecordBatch.from_arrays(
+        [columns[name] for name in schema.names], schema=schema
+    )
+
+
+def _open_writer(sink, schema: "pa.Schema", format: ExportFormat):
+    if format == ExportFormat.PARQUET:
+        return pq.ParquetWriter(sink, schema, compression="zstd")
+    return pa.ipc.new_stream(sink, schema)
+
+
+def export_snippets(
+    repo: SnippetRepository,
+    sink: str | Path | IO[bytes],
+    format: ExportFormat = ExportFormat.PARQUET,
+    batch_size: int = 1000,
+) -> int:
+    """Write every snippet to a Parquet file or Arrow IPC stream.
+
+    Args:
+        repo (SnippetRepository): repository to export
+        sink (str | Path | IO[bytes]): file path or binary file to write to
+        format (ExportFormat): file format
+        batch_size (int): snippets read and written at a time; each one becomes
+            a Parquet row group or an Arrow record batch
+
+    Returns:
+        int: number of snippets written
+
+    Raises:
+        ValueError: if pyarrow is not installed
+    """
+    _require_pyarrow()
+    if isinstance(sink, Path):
+        sink = str(sink)
+    schema = export_schema()
+    count = 0
+    with _open_writer(sink, schema, format) as writer:
+        for snippets in repo.batches(batch_size, EXPORT_FIELDS):
+            writer.write_batch(record_batch(snippets, schema))
+            count += len(snippets)
+    return count
+
+
+class _ChunkSink:
+    """Write-only file that hands out what was written since the last take."""
+
+    def __init__(self) -> None:
+        self._chunks: list[bytes] = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+    def take(self) -> bytes:
+        data, self._chunks = b"".join(self._chunks), []
+        return data
+
+
+def iter_export(
+    repo: SnippetRepository,
+    format: ExportFormat = ExportFormat.PARQUET,
+    batch_size: int = 1000,
+) -> Iterator[bytes]:
+    """Export like `export_snippets`, yielding the output as it is written,
+    about a batch at a time, for streaming responses.
+
+    Raises:
+        ValueError: if pyarrow is not installed, when called
+    """
+    _require_pyarrow()
+    return _iter_export(repo, format, batch_size)
+
+
+def _iter_export(
+    repo: SnippetRepository, format: ExportFormat, batch_size: int
+) -> Iterator[bytes]:
+    sink = _ChunkSink()
+    schema = export_schema()
+    with _open_writer(sink, schema, format) as writer:
+        for snippets in repo.batches(batch_size, EXPORT_FIELDS):
+            writer.write_batch(record_batch(snippets, schema))
+            data = sink.take()
+            if data:
+                yield data
+    yield sink.take()
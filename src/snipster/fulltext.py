@@ -0,0 +1,268 @@
+"""BM25 ranked full-text search over snippet titles, descriptions, code and tags.
+
+Text is split into code-aware tokens: identifiers are kept whole and also
+split at underscores and case changes, so `getUserId` matches `user`, and
+multi-character operators such as `::` or `->>` are kept as tokens of their
+own. Each field has a weight, and documents are scored with BM25F: weighted
+term frequencies, normalized by field length, are summed before saturating.
+
+Top results are found with WAND. Each term keeps an upper bound of its score,
+and documents whose terms can't add up to the current k-th best score are
+skipped without being scored.
+"""
+
+import heapq
+import math
+import re
+from bisect import bisect_left, insort
+from collections import Counter
+from typing import AbstractSet, Iterable, Iterator
+
+FIELDS = ("title", "description", "code", "tags")
+FIELD_WEIGHTS = (3.0, 1.5, 1.0, 2.0)
+K1 = 1.2
+B = 0.75
+# term bounds are rebuilt once average field lengths drift this far from the
+# averages they were computed with; until then they are scaled up to stay valid
+BOUND_DRIFT = 1.25
+
+_OPERATORS = (
+    "->>", "#>>", "!~*", "...", "::", "->", "#>", "<>", "!=", ">=", "<=", "||",
+    ":=", "=>", "@>", "<@", "&&", "~*", "!~", "==", "**", "//", "<<", ">>",
+)  # fmt: skip
+_TOKEN = re.compile("|".join(re.escape(op) for op in _OPERATORS) + r"|\w+")
+_WORD_PART = re.compile(r"[A-Z]+(?![a-z])|[A-Z]?[a-z]+|[^\W\d_]+|\d+")
+
+
+def tokenize(text: str | None) -> Iterator[str]:
+    """Split text into case-folded search tokens.
+    Identifiers yield themselves and, when compound, each of their parts:
+    `get_user_id` yields `get_user_id`, `get`, `user` and `id`.
+    """
+    for match in _TOKEN.finditer(text or ""):
+        token = match.group()
+        yield token.casefold()
+        if not token[0].isalnum() and token[0] != "_":
+            continue  # an operator
+        parts = [
+            part for chunk in token.split("_") for part in _WORD_PART.findall(chunk)
+        ]
+        if len(parts) > 1:
+            for part in parts:
+                yield part.casefold()
+
+
+class BM25Index:
+    """Inverted index of snippet text, scored with BM25F.
+    Postings are ascending lists of document IDs, with the per-field term
+    frequencies of each document kept alongside for scoring.
+    """
+
+    def __init__(self) -> None:
+        self._postings: dict[str, list[int]] = {}
+        self._frequencies: dict[str, dict[int, tuple[int, ...]]] = {}
+        self._lengths: dict[int, tuple[int, ...]] = {}
+        self._terms: dict[int, tuple[str, ...]] = {}
+        self._total_lengths = [0] * len(FIELDS)
+        # upper bounds of each term's weighted frequency, as of `_bound_averages`
+        self._bounds: dict[str, float] = {}
+        self._bound_averages: tuple[float, ...] | None = None
+
+    def __len__(self) -> int:
+        return len(self._lengths)
+
+    def __contains__(self, doc_id: int) -> bool:
+        return doc_id in self._lengths
+
+    def _averages(self) -> tuple[float, ...]:
+        count = len(self._lengths) or 1
+        return tuple(total / count for total in self._total_lengths)
+
+    @staticmethod
+    def _weighted_frequency(
+        frequencies: tuple[int, ...],
+        lengths: tuple[int, ...],
+        averages: tuple[float, ...],
+    ) -> float:
+        total = 0.0
+        for weight, frequency, length, average in zip(
+            FIELD_WEIGHTS, frequencies, lengths, averages
+        ):
+            if frequency:
+                norm = 1 - B + B * length / average if average else 1.0
+                total += weight * frequency / norm
+        return total
+
+    def add(
+        self,
+        doc_id: int,
+        title: str | None = None,
+        description: str | None = None,
+        code: str | None = None,
+        tags: Iterable[str] = (),
+    ) -> None:
+        """Index a document. An indexed document must be removed first."""
+        counters = [
+            Counter(tokenize(text))
+            for text in (title, description, code, " ".join(tags))
+        ]
+        lengths = tuple(counter.total() for counter in counters)
+        self._lengths[doc_id] = lengths
+        for i, length in enumerate(lengths):
+            self._total_lengths[i] += length
+
+        terms = tuple(set().union(*counters))
+        self._terms[doc_id] = terms
+        for term in terms:
+            frequencies = tuple(counter[term] for counter in counters)
+            postings = self._postings.get(term)
+            if postings is None:
+                self._postings[term] = [doc_id]
+                self._frequencies[term] = {doc_id: frequencies}
+            else:
+                if doc_id > postings[-1]:
+                    postings.append(doc_id)  # the common case, IDs grow
+                else:
+                    insort(postings, doc_id)
+                self._frequencies[term][doc_id] = frequencies
+            if self._bound_averages is not None:
+                frequency = self._weighted_frequency(
+                    frequencies, lengths, self._bound_averages
+                )
+                if frequency > self._bounds.get(term, 0.0):
+                    self._bounds[term] = frequency
+
+    def remove(self, doc_id: int) -> None:
+        """Remove a document, if it is indexed.
+        Term bounds are left as they are; they may be loose but stay valid.
+        """
+        lengths = self._lengths.pop(doc_id, None)
+        if lengths is None:
+            return
+        for i, length in enumerate(lengths):
+            self._total_lengths[i] -= length
+        for term in self._terms.pop(doc_id):
+            postings = self._postings[term]
+            del postings[bisect_left(postings, doc_id)]
+            del self._frequencies[term][doc_id]
+            if not postings:
+                del self._postings[term]
+                del self._frequencies[term]
+                self._bounds.pop(term, None)
+
+    def _refresh_bounds(self) -> float:
+        """Rebuild the term bounds if average lengths drifted too far, and
+        return the factor by which the current bounds must be scaled up.
+        Longer averages shorten the length norm of every document by at most
+        the ratio of the averages, so scaling by the largest ratio keeps the
+        bounds above any weighted frequency.
+        """
+        averages = self._averages()
+        if self._bound_averages is not None:
+            ratios = [
+                current / previous if previous else math.inf
+                for current, previous in zip(averages, self._bound_averages)
+                if current
+            ]
+            scale = max(ratios, default=1.0)
+            if scale <= BOUND_DRIFT and min(ratios, default=1.0) >= 1 / BOUND_DRIFT:
+                return max(scale, 1.0)
+
+        self._bounds = {
+            term: max(
+                self._weighted_frequency(frequencies, self._lengths[doc_id], averages)
+                for doc_id, frequencies in docs.items()
+            )
+            for term, docs in self._frequencies.items()
+        }
+        self._bound_averages = averages
+        return 1.0
+
+    def _idf(self, term: str) -> float:
+        count = len(self._postings[term])
+        return math.log(1 + (len(self._lengths) - count + 0.5) / (count + 0.5))
+
+    @staticmethod
+    def _saturate(frequency: float) -> float:
+        return frequency * (K1 + 1) / (frequency + K1)
+
+    def search(
+        self,
+        query: str,
+        limit: int | None = None,
+        within: AbstractSet[int] | None = None,
+    ) -> list[tuple[int, float]]:
+        """Find the documents best matching any query token.
+
+        Args:
+            query (str): search text, tokenized like the documents
+            limit (int | None): number of results to return, or None for all
+            within (AbstractSet[int] | None): only consider these document IDs
+
+        Returns:
+            list[tuple[int, float]]: document IDs and scores, best first, with
+                ties in ascending ID order
+        """
+        terms = [
+            term for term in dict.fromkeys(tokenize(query)) if term in self._postings
+        ]
+        if not terms or limit == 0:
+            return []
+        scale = self._refresh_bounds()
+        averages = self._averages()
+
+        # a cursor is [current doc ID, position, postings, frequencies, idf, bound]
+        cursors = []
+        for term in terms:
+            postings, idf = self._postings[term], self._idf(term)
+            bound = idf * self._saturate(self._bounds[term] * scale)
+            cursors.append(
+                [postings[0], 0, postings, self._frequencies[term], idf, bound]
+            )
+
+        top: list[tuple[float, int]] = []  # min-heap of (score, -doc ID)
+        while cursors:
+            cursors.sort(key=lambda cursor: cursor[0])
+            threshold = top[0][0] if limit is not None and len(top) == limit else 0.0
+            # the pivot is the first document whose preceding bounds could beat
+            # the threshold; no document before it can make the top results
+            upper = 0.0
+            for pivot, cursor in enumerate(cursors):
+                upper += cursor[5]
+                if upper > threshold:
+                    break
+            else:
+                break
+            doc_id = cursors[pivot][0]
+
+            if cursors[0][0] == doc_id:
+                if within is None or doc_id in within:
+                    lengths = self._lengths[doc_id]
+                    score = sum(
+                        cursor[4]
+                        * self._saturate(
+                            self._weighted_frequency(
+                                cursor[3][doc_id], lengths, averages
+                            )
+                        )
+                        for cursor in cursors
+                        if cursor[0] == doc_id
+                    )
+                    if limit is None or len(top) < limit:
+                        heapq.heappush(top, (score, -doc_id))
+                    elif score > threshold:
+                        heapq.heapreplace(top, (score, -doc_id))
+                advance = [cursor for cursor in cursors if cursor[0] == doc_id]
+                target = doc_id + 1
+            else:
+                advance = cursors[:pivot]
+                target = doc_id
+
+            for cursor in advance:
+                postings = cursor[2]
+                cursor[1] = bisect_left(postings, target, cursor[1])
+                if cursor[1] < len(postings):
+                    cursor[0] = postings[cursor[1]]
+            cursors = [cursor for cursor in cursors if cursor[1] < len(cursor[2])]
+
+        return [(-neg_id, score) for score, neg_id in sorted(top, reverse=True)]
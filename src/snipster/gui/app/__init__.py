@@ -1,12 +1,22 @@
 from flask import Flask
+from markupsafe import Markup
+
+from snipster.highlight import get_highlighter
+from snipster.models import LangEnum
 
 from .config import Config
 from .routes import main_bp
 
 
+def highlight_code(code: str, language: str) -> Markup:
+    """Jinja filter that renders snippet code as highlighted HTML."""
+    return Markup(get_highlighter().html(code, LangEnum(language)))
+
+
 def create_app():
     app = Flask(__name__)
     app.config.from_object(Config)
     app.register_blueprint(main_bp)
+    app.add_template_filter(highlight_code, name="highlight")
 
     return app
@@ -124,6 +124,13 @@ def tag_snippet(snippet_id: int):
             tags_to_remove = list(current_tags - input_tags)
 
             try:
+                for tag_name in tags_to_add:
+                    suggestions = call_api(
+                        "tags/suggestions", method="GET", params={"name": tag_name}
+                    )
+                    if suggestions:
+                        hints = " or ".join(s["value"] for s in suggestions)
+                        flash(f"New tag '{tag_name}'. Did you mean {hints}?")
                 if tags_to_add:
                     call_api(
                         f"snippets/{snippet_id}/tags",
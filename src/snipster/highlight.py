@@ -0,0 +1,381 @@
+import hashlib
+import json
+import os
+import tempfile
+from collections import OrderedDict
+from functools import cache, partial
+from pathlib import Path
+from typing import Callable, Iterable, TypeVar
+
+import pygments
+from decouple import config
+from pygments.formatters import HtmlFormatter
+from pygments.lexer import Lexer
+from pygments.lexers import get_lexer_by_name
+from pygments.token import _TokenType, string_to_tokentype
+from rich.style import Style
+from rich.syntax import Syntax
+from rich.text import Span, Text
+
+from .models import LangEnum
+
+Tokens = tuple[tuple[_TokenType, str], ...]
+T = TypeVar("T")
+
+CLI_THEME = "monokai"
+HTML_STYLE = "default"
+
+
+@cache
+def get_lexer(language: LangEnum) -> Lexer:
+    """Return the shared Pygments lexer for a language.
+    Lexer construction does a registry lookup, so one instance is kept per `LangEnum`.
+    Options mirror what `rich.syntax.Syntax` uses so cached tokens render identically.
+    """
+    return get_lexer_by_name(language.value, stripnl=False, ensurenl=True, tabsize=4)
+
+
+def content_hash(code: str, language: LangEnum) -> str:
+    """Hash code and language into a cache key.
+    The Pygments version is mixed in so an upgrade never serves stale tokens.
+    """
+    digest = hashlib.sha256()
+    for part in (pygments.__version__, language.value, code):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class _LRUCache:
+    """Bounded in-memory cache that evicts the least recently used entry."""
+
+    def __init__(self, max_entries: int) -> None:
+        self._max_entries = max_entries
+        self._data: OrderedDict[str, object] = OrderedDict()
+
+    def get(self, key: str) -> object | None:
+        value = self._data.get(key)
+        if value is not None:
+            self._data.move_to_end(key)
+        return value
+
+    def put(self, key: str, value: object) -> None:
+        self._data[key] = value
+        self._data.move_to_end(key)
+        while len(self._data) > self._max_entries:
+            self._data.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class _DiskCache:
+    """Bounded on-disk cache with one file per entry.
+    Reads refresh a file's mtime, so pruning by oldest mtime evicts least recently
+    used entries. The number of entries is tracked as files are added, so the
+    directory is only listed when it goes over the limit, and pruning then leaves
+    room for a tenth more entries before the next listing.
+
+    Several processes may share the directory, so entries can vanish between any
+    two steps: missing or empty entries read as misses, and writes go through
+    uniquely named temporary files.
+    """
+
+    def __init__(self, directory: Path, max_entries: int) -> None:
+        self._directory = directory
+        self._max_entries = max_entries
+        self._directory.mkdir(parents=True, exist_ok=True)
+        self._entries = self._count()
+
+    def _count(self) -> int:
+        with os.scandir(self._directory) as entries:
+            return sum(self._is_entry(entry) for entry in entries)
+
+    @staticmethod
+    def _is_entry(entry: os.DirEntry) -> bool:
+        return entry.is_file() and not entry.name.endswith(".tmp")
+
+    def get(self, name: str) -> str | None:
+        path = self._directory / name
+        try:
+            content = path.read_text(encoding="utf-8")
+        except OSError:
+            return None
+        if not content:
+            return None
+        try:
+            # unlike touch(), never recreates an entry pruned since the read
+            os.utime(path)
+        except OSError:
+            pass
+        return content
+
+    def put(self, name: str, content: str) -> None:
+        path = self._directory / name
+        is_new = not path.exists()
+        with tempfile.NamedTemporaryFile(
+            "w", encoding="utf-8", dir=self._directory, suffix=".tmp", delete=False
+        ) as tmp_file:
+            tmp_file.write(content)
+        try:
+            # atomic rename, so concurrent readers never see a partial file
+            os.replace(tmp_file.name, path)
+        except OSError:
+            Path(tmp_file.name).unlink(missing_ok=True)
+            return
+        self._entries += is_new
+        if self._entries > self._max_entries:
+            self._prune()
+
+    def _prune(self) -> None:
+        # other processes share the directory, so the listing is the real count;
+        # their temporary files are left alone
+        with os.scandir(self._directory) as scan:
+            entries = [entry for entry in scan if self._is_entry(entry)]
+        keep = self._max_entries - self._max_entries // 10
+        excess = max(len(entries) - keep, 0)
+        entries.sort(key=self._mtime)
+        for entry in entries[:excess]:
+            Path(entry.path).unlink(missing_ok=True)
+        self._entries = len(entries) - excess
+
+    @staticmethod
+    def _mtime(entry: os.DirEntry) -> int:
+        try:
+            return entry.stat().st_mtime_ns
+        except OSError:  # pruned by another process
+            return 0
+
+
+class Highlighter:
+    """Syntax highlighting service for snippet code.
+    Lexed token streams and rendered HTML fragments are cached by a hash of the
+    code and language, in memory and optionally on disk. Repeated views of the
+    same snippet, including from a new CLI process, do not lex again.
+    """
+
+    def __init__(
+        self,
+        cache_dir: Path | None = None,
+        max_memory_entries: int = 512,
+        max_disk_entries: int = 4096,
+    ) -> None:
+        self._memory = _LRUCache(max_memory_entries)
+        self._disk = (
+            _DiskCache(cache_dir, max_disk_entries) if cache_dir is not None else None
+        )
+        self._html_formatter = HtmlFormatter(
+            style=HTML_STYLE, noclasses=True, nowrap=True
+        )
+        self.lex_count = 0
+
+    def tokens(self, code: str, language: LangEnum) -> Tokens:
+        """Return the Pygments token stream for code, lexing only on a cache miss.
+
+        Args:
+            code (str): source code to tokenize
+            language (LangEnum): language of the code
+
+        Returns:
+            Tokens: tuple of (token type, text) pairs
+        """
+        key = content_hash(code, language)
+        tokens = self._memory.get(f"tokens:{key}")
+        if tokens is not None:
+            return tokens
+
+        tokens = self._stored(f"{key}.tokens.json", self._load_tokens)
+        if tokens is None:
+            tokens = tuple(get_lexer(language).get_tokens(code))
+            self.lex_count += 1
+            if self._disk is not None:
+                self._disk.put(f"{key}.tokens.json", self._dump_tokens(tokens))
+
+        self._memory.put(f"tokens:{key}", tokens)
+        return tokens
+
+    def html(self, code: str, language: LangEnum) -> str:
+        """Return highlighted HTML markup for code.
+        The markup uses inline styles and has no wrapping element, so callers can
+        place it inside their own `<pre><code>` block.
+
+        Args:
+            code (str): source code to highlight
+            language (LangEnum): language of the code
+
+        Returns:
+            str: HTML fragment of styled spans
+        """
+        key = content_hash(code, language)
+        fragment = self._memory.get(f"html:{key}")
+        if fragment is not None:
+            return fragment
+
+        fragment = self._stored(f"{key}.html", str)
+        if fragment is None:
+            fragment = pygments.format(
+                self.tokens(code, language), self._html_formatter
+            )
+            if self._disk is not None:
+                self._disk.put(f"{key}.html", fragment)
+
+        self._memory.put(f"html:{key}", fragment)
+        return fragment
+
+    def text(
+        self,
+        code: str,
+        language: LangEnum,
+        options: tuple,
+        highlight: Callable[[], Text],
+    ) -> Text:
+        """Return the Rich text of highlighted code, calling `highlight` to
+        produce it only on a cache miss.
+
+        Args:
+            code (str): source code to highlight
+            language (LangEnum): language of the code
+            options (tuple): JSON serializable rendering options the text
+                depends on, such as the theme
+            highlight (Callable[[], Text]): renders the text
+
+        Returns:
+            Text: a copy of the cached text, which the caller may change
+        """
+        options_key = hashlib.sha256(json.dumps(options).encode()).hexdigest()[:16]
+        key = f"{content_hash(code, language)}.{options_key}"
+        text = self._memory.get(f"text:{key}")
+        if text is None:
+            text = self._stored(f"{key}.text.json", self._load_text)
+            if text is None:
+                text = highlight()
+                self.lex_count += 1
+                if self._disk is not None:
+                    self._disk.put(f"{key}.text.json", self._dump_text(text))
+            self._memory.put(f"text:{key}", text)
+        return text.copy()
+
+    def syntax(self, code: str, language: LangEnum, **kwargs) -> Syntax:
+        """Return a Rich renderable for code that highlights from the text cache.
+
+        Args:
+            code (str): source code to highlight
+            language (LangEnum): language of the code
+            **kwargs: extra options passed through to `rich.syntax.Syntax`
+
+        Returns:
+            Syntax: renderable that can be printed or nested in other renderables
+        """
+        kwargs.setdefault("theme", CLI_THEME)
+        return CachedSyntax(self, code, language, **kwargs)
+
+    def _stored(self, name: str, load: Callable[[str], T]) -> T | None:
+        """Load an entry of the disk cache, treating unreadable ones as misses,
+        such as entries damaged by a crash or written by an older version.
+        """
+        content = self._disk.get(name) if self._disk is not None else None
+        if content is None:
+            return None
+        try:
+            return load(content)
+        except (ValueError, KeyError, TypeError):
+            return None
+
+    @staticmethod
+    def _dump_tokens(tokens: Iterable[tuple[_TokenType, str]]) -> str:
+        return json.dumps([[str(token_type), value] for token_type, value in tokens])
+
+    @staticmethod
+    def _load_tokens(content: str) -> Tokens:
+        return tuple(
+            (string_to_tokentype(token_type), value)
+            for token_type, value in json.loads(content)
+        )
+
+    @staticmethod
+    def _dump_text(text: Text) -> str:
+        return json.dumps(
+            {
+                "plain": text.plain,
+                "style": str(text.style),
+                "justify": text.justify,
+                "no_wrap": text.no_wrap,
+                "tab_size": text.tab_size,
+                "spans": [
+                    [span.start, span.end, str(span.style)] for span in text.spans
+                ],
+            }
+        )
+
+    @staticmethod
+    def _load_text(content: str) -> Text:
+        data = json.loads(content)
+        return Text(
+            data["plain"],
+            style=Style.parse(data["style"]),
+            justify=data["justify"],
+            no_wrap=data["no_wrap"],
+            tab_size=data["tab_size"],
+            spans=[
+                Span(start, end, Style.parse(style))
+                for start, end, style in data["spans"]
+            ],
+        )
+
+
+class CachedSyntax(Syntax):
+    """A `rich.syntax.Syntax` whose highlighted text is cached by a `Highlighter`,
+    so the lexer runs only the first time a snippet is shown with a theme.
+    Syntaxes with a theme object rather than a name, highlighted line ranges or
+    stylized ranges are highlighted as usual.
+    """
+
+    def __init__(
+        self, highlighter: Highlighter, code: str, language: LangEnum, **kwargs
+    ) -> None:
+        super().__init__(code, get_lexer(language), **kwargs)
+        self._highlighter = highlighter
+        self._language = language
+        theme = kwargs.get("theme", CLI_THEME)
+        self._theme_name = theme if isinstance(theme, str) else None
+
+    def stylize_range(self, *args, **kwargs) -> None:
+        self._theme_name = None  # the ranges aren't part of the cache key
+        super().stylize_range(*args, **kwargs)
+
+    def highlight(
+        self,
+        code: str,
+        line_range: tuple[int | None, int | None] | None = None,
+    ) -> Text:
+        if line_range or self._theme_name is None:
+            return super().highlight(code, line_range)
+        options = (
+            self._theme_name,
+            self.background_color,
+            self.tab_size,
+            self.word_wrap,
+        )
+        return self._highlighter.text(
+            code, self._language, options, partial(super().highlight, code)
+        )
+
+
+def default_cache_dir() -> Path | None:
+    """Resolve the on-disk highlight cache location.
+    Honors `SNIPSTER_CACHE_DIR`, then `XDG_CACHE_HOME`. An empty
+    `SNIPSTER_CACHE_DIR` disables the disk cache.
+    """
+    cache_dir = config("SNIPSTER_CACHE_DIR", default=None)
+    if cache_dir == "":
+        return None
+    if cache_dir is not None:
+        return Path(cache_dir) / "highlight"
+    xdg_cache_home = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(xdg_cache_home) / "snipster" / "highlight"
+
+
+@cache
+def get_highlighter() -> Highlighter:
+    """Return the process-wide highlighter shared by the CLI and GUI."""
+    return Highlighter(cache_dir=default_cache_dir())
@@ -0,0 +1,175 @@
+"""Search-as-you-type sessions with incremental refinement.
+
+Each keystroke in a search box sends a term that usually extends the previous
+one. A snippet matching `selec` also contains `sel`, so the matches of a new
+term are among the matches of any earlier term it contains. A session keeps the
+matching IDs of its recent terms, and a term containing one of them is checked
+against those snippets only instead of the whole corpus.
+
+Only result sets that fit in the requested page are cached. Loading snippets
+beyond the page costs more than refining saves, and a term with few matches is
+the one a full search has to scan the whole corpus for, while a broad term
+fills its page early.
+
+Requests are debounced: each one waits briefly and is dropped if a newer request
+from the same session arrived meanwhile, so a burst of keystrokes costs one
+search. Cached IDs are dropped as soon as the change log moves on, and results
+of a search during which it moved on are not cached.
+"""
+
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Collection, Sequence
+
+from .models import LangEnum, Snippet, normalize_text
+from .repo import SnippetRepository
+
+# filters a cached result was found with, (tag_name, language, tags)
+_Filters = tuple[str | None, LangEnum | None, str | None]
+
+
+@dataclass
+class _Session:
+    generation: int = 0
+    # matching IDs by (filters, normalized term), least recently used first
+    results: OrderedDict[tuple[_Filters, str], list[int]] = field(
+        default_factory=OrderedDict
+    )
+
+
+class SearchSessions:
+    """Per-client state for incremental searches, kept in memory.
+
+    Args:
+        debounce (float): seconds a request waits for a newer one before it runs
+        max_sessions (int): sessions kept; the least recently used are evicted
+        max_terms (int): terms cached per session
+    """
+
+    CHANGE_PAGE = 1000
+
+    def __init__(
+        self,
+        debounce: float = 0.05,
+        max_sessions: int = 1024,
+        max_terms: int = 8,
+    ) -> None:
+        self.debounce = debounce
+        self.max_sessions = max_sessions
+        self.max_terms = max_terms
+        self.searches = 0
+        self.refined = 0
+        self._sessions: OrderedDict[str, _Session] = OrderedDict()
+        self._cursor = 0
+        self._lock = threading.Lock()
+
+    def _session(self, session_id: str) -> _Session:
+        session = self._sessions.get(session_id)
+        if session is None:
+            session = self._sessions[session_id] = _Session()
+            if len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+        else:
+            self._sessions.move_to_end(session_id)
+        return session
+
+    def begin(self, session_id: str) -> int:
+        """Register a new request for a session, superseding earlier ones.
+        Returns the generation to check with `is_current`.
+        """
+        with self._lock:
+            session = self._session(session_id)
+            session.generation += 1
+            return session.generation
+
+    def is_current(self, session_id: str, generation: int) -> bool:
+        """Check that no newer request of the session has begun."""
+        with self._lock:
+            session = self._sessions.get(session_id)
+            return session is not None and session.generation == generation
+
+    def _catch_up(self, repo: SnippetRepository) -> None:
+        """Drop every cached result if snippets changed since the last search.
+        The change log is read without the lock, so sessions don't wait for
+        each other's queries; only dropping the results takes it.
+        """
+        with self._lock:
+            cursor = self._cursor
+        while True:
+            changes = repo.changes(cursor, self.CHANGE_PAGE)
+            if not changes:
+                break
+            cursor = changes[-1].cursor
+            if len(changes) < self.CHANGE_PAGE:
+                break
+        with self._lock:
+            if cursor > self._cursor:
+                self._cursor = cursor
+                for session in self._sessions.values():
+                    session.results.clear()
+
+    def search(
+        self,
+        repo: SnippetRepository,
+        session_id: str,
+        term: str,
+        tag_name: str | None = None,
+        language: LangEnum | None = None,
+        tags: str | None = None,
+        limit: int = 20,
+        fields: Collection[str] | None = None,
+    ) -> Sequence[Snippet]:
+        """Search like a simple `SnippetRepository.search`, refining the cached
+        matches of an earlier term of the session when the term contains one.
+
+        Returns:
+            Sequence[Snippet]: up to `limit` matching snippets
+        """
+        filters = (tag_name, language, tags)
+        term_norm = normalize_text(term)
+        self._catch_up(repo)
+        with self._lock:
+            # a write caught up with during the search may not be in its results
+            cursor = self._cursor
+            self.searches += 1
+            session = self._session(session_id)
+            # the longest cached term within the new one narrows it down most
+            base = max(
+                (
+                    key
+                    for key in session.results
+                    if key[0] == filters and key[1] in term_norm
+                ),
+                key=lambda key: len(key[1]),
+                default=None,
+            )
+            candidate_ids = None
+            if base is not None:
+                session.results.move_to_end(base)
+                candidate_ids = session.results[base]
+                self.refined += 1
+
+        if base is not None and base[1] == term_norm:
+            return repo.get_many(candidate_ids[:limit], fields)
+        snippets = repo.search(
+            term,
+            tag_name=tag_name,
+            language=language,
+            tags=tags,
+            fields=fields,
+            limit=limit + 1,
+            within=candidate_ids,
+        )
+        # a result set that fits the page is complete, so later terms can refine it
+        if len(snippets) <= limit:
+            with self._lock:
+                if self._cursor != cursor:
+                    return snippets[:limit]
+                session = self._session(session_id)
+                session.results[(filters, term_norm)] = [
+                    snippet.id for snippet in snippets
+                ]
+                if len(session.results) > self.max_terms:
+                    session.results.popitem(last=False)
+        return snippets[:limit]
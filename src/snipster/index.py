@@ -0,0 +1,211 @@
+from typing import AbstractSet, Collection, Hashable, Iterable
+
+from .autocomplete import CompletionIndex
+from .fulltext import BM25Index
+from .models import LangEnum, SnippetFacets
+from .query import TagExpr, evaluate
+from .similarity import LSHIndex, decode_signature
+
+
+class PostingsIndex:
+    """Maps a key, such as a tag name or language, to the set of snippet IDs
+    that carry it. Keys with no remaining snippets are dropped.
+    """
+
+    def __init__(self) -> None:
+        self._postings: dict[Hashable, set[int]] = {}
+
+    def add(self, key: Hashable, snippet_id: int) -> None:
+        self._postings.setdefault(key, set()).add(snippet_id)
+
+    def discard(self, key: Hashable, snippet_id: int) -> None:
+        postings = self._postings.get(key)
+        if postings is None:
+            return
+        postings.discard(snippet_id)
+        if not postings:
+            del self._postings[key]
+
+    def get(self, key: Hashable) -> frozenset[int] | set[int]:
+        """Return the IDs for a key. The set is live and must not be modified."""
+        return self._postings.get(key, frozenset())
+
+    def keys(self) -> Iterable[Hashable]:
+        return self._postings.keys()
+
+    def counts(self, within: AbstractSet[int] | None = None) -> dict[Hashable, int]:
+        """Return the number of IDs per key, read from the postings sizes.
+        With `within`, only IDs in that set are counted and empty keys are left out.
+        """
+        if within is None:
+            return {key: len(postings) for key, postings in self._postings.items()}
+        counts = {}
+        for key, postings in self._postings.items():
+            count = len(postings & within)
+            if count:
+                counts[key] = count
+        return counts
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._postings
+
+
+class SnippetIndex:
+    """Tag, language and favorite postings for the snippets of a repository.
+    Lets searches narrow the candidate snippets by set intersection before
+    any text matching runs. The postings sizes double as facet counts.
+    Postings by content hash find duplicate snippets without comparing them,
+    and LSH buckets of MinHash signatures find similar ones. Tag names and
+    title words are kept in prefix indexes for autocompletion.
+
+    The full-text index behind ranked searches is the largest part, so it is
+    left as None until a repository first builds it; from then on `remove`
+    and `add_text` keep it up to date.
+    """
+
+    def __init__(self) -> None:
+        self.by_tag = PostingsIndex()
+        self.by_language = PostingsIndex()
+        self.by_hash = PostingsIndex()
+        self.similar = LSHIndex()
+        self.completions = CompletionIndex()
+        self.favorites: set[int] = set()
+        self.ids: set[int] = set()
+        self.text: BM25Index | None = None
+
+    def add(
+        self,
+        snippet_id: int,
+        language: LangEnum,
+        tag_names: Iterable[str],
+        favorite: bool = False,
+        content_hash: str | None = None,
+        minhash: str | None = None,
+        title: str | None = None,
+    ) -> None:
+        """Index a snippet. A snippet that is already indexed must be removed first."""
+        tag_names = tuple(tag_names)
+        self.ids.add(snippet_id)
+        self.by_language.add(LangEnum(language), snippet_id)
+        for tag_name in tag_names:
+            self.by_tag.add(tag_name, snippet_id)
+        if favorite:
+            self.favorites.add(snippet_id)
+        if content_hash:
+            self.by_hash.add(content_hash, snippet_id)
+        if minhash:
+            self.similar.add(snippet_id, decode_signature(minhash))
+        self.completions.add(title, tag_names)
+
+    def remove(
+        self,
+        snippet_id: int,
+        language: LangEnum,
+        tag_names: Iterable[str],
+        favorite: bool = False,
+        content_hash: str | None = None,
+        minhash: str | None = None,
+        title: str | None = None,
+    ) -> None:
+        """Remove a snippet using the language, tags, favorite flag, content hash,
+        signature and title it was indexed with.
+        """
+        tag_names = tuple(tag_names)
+        self.ids.discard(snippet_id)
+        self.by_language.discard(LangEnum(language), snippet_id)
+        for tag_name in tag_names:
+            self.by_tag.discard(tag_name, snippet_id)
+        if favorite:
+            self.favorites.discard(snippet_id)
+        if content_hash:
+            self.by_hash.discard(content_hash, snippet_id)
+        if minhash:
+            self.similar.remove(snippet_id, decode_signature(minhash))
+        self.completions.remove(title, tag_names)
+        if self.text is not None:
+            self.text.remove(snippet_id)
+
+    def add_text(
+        self,
+        snippet_id: int,
+        title: str,
+        description: str | None,
+        code: str,
+        tag_names: Iterable[str],
+    ) -> None:
+        """Index a snippet's text for ranked searches, if the text index is built."""
+        if self.text is not None:
+            self.text.add(snippet_id, title, description, code, tag_names)
+
+    def set_favorite(self, snippet_id: int, favorite: bool) -> None:
+        if favorite:
+            self.favorites.add(snippet_id)
+        else:
+            self.favorites.discard(snippet_id)
+
+    def find_duplicate(
+        self, content_hash: str, exclude_id: int | None = None
+    ) -> int | None:
+        """Return the lowest ID with the given content hash, other than `exclude_id`."""
+        ids = self.by_hash.get(content_hash)
+        return min((i for i in ids if i != exclude_id), default=None)
+
+    def duplicate_groups(self) -> list[list[int]]:
+        """Return the sorted IDs of each content hash shared by several snippets,
+        ordered by their lowest ID.
+        """
+        groups = (sorted(self.by_hash.get(key)) for key in self.by_hash.keys())
+        return sorted(group for group in groups if len(group) > 1)
+
+    def facets(self, within: AbstractSet[int] | None = None) -> SnippetFacets:
+        """Count snippets per language, tag and favorite flag.
+        The counts are kept up to date by `add` and `remove`, so no snippet is
+        scanned. With `within`, only the given snippet IDs are counted.
+
+        Args:
+            within (AbstractSet[int] | None): IDs to restrict the counts to
+
+        Returns:
+            SnippetFacets: snippet counts
+        """
+        if within is None:
+            total, favorites = len(self.ids), len(self.favorites)
+        else:
+            total, favorites = len(within), len(self.favorites & within)
+        return SnippetFacets.from_counts(
+            total=total,
+            favorites=favorites,
+            languages=self.by_language.counts(within),
+            tags=self.by_tag.counts(within),
+        )
+
+    def candidates(
+        self,
+        tag_query: TagExpr | None = None,
+        language: LangEnum | None = None,
+        within: Collection[int] | None = None,
+    ) -> list[int] | None:
+        """Resolve tag and language filters to the sorted IDs matching all of them.
+
+        Args:
+            tag_query (TagExpr | None): tag expression to filter by
+            language (LangEnum | None): language to filter by
+            within (Collection[int] | None): only keep these snippet IDs
+
+        Returns:
+            list[int] | None: matching snippet IDs in ascending order, or None
+                when no filter is given and every snippet is a candidate
+        """
+        postings = []
+        if tag_query is not None:
+            postings.append(evaluate(tag_query, self.by_tag.get, self.ids))
+        if language is not None:
+            postings.append(self.by_language.get(LangEnum(language)))
+        if within is not None:
+            postings.append(self.ids.intersection(within))
+        if not postings:
+            return None
+
+        # intersecting from the smallest set keeps the cost bounded by its size
+        smallest, *others = sorted(postings, key=len)
+        return sorted(set(smallest).intersection(*others))
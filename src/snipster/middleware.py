@@ -0,0 +1,222 @@
+import gzip
+import hashlib
+from collections import OrderedDict
+from typing import Callable
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+try:
+    from compression import zstd  # Python 3.14+
+except ImportError:  # pragma: no cover
+    try:
+        import zstandard as zstd
+    except ImportError:
+        zstd = None
+
+Compressor = Callable[[bytes], bytes]
+
+
+def available_compressors(gzip_level: int = 6) -> dict[str, Compressor]:
+    """Return the compressors that can be used, in order of server preference.
+    gzip is always available; zstd and brotli are used when installed.
+    """
+    compressors: dict[str, Compressor] = {}
+    if zstd is not None:
+        # the stdlib module and the zstandard package share this signature
+        compressors["zstd"] = lambda data: zstd.compress(data, level=3)
+    if brotli is not None:
+        compressors["br"] = lambda data: brotli.compress(data, quality=5)
+    # a fixed mtime keeps the output, and so the cached bytes, deterministic
+    compressors["gzip"] = lambda data: gzip.compress(
+        data, compresslevel=gzip_level, mtime=0
+    )
+    return compressors
+
+
+def negotiate_encoding(accept_encoding: str, supported: list[str]) -> str | None:
+    """Pick a content coding from an `Accept-Encoding` header.
+    The highest quality value wins; ties go to the order of `supported`.
+    Returns None when the response should be sent uncompressed.
+
+    Args:
+        accept_encoding (str): value of the request header
+        supported (list[str]): codings the server can produce, most preferred first
+
+    Returns:
+        str | None: chosen coding
+    """
+    qualities: dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        coding, _, params = part.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        qualities[coding] = quality
+
+    wildcard = qualities.get("*", 0.0)
+    best, best_quality = None, 0.0
+    for coding in supported:
+        quality = qualities.get(coding, wildcard)
+        if quality > best_quality:
+            best, best_quality = coding, quality
+    return best
+
+
+class _CompressedCache:
+    """LRU cache of compressed bodies, bounded by their total size in bytes."""
+
+    def __init__(self, max_bytes: int) -> None:
+        self._max_bytes = max_bytes
+        self._size = 0
+        self._data: OrderedDict[tuple[str, bytes], bytes] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: tuple[str, bytes]) -> bytes | None:
+        value = self._data.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._data.move_to_end(key)
+        return value
+
+    def put(self, key: tuple[str, bytes], value: bytes) -> None:
+        if len(value) > self._max_bytes:
+            return
+        previous = self._data.pop(key, None)
+        if previous is not None:
+            self._size -= len(previous)
+        self._data[key] = value
+        self._size += len(value)
+        while self._size > self._max_bytes:
+            _, evicted = self._data.popitem(last=False)
+            self._size -= len(evicted)
+
+    def clear(self) -> None:
+        self._data.clear()
+        self._size = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class CompressionMiddleware:
+    """ASGI middleware that compresses responses with gzip, brotli or zstd,
+    negotiated from the request's `Accept-Encoding` header.
+
+    Bodies smaller than `minimum_size` are sent as they are. The compressed
+    bytes of GET responses are cached by a hash of the uncompressed body, so
+    repeated requests for an unchanged snippet or listing are not compressed
+    again. Streaming responses, such as server-sent events and exports, pass
+    through without being buffered or cached. They are the ones sent without a
+    `Content-Length`, as the size of their body isn't known up front.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 500,
+        gzip_level: int = 6,
+        cache_max_bytes: int = 32 * 1024 * 1024,
+    ) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+        self.compressors = available_compressors(gzip_level)
+        self.cache = _CompressedCache(cache_max_bytes)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = Headers(scope=scope)
+        encoding = negotiate_encoding(
+            headers.get("accept-encoding", ""), list(self.compressors)
+        )
+        if encoding is None or scope["method"] == "HEAD":
+            await self.app(scope, receive, send)
+            return
+
+        responder = _CompressionResponder(
+            self, send, encoding, cacheable=scope["method"] == "GET"
+        )
+        await self.app(scope, receive, responder.send)
+
+    def compress(self, encoding: str, body: bytes, cacheable: bool) -> bytes:
+        if not cacheable:
+            return self.compressors[encoding](body)
+        # hashing is an order of magnitude cheaper than compressing
+        key = (encoding, hashlib.blake2b(body, digest_size=16).digest())
+        compressed = self.cache.get(key)
+        if compressed is None:
+            compressed = self.compressors[encoding](body)
+            self.cache.put(key, compressed)
+        return compressed
+
+
+class _CompressionResponder:
+    """Buffers one response and sends it compressed once the body is complete."""
+
+    def __init__(
+        self,
+        middleware: CompressionMiddleware,
+        send: Send,
+        encoding: str,
+        cacheable: bool,
+    ) -> None:
+        self._middleware = middleware
+        self._send = send
+        self._encoding = encoding
+        self._cacheable = cacheable
+        self._start_message: Message | None = None
+        self._passthrough = False
+        self._chunks: list[bytes] = []
+
+    async def send(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            self._start_message = message
+            headers = Headers(raw=message["headers"])
+            self._passthrough = (
+                "content-encoding" in headers or "content-length" not in headers
+            )
+            if self._passthrough:
+                await self._send(message)
+            return
+
+        if message["type"] != "http.response.body" or self._passthrough:
+            await self._send(message)
+            return
+
+        self._chunks.append(message.get("body", b""))
+        if message.get("more_body", False):
+            return
+
+        body = b"".join(self._chunks)
+        start_message = self._start_message
+        headers = MutableHeaders(raw=start_message["headers"])
+        headers.add_vary_header("Accept-Encoding")
+        if len(body) >= self._middleware.minimum_size:
+            compressed = self._middleware.compress(
+                self._encoding, body, self._cacheable
+            )
+            # incompressible bodies are sent as they are
+            if len(compressed) < len(body):
+                body = compressed
+                headers["Content-Encoding"] = self._encoding
+                headers["Content-Length"] = str(len(body))
+        await self._send(start_message)
+        await self._send({"type": "http.response.body", "body": body})
@@ -1,16 +1,54 @@
+import hashlib
 import re
+import textwrap
+from collections import Counter
 from datetime import datetime, timezone
 from enum import StrEnum
 
 from pydantic import BaseModel, ConfigDict, field_validator
-from sqlalchemy import Column
+from sqlalchemy import BigInteger, Column, delete, event, insert, update
 from sqlalchemy import Enum as SaEnum
+from sqlalchemy.orm import Session, attributes
 from sqlmodel import Field, Relationship, SQLModel
 
+from .compressed import CompressedText, get_compressor
+from .similarity import band_buckets, decode_signature, encode_signature, minhash
 
-def enum_column(enum_cls):
+
+def enum_column(enum_cls, **kwargs):
     """A SQLAlchemy column that properly returns ENUM values instead of labels"""
-    return Column(SaEnum(enum_cls, values_callable=lambda x: [e.value for e in x]))
+    return Column(
+        SaEnum(enum_cls, values_callable=lambda x: [e.value for e in x]), **kwargs
+    )
+
+
+def normalize_text(value: str | None) -> str:
+    """Case-fold text and collapse whitespace runs into single spaces for searching"""
+    if not value:
+        return ""
+    return " ".join(value.casefold().split())
+
+
+def normalize_stored(value: str | None) -> str | None:
+    """Normalize code or a description for storing next to it.
+    Text large enough to be stored compressed gets no copy, as an uncompressed
+    one would outweigh the savings; None tells searches to normalize the text.
+    """
+    if get_compressor().is_large(value):
+        return None
+    return normalize_text(value)
+
+
+def hash_content(code: str | None, language: str | None) -> str:
+    """Hash code and language to detect duplicate snippets.
+    Line endings, trailing whitespace, surrounding blank lines and common
+    indentation are ignored, so copies that only differ in layout hash alike.
+    """
+    code = (code or "").replace("\r\n", "\n").replace("\r", "\n")
+    lines = textwrap.dedent(code).split("\n")
+    normalized = "\n".join(line.rstrip() for line in lines).strip("\n")
+    data = f"{language}\n{normalized}".encode()
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
 
 
 class LangEnum(StrEnum):
@@ -23,21 +61,41 @@ class SnippetTagLink(SQLModel, table=True):
     snippet_id: int | None = Field(
         default=None, foreign_key="snippet.id", primary_key=True
     )
-    tag_id: int | None = Field(default=None, foreign_key="tag.id", primary_key=True)
+    tag_id: int | None = Field(
+        default=None, foreign_key="tag.id", primary_key=True, index=True
+    )
 
 
 class SnippetBase(SQLModel):
     title: str
     code: str
     description: str | None = None
-    language: LangEnum = Field(sa_column=enum_column(LangEnum))
-    favorite: bool = False
+    language: LangEnum = Field(sa_column=enum_column(LangEnum, index=True))
+    favorite: bool = Field(default=False, index=True)
 
 
 class Snippet(SnippetBase, table=True):
     id: int | None = Field(default=None, primary_key=True)
-    created_at: datetime = datetime.now(timezone.utc)
-    updated_at: datetime | None = None
+    # large bodies are stored compressed when SNIPSTER_COMPRESSION is set
+    code: str = Field(sa_type=CompressedText)
+    description: str | None = Field(default=None, sa_type=CompressedText)
+    created_at: datetime = Field(
+        default_factory=lambda: datetime.now(timezone.utc), index=True
+    )
+    updated_at: datetime | None = Field(default=None, index=True)
+
+    # normalized copies of searchable text, kept in sync with the source fields;
+    # None for large text, see `normalize_stored`
+    title_norm: str = ""
+    code_norm: str | None = None
+    description_norm: str | None = None
+
+    # hash of the normalized code and language, kept in sync like the fields above
+    content_hash: str = Field(default="", index=True)
+    # the snippet this one was added as a copy of, under `DuplicatePolicy.LINK`
+    duplicate_of: int | None = None
+    # encoded MinHash signature of the code; empty until the snippet is written
+    minhash: str = ""
 
     tags: list["Tag"] = Relationship(
         back_populates="snippets",
@@ -51,6 +109,23 @@ class Snippet(SnippetBase, table=True):
         super().__init__(**data)
         if not hasattr(self, "tags") or self.tags is None:
             self.tags = []
+        self.update_search_fields()
+        self.update_content_hash()
+
+    def update_search_fields(self) -> None:
+        """Recompute the normalized search fields from title, code and description."""
+        for field, norm_field in SEARCH_FIELDS.items():
+            setattr(self, norm_field, NORMALIZERS[field](getattr(self, field)))
+
+    def update_content_hash(self) -> None:
+        """Recompute the content hash from code and language."""
+        self.content_hash = hash_content(self.code, self.language)
+
+    def update_minhash(self) -> None:
+        """Compute the MinHash signature of the code.
+        Costs more than the other derived fields, so it is left to writes.
+        """
+        self.minhash = encode_signature(minhash(self.code))
 
     @classmethod
     def create(cls, **kwargs):
@@ -58,6 +133,257 @@ class Snippet(SnippetBase, table=True):
         return snippet
 
 
+SEARCH_FIELDS = {
+    "title": "title_norm",
+    "code": "code_norm",
+    "description": "description_norm",
+}
+
+NORMALIZERS = {
+    "title": normalize_text,
+    "code": normalize_stored,
+    "description": normalize_stored,
+}
+
+
+def search_texts(snippet) -> tuple[str, str, str]:
+    """Return the normalized title, code and description of a snippet, or of
+    anything with the same fields, normalizing text without a stored copy.
+    """
+    code_norm, description_norm = snippet.code_norm, snippet.description_norm
+    return (
+        snippet.title_norm,
+        normalize_text(snippet.code) if code_norm is None else code_norm,
+        normalize_text(snippet.description)
+        if description_norm is None
+        else description_norm,
+    )
+
+
+def _normalize_on_set(field: str):
+    norm_field, normalize = SEARCH_FIELDS[field], NORMALIZERS[field]
+
+    def listener(target, value, oldvalue, initiator):
+        setattr(target, norm_field, normalize(value))
+
+    return listener
+
+
+# keep normalized fields current when a searchable field is reassigned
+for field in SEARCH_FIELDS:
+    event.listen(getattr(Snippet, field), "set", _normalize_on_set(field))
+
+
+@event.listens_for(Snippet.code, "set")
+def _hash_code_on_set(target, value, oldvalue, initiator):
+    target.content_hash = hash_content(value, getattr(target, "language", None))
+    target.minhash = ""  # recomputed on the next write
+
+
+@event.listens_for(Snippet.language, "set")
+def _hash_language_on_set(target, value, oldvalue, initiator):
+    target.content_hash = hash_content(getattr(target, "code", None), value)
+
+
+class ChangeOperation(StrEnum):
+    UPSERT = "upsert"
+    DELETE = "delete"
+
+
+class SnippetChange(SQLModel, table=True):
+    """An entry in the change log. `cursor` increases with every change and is
+    never reused, so clients can ask for everything after the last one they saw.
+    Deleted snippets keep a `delete` entry as a tombstone.
+    """
+
+    __table_args__ = {"sqlite_autoincrement": True}
+
+    cursor: int | None = Field(default=None, primary_key=True)
+    snippet_id: int = Field(index=True)
+    operation: ChangeOperation = Field(
+        sa_column=enum_column(ChangeOperation, nullable=False)
+    )
+    changed_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+
+@event.listens_for(Session, "after_flush")
+def _log_snippet_changes(session: Session, flush_context) -> None:
+    """Append change log entries for the snippets written by a flush.
+    Runs in the flush's transaction, so the log commits or rolls back with the
+    write, whichever code path made it.
+    """
+    # the new, dirty and deleted collections still hold their pre-flush state
+    changes = {}
+    for obj in session.new:
+        if isinstance(obj, Snippet):
+            changes[obj.id] = ChangeOperation.UPSERT
+    for obj in session.dirty:
+        if isinstance(obj, Snippet) and session.is_modified(obj):
+            changes[obj.id] = ChangeOperation.UPSERT
+    for obj in session.deleted:
+        if isinstance(obj, Snippet):
+            changes[obj.id] = ChangeOperation.DELETE
+    if not changes:
+        return
+
+    changed_at = datetime.now(timezone.utc)
+    session.connection().execute(
+        insert(SnippetChange),
+        [
+            {"snippet_id": snippet_id, "operation": operation, "changed_at": changed_at}
+            for snippet_id, operation in sorted(changes.items())
+        ],
+    )
+
+
+class SnippetBucket(SQLModel, table=True):
+    """An LSH bucket of a snippet's MinHash signature, one per band.
+    Snippets sharing a bucket are candidate near-duplicates.
+    """
+
+    bucket: int = Field(sa_type=BigInteger, primary_key=True)
+    snippet_id: int = Field(primary_key=True, index=True)
+
+
+@event.listens_for(Session, "before_flush")
+def _sign_snippets(session: Session, flush_context, instances) -> None:
+    """Compute MinHash signatures for snippets about to be written without one."""
+    for obj in (*session.new, *session.dirty):
+        if isinstance(obj, Snippet) and not obj.minhash:
+            obj.update_minhash()
+
+
+@event.listens_for(Session, "after_flush")
+def _bucket_snippets(session: Session, flush_context) -> None:
+    """Keep the LSH buckets of written snippets in line with their signatures."""
+    stale_ids, bucketed = [], []
+    for obj in session.new:
+        if isinstance(obj, Snippet):
+            bucketed.append(obj)
+    for obj in session.dirty:
+        if (
+            isinstance(obj, Snippet)
+            and attributes.get_history(obj, "minhash").has_changes()
+        ):
+            stale_ids.append(obj.id)
+            bucketed.append(obj)
+    for obj in session.deleted:
+        if isinstance(obj, Snippet):
+            stale_ids.append(obj.id)
+
+    if stale_ids:
+        session.connection().execute(
+            delete(SnippetBucket).where(SnippetBucket.snippet_id.in_(stale_ids))
+        )
+    if bucketed:
+        session.connection().execute(
+            insert(SnippetBucket),
+            [
+                {"bucket": bucket, "snippet_id": snippet.id}
+                for snippet in bucketed
+                for bucket in band_buckets(decode_signature(snippet.minhash))
+            ],
+        )
+
+
+class SnippetFacetCount(SQLModel, table=True):
+    """The number of snippets with a facet value, kept up to date on every write
+    so facet counts are read without scanning the snippets.
+    `facet` is `total`, `favorite`, `language` or `tag`; the total and favorite
+    counts have an empty `value`.
+    """
+
+    facet: str = Field(primary_key=True)
+    value: str = Field(primary_key=True)
+    count: int = 0
+
+
+# attributes of a snippet that facets count by
+FACET_ATTRIBUTES = ("language", "favorite", "tags")
+
+
+def _facet_key(attribute: str, value) -> tuple[str, str] | None:
+    if attribute == "language":
+        return ("language", LangEnum(value).value)
+    if attribute == "favorite":
+        return ("favorite", "") if value else None
+    return ("tag", value.name)
+
+
+def _keep_replaced_value(target, value, oldvalue, initiator):
+    return value
+
+
+# load the value a write replaces even if it was expired, for its facet count
+for attribute in ("language", "favorite"):
+    event.listen(
+        getattr(Snippet, attribute),
+        "set",
+        _keep_replaced_value,
+        active_history=True,
+        retval=True,
+    )
+
+
+@event.listens_for(Session, "before_flush")
+def _load_deleted_facets(session: Session, flush_context, instances) -> None:
+    """Load the facet values of snippets about to be deleted, while their rows
+    and tag links still exist, so their counts can be taken back.
+    """
+    for obj in session.deleted:
+        if isinstance(obj, Snippet):
+            for attribute in FACET_ATTRIBUTES:
+                getattr(obj, attribute)
+
+
+@event.listens_for(Session, "after_flush")
+def _count_facets(session: Session, flush_context) -> None:
+    """Apply the facet count changes of the snippets written by a flush, from
+    the history of their facet attributes. Runs in the flush's transaction,
+    like the change log.
+    """
+    deltas = Counter()
+
+    def count(attribute: str, values, step: int) -> None:
+        for value in values:
+            key = _facet_key(attribute, value)
+            if key is not None:
+                deltas[key] += step
+
+    for obj in session.new:
+        if isinstance(obj, Snippet):
+            deltas["total", ""] += 1
+            for attribute in FACET_ATTRIBUTES:
+                history = attributes.get_history(obj, attribute)
+                count(attribute, [*history.unchanged, *history.added], 1)
+    for obj in session.dirty:
+        if isinstance(obj, Snippet):
+            for attribute in FACET_ATTRIBUTES:
+                history = attributes.get_history(obj, attribute)
+                count(attribute, history.deleted, -1)
+                count(attribute, history.added, 1)
+    for obj in session.deleted:
+        if isinstance(obj, Snippet):
+            deltas["total", ""] -= 1
+            for attribute in FACET_ATTRIBUTES:
+                history = attributes.get_history(obj, attribute)
+                count(attribute, [*history.unchanged, *history.deleted], -1)
+
+    connection = session.connection()
+    for (facet, value), delta in sorted(deltas.items()):
+        if not delta:
+            continue
+        result = connection.execute(
+            update(SnippetFacetCount)
+            .where(SnippetFacetCount.facet == facet, SnippetFacetCount.value == value)
+            .values(count=SnippetFacetCount.count + delta)
+        )
+        if result.rowcount == 0:
+            connection.execute(
+                insert(SnippetFacetCount).values(facet=facet, value=value, count=delta)
+            )
+
+
 class SnippetCreate(SnippetBase):
     pass
 
@@ -66,11 +392,22 @@ class SnippetRead(SnippetBase):
     id: int
     created_at: datetime
     updated_at: datetime | None = None
+    duplicate_of: int | None = None
+    tags: list["TagRead"]
+
+
+class SnippetSummary(SQLModel):
+    """Lightweight view of a snippet for listings, without code or description."""
+
+    id: int
+    title: str
+    language: LangEnum
+    favorite: bool
     tags: list["TagRead"]
 
 
 class TagBase(SQLModel):
-    name: str = Field(min_length=1, max_length=20)
+    name: str = Field(min_length=1, max_length=20, unique=True, index=True)
 
     @field_validator("name", mode="before")
     @classmethod
@@ -96,3 +433,77 @@ class TagRead(TagBase):
 
 class DeleteResponse(BaseModel):
     detail: str
+
+
+class ChangeRead(BaseModel):
+    cursor: int
+    snippet_id: int
+    operation: ChangeOperation
+    snippet: SnippetRead | None = None
+
+
+class ChangePage(BaseModel):
+    """A page of the change log. Pass `cursor` as `since` to get the next page."""
+
+    changes: list[ChangeRead]
+    cursor: int
+    has_more: bool
+
+
+class Suggestion(BaseModel):
+    """An autocompletion suggestion, with the number of snippets using it."""
+
+    value: str
+    count: int
+
+
+class WriteStats(BaseModel):
+    """Batching of database writes by a `WriteCoalescer`. Commit times cover
+    the transactions of a batch, including retries after a failed commit.
+    """
+
+    batches: int
+    writes: int
+    failed_batches: int
+    mean_batch_size: float
+    max_batch_size: int
+    mean_commit_ms: float
+    max_commit_ms: float
+
+
+class RelatedSnippet(BaseModel):
+    """A snippet similar to another, with the estimated share of code they have
+    in common, from 0 to 1.
+    """
+
+    similarity: float
+    snippet: SnippetRead
+
+
+class SnippetFacets(BaseModel):
+    """Snippet counts per language, tag and favorite flag.
+    Counts are ordered from most to least common.
+    """
+
+    total: int
+    favorites: int
+    languages: dict[LangEnum, int]
+    tags: dict[str, int]
+
+    @classmethod
+    def from_counts(
+        cls,
+        total: int,
+        favorites: int,
+        languages: dict[LangEnum, int],
+        tags: dict[str, int],
+    ) -> "SnippetFacets":
+        def ranked(counts: dict) -> dict:
+            return dict(sorted(counts.items(), key=lambda item: (-item[1], item[0])))
+
+        return cls(
+            total=total,
+            favorites=favorites,
+            languages=ranked(languages),
+            tags=ranked(tags),
+        )
@@ -0,0 +1,188 @@
+"""Regular expression search with literal prefiltering.
+
+Most patterns contain literal text that every match must include, such as
+`fn ` and `_async` in `fn \\w+_async`. Those literals are read from the parsed
+pattern and checked against the normalized search fields first, which is a
+cheap substring test, or a `LIKE` condition in the database. Only snippets
+containing all of them in one field are matched against the full pattern.
+
+Python's `re` can't interrupt a running match, so patterns that can match
+the same text in many ways under a repeat, the cause of catastrophic
+backtracking, are rejected up front: nested repeats, optional items and
+alternatives that can start alike. A search also gives up once it runs past
+its time budget, checked before matching each field.
+"""
+
+import re
+import time
+from re import _constants as constants
+from re import _parser as parser
+from typing import Iterable, Protocol
+
+from .exceptions import InvalidSearchPatternError, SearchTimeoutError
+from .models import normalize_text, search_texts
+
+_REPEATS = (constants.MAX_REPEAT, constants.MIN_REPEAT)
+# zero-width items that don't break a run of adjacent literals
+_ZERO_WIDTH = (constants.AT, constants.ASSERT, constants.ASSERT_NOT)
+
+
+class _SearchText(Protocol):
+    title: str
+    code: str
+    description: str | None
+    title_norm: str
+    code_norm: str | None
+    description_norm: str | None
+
+
+def _required_literals(items: parser.SubPattern) -> list[str]:
+    """Return the runs of literal characters that every match must contain."""
+    literals, run = [], []
+
+    def flush() -> None:
+        if run:
+            literals.append("".join(run))
+            run.clear()
+
+    for op, value in items:
+        if op is constants.LITERAL:
+            run.append(chr(value))
+        elif op in _ZERO_WIDTH:
+            continue
+        elif op is constants.SUBPATTERN:
+            flush()
+            literals += _required_literals(value[3])
+        elif op in _REPEATS or op is constants.POSSESSIVE_REPEAT:
+            flush()
+            low, _, repeated = value
+            if low >= 1:
+                literals += _required_literals(repeated)
+        else:
+            flush()
+    flush()
+    return literals
+
+
+def _starts_apart(branches: list[parser.SubPattern]) -> bool:
+    """Check that alternatives all start with different literal characters, so
+    at most one of them can match at any position.
+    """
+    starts = set()
+    for branch in branches:
+        if not branch or branch[0][0] is not constants.LITERAL:
+            return False
+        starts.add(chr(branch[0][1]).casefold())
+    return len(starts) == len(branches)
+
+
+def _has_ambiguous_repeat(items: parser.SubPattern, in_repeat: bool = False) -> bool:
+    """Check for a repeat holding something that can match the same text in
+    more than one way: another repeat, like `(a+)+`, an optional item, like
+    `(ab?)+`, or alternatives that can start alike, like `(a|aa)*`, which the
+    parser turns into `(a(?:|a))*`.
+    Possessive repeats and atomic groups don't backtrack, so they are allowed.
+    """
+    for op, value in items:
+        if op in _REPEATS:
+            low, high, repeated = value
+            repeats = high is constants.MAXREPEAT or high > 1
+            if in_repeat and (repeats or low != high):
+                return True
+            if _has_ambiguous_repeat(repeated, in_repeat or repeats):
+                return True
+        elif op is constants.SUBPATTERN:
+            if _has_ambiguous_repeat(value[3], in_repeat):
+                return True
+        elif op is constants.BRANCH:
+            if in_repeat and not _starts_apart(value[1]):
+                return True
+            if any(_has_ambiguous_repeat(branch, in_repeat) for branch in value[1]):
+                return True
+        elif op in (constants.ASSERT, constants.ASSERT_NOT):
+            if _has_ambiguous_repeat(value[1], in_repeat):
+                return True
+    return False
+
+
+class RegexQuery:
+    """A regular expression search, matched against snippet titles, code and
+    descriptions.
+
+    Args:
+        pattern (str): regular expression, in Python syntax
+        time_budget (float): seconds a search may run before giving up
+
+    Raises:
+        InvalidSearchPatternError: if the pattern is malformed or prone to
+            catastrophic backtracking
+    """
+
+    def __init__(self, pattern: str, time_budget: float = 1.0) -> None:
+        try:
+            self.regex = re.compile(pattern)
+            parsed = parser.parse(pattern)
+        except re.error as e:
+            raise InvalidSearchPatternError(f"Invalid pattern '{pattern}': {e}")
+        if _has_ambiguous_repeat(parsed):
+            raise InvalidSearchPatternError(
+                f"Pattern '{pattern}' repeats something that can match in more "
+                "than one way, which can take exponential time; use a possessive "
+                "repeat like `a++` or an atomic group"
+            )
+        self.time_budget = time_budget
+        self.literals = [
+            literal
+            for literal in dict.fromkeys(
+                map(normalize_text, _required_literals(parsed))
+            )
+            if literal
+        ]
+
+    def could_match(self, snippet: _SearchText) -> bool:
+        """Check whether one normalized field holds every required literal."""
+        return any(
+            all(literal in field for literal in self.literals)
+            for field in search_texts(snippet)
+        )
+
+    def matches(self, snippet: _SearchText, deadline: float | None = None) -> bool:
+        """Match the pattern against the original text of each field.
+
+        Raises:
+            SearchTimeoutError: if `deadline`, a `time.monotonic` value, passes
+                before a field is matched
+        """
+        for field in (snippet.title, snippet.code, snippet.description):
+            if not field:
+                continue
+            if deadline is not None:
+                self._check_deadline(deadline)
+            if self.regex.search(field):
+                return True
+        return False
+
+    def _check_deadline(self, deadline: float) -> None:
+        if time.monotonic() > deadline:
+            raise SearchTimeoutError(
+                f"Pattern '{self.regex.pattern}' took longer than "
+                f"{self.time_budget:g}s; try a more specific pattern"
+            )
+
+    def search(
+        self, snippets: Iterable[_SearchText], limit: int | None = None
+    ) -> list[_SearchText]:
+        """Return the snippets matching the pattern, in order, up to `limit`.
+
+        Raises:
+            SearchTimeoutError: if matching runs past the time budget
+        """
+        deadline = time.monotonic() + self.time_budget
+        results = []
+        for snippet in snippets:
+            if limit is not None and len(results) >= limit:
+                break
+            self._check_deadline(deadline)
+            if self.could_match(snippet) and self.matches(snippet, deadline):
+                results.append(snippet)
+        return results
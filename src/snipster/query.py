@@ -0,0 +1,209 @@
+import re
+from dataclasses import dataclass
+from typing import AbstractSet, Callable
+
+from .exceptions import InvalidTagQueryError
+from .models import TagBase
+
+KEYWORDS = {"AND", "OR", "NOT"}
+TOKEN_PATTERN = re.compile(r"\(|\)|[^\s()]+")
+
+
+@dataclass(frozen=True)
+class TagTerm:
+    name: str
+
+
+@dataclass(frozen=True)
+class And:
+    operands: tuple["TagExpr", ...]
+
+
+@dataclass(frozen=True)
+class Or:
+    operands: tuple["TagExpr", ...]
+
+
+@dataclass(frozen=True)
+class Not:
+    operand: "TagExpr"
+
+
+TagExpr = TagTerm | And | Or | Not
+
+
+class _Parser:
+    """Recursive-descent parser for tag expressions.
+
+    Grammar, from lowest to highest precedence:
+        or_expr  := and_expr ("OR" and_expr)*
+        and_expr := unary (["AND"] unary)*
+        unary    := "NOT" unary | "(" or_expr ")" | TAG
+
+    Adjacent operands are joined with AND, so `rust NOT legacy` reads as
+    `rust AND NOT legacy`. Keywords are case-insensitive.
+    """
+
+    def __init__(self, text: str) -> None:
+        self._text = text
+        self._tokens = TOKEN_PATTERN.findall(text)
+        self._position = 0
+
+    def parse(self) -> TagExpr:
+        if not self._tokens:
+            raise InvalidTagQueryError("Tag query is empty")
+        expr = self._or_expr()
+        if self._peek() is not None:
+            raise InvalidTagQueryError(
+                f"Unexpected '{self._peek()}' in tag query '{self._text}'"
+            )
+        return expr
+
+    def _peek(self) -> str | None:
+        if self._position < len(self._tokens):
+            return self._tokens[self._position]
+        return None
+
+    def _peek_keyword(self) -> str | None:
+        token = self._peek()
+        if token is not None and token.upper() in KEYWORDS:
+            return token.upper()
+        return None
+
+    def _advance(self) -> str:
+        token = self._peek()
+        if token is None:
+            raise InvalidTagQueryError(f"Tag query '{self._text}' ended unexpectedly")
+        self._position += 1
+        return token
+
+    def _or_expr(self) -> TagExpr:
+        operands = [self._and_expr()]
+        while self._peek_keyword() == "OR":
+            self._advance()
+            operands.append(self._and_expr())
+        return operands[0] if len(operands) == 1 else Or(tuple(operands))
+
+    def _and_expr(self) -> TagExpr:
+        operands = [self._unary()]
+        while (token := self._peek()) is not None and token != ")":
+            keyword = self._peek_keyword()
+            if keyword == "OR":
+                break
+            if keyword == "AND":
+                self._advance()
+            operands.append(self._unary())
+        return operands[0] if len(operands) == 1 else And(tuple(operands))
+
+    def _unary(self) -> TagExpr:
+        keyword = self._peek_keyword()
+        token = self._advance()
+        if keyword == "NOT":
+            return Not(self._unary())
+        if keyword is not None:
+            raise InvalidTagQueryError(
+                f"Expected a tag before '{token}' in tag query '{self._text}'"
+            )
+        if token == "(":
+            expr = self._or_expr()
+            if self._peek() != ")":
+                raise InvalidTagQueryError(f"Missing ')' in tag query '{self._text}'")
+            self._advance()
+            return expr
+        if token == ")":
+            raise InvalidTagQueryError(f"Unexpected ')' in tag query '{self._text}'")
+        return TagTerm(TagBase.clean_tag_name(token))
+
+
+def parse_tag_query(text: str) -> TagExpr:
+    """Parse a boolean tag expression such as `(sql AND perf) OR rust NOT legacy`.
+    Tag names are normalized the same way as `Tag.name`.
+
+    Args:
+        text (str): tag expression
+
+    Returns:
+        TagExpr: parsed expression tree
+
+    Raises:
+        InvalidTagQueryError: if the expression is malformed
+    """
+    return _Parser(text).parse()
+
+
+def combine_tag_filters(
+    tag_name: str | None = None, tags: str | None = None
+) -> TagExpr | None:
+    """Merge the single `tag_name` filter and a `tags` expression into one expression.
+    Returns None when neither filter is given.
+    """
+    exprs = []
+    if tag_name is not None:
+        exprs.append(TagTerm(tag_name))
+    if tags is not None:
+        exprs.append(parse_tag_query(tags))
+    if not exprs:
+        return None
+    return exprs[0] if len(exprs) == 1 else And(tuple(exprs))
+
+
+def tag_names(expr: TagExpr) -> list[str]:
+    """Return the distinct tag names an expression refers to, in order."""
+    match expr:
+        case TagTerm(name):
+            return [name]
+        case And(operands) | Or(operands):
+            names = (name for operand in operands for name in tag_names(operand))
+            return list(dict.fromkeys(names))
+        case Not(operand):
+            return tag_names(operand)
+
+
+def evaluate(
+    expr: TagExpr,
+    postings: Callable[[str], AbstractSet[int]],
+    universe: AbstractSet[int],
+) -> AbstractSet[int]:
+    """Evaluate a tag expression with set algebra over postings lists.
+    AND intersects from the smallest operand and subtracts negated operands, so
+    its cost follows the smallest postings list rather than the corpus size. Only
+    a NOT with nothing to subtract from falls back to the `universe` of all IDs.
+    The result may be a live postings set and must not be modified.
+
+    Args:
+        expr (TagExpr): parsed tag expression
+        postings (Callable[[str], AbstractSet[int]]): returns IDs carrying a tag
+        universe (AbstractSet[int]): IDs of every snippet
+
+    Returns:
+        AbstractSet[int]: IDs of snippets matching the expression
+    """
+    match expr:
+        case TagTerm(name):
+            return postings(name)
+        case Or(operands):
+            return set().union(
+                *(evaluate(operand, postings, universe) for operand in operands)
+            )
+        case And(operands):
+            positive = [
+                evaluate(operand, postings, universe)
+                for operand in operands
+                if not isinstance(operand, Not)
+            ]
+            negative = [
+                evaluate(operand.operand, postings, universe)
+                for operand in operands
+                if isinstance(operand, Not)
+            ]
+            if positive:
+                smallest, *others = sorted(positive, key=len)
+                result = set(smallest).intersection(*others)
+            else:
+                result = set(universe)
+            for excluded in negative:
+                # difference() walks whichever of the two sets is smaller
+                result = result.difference(excluded)
+            return result
+        case Not(operand):
+            return universe - evaluate(operand, postings, universe)
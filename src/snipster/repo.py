@@ -1,15 +1,92 @@
 import json
+import sys
+import threading
+import time
 from abc import ABC, abstractmethod
+from bisect import bisect_right
+from contextlib import contextmanager
 from datetime import datetime, timezone
 from difflib import SequenceMatcher
+from enum import StrEnum
+from itertools import groupby
+from operator import itemgetter
 from pathlib import Path
-from typing import Sequence
+from typing import Collection, Iterator, NamedTuple, Sequence
 
 from sqlalchemy import Engine  # for typing
-from sqlmodel import Session, or_, select
+from sqlalchemy.orm import load_only, raiseload
+from sqlalchemy.orm.attributes import manager_of_class, set_committed_value
+from sqlmodel import Session, and_, func, not_, or_, select
+
+from .autocomplete import CompletionField, CompletionIndex
+from .coalescer import WriteCoalescer
+from .compressed import get_compressor, pack_text, unpack_text
+from .exceptions import (
+    DuplicateSnippetError,
+    InvalidSnapshotError,
+    SnippetNotFoundError,
+)
+from .fulltext import BM25Index
+from .index import SnippetIndex
+from .models import (
+    ChangeOperation,
+    LangEnum,
+    Snippet,
+    SnippetBucket,
+    SnippetChange,
+    SnippetFacetCount,
+    SnippetFacets,
+    SnippetTagLink,
+    SQLModel,
+    Tag,
+    hash_content,
+    normalize_text,
+    search_texts,
+)
+from .patterns import RegexQuery
+from .query import And, Not, Or, TagExpr, TagTerm, combine_tag_filters
+from .similarity import (
+    band_buckets,
+    candidate_pairs,
+    decode_signature,
+    encode_signature,
+    minhash,
+    similarity,
+)
+from .snapshot import read_snapshot, write_snapshot
+
+
+class DuplicatePolicy(StrEnum):
+    """What `add` does with a snippet whose code and language, going by their
+    content hash, match a stored snippet.
+
+    ALLOW: store it like any other snippet.
+    REJECT: raise `DuplicateSnippetError` with the stored snippet's ID.
+    MERGE: don't store it; its tags and favorite flag are added to the stored
+        snippet, and its `duplicate_of` is set to that snippet's ID.
+    LINK: store it with `duplicate_of` set to the stored snippet's ID.
+    """
+
+    ALLOW = "allow"
+    REJECT = "reject"
+    MERGE = "merge"
+    LINK = "link"
+
 
-from .exceptions import SnippetNotFoundError
-from .models import LangEnum, Snippet, Tag
+class SearchMode(StrEnum):
+    """How `search` matches the term against snippets.
+
+    SIMPLE: snippets whose title, code or description contain the term.
+    FUZZY: snippets whose title, code or description resemble the term.
+    RANKED: snippets sharing any token with the term, best BM25 score first.
+    REGEX: snippets whose title, code or description match the term as a
+        regular expression.
+    """
+
+    SIMPLE = "simple"
+    FUZZY = "fuzzy"
+    RANKED = "ranked"
+    REGEX = "regex"
 
 
 class SnippetRepository(ABC):  # pragma: no cover
@@ -18,18 +95,40 @@ class SnippetRepository(ABC):  # pragma: no cover
     Also contains helper methods that are common between subclasses.
     """
 
+    # seconds a regex search may spend matching before it gives up
+    REGEX_TIME_BUDGET = 1.0
+
     @abstractmethod
-    def add(self, snippet: Snippet) -> None:
+    def add(
+        self, snippet: Snippet, duplicates: DuplicatePolicy = DuplicatePolicy.ALLOW
+    ) -> None:
+        """Store a snippet. `duplicates` decides what happens if it duplicates a
+        stored snippet; see `DuplicatePolicy`.
+        """
         pass
 
     @abstractmethod
-    def list(self) -> Sequence[Snippet]:
+    def list(self, fields: Collection[str] | None = None) -> Sequence[Snippet]:
+        """List all snippets.
+        `fields` names the `SnippetRead` fields the caller will read. Repositories
+        may skip loading other fields, so they must not be accessed.
+        """
         pass
 
     @abstractmethod
     def get(self, snippet_id: int) -> Snippet | None:
         pass
 
+    @abstractmethod
+    def get_many(
+        self, snippet_ids: Sequence[int], fields: Collection[str] | None = None
+    ) -> Sequence[Snippet]:
+        """Get several snippets at once, in the order of `snippet_ids`.
+        Missing IDs are skipped and repeated IDs are returned once.
+        `fields` limits the fields loaded, as for `list`.
+        """
+        pass
+
     @abstractmethod
     def delete(self, snippet_id: int) -> None:
         pass
@@ -41,7 +140,24 @@ class SnippetRepository(ABC):  # pragma: no cover
         tag_name: str | None = None,
         language: LangEnum | None = None,
         fuzzy: bool = False,
+        tags: str | None = None,
+        fields: Collection[str] | None = None,
+        mode: SearchMode | None = None,
+        limit: int | None = None,
+        within: Collection[int] | None = None,
     ) -> Sequence[Snippet]:
+        """Search snippets by term, optionally filtered by tags and language.
+        `tags` is a boolean tag expression such as `(sql AND perf) OR rust NOT
+        legacy`; it is combined with `tag_name` using AND.
+        `fields` limits the fields loaded, as for `list`.
+        `mode` picks how the term is matched, see `SearchMode`; without it,
+        `fuzzy` picks between fuzzy and simple matching. `limit` caps the number
+        of results, which lets ranked searches skip snippets that can't make it.
+        `within` restricts the search to the snippets with these IDs.
+        Raises `InvalidTagQueryError` for a malformed expression, and for regex
+        searches `InvalidSearchPatternError` for a malformed or backtracking-prone
+        pattern and `SearchTimeoutError` when matching runs past the time budget.
+        """
         pass
 
     @abstractmethod
@@ -52,41 +168,222 @@ class SnippetRepository(ABC):  # pragma: no cover
     def tag(self, snippet_id: int, /, *tags: Tag, remove: bool = False) -> None:
         pass
 
+    @abstractmethod
+    def changes(self, since: int = 0, limit: int = 100) -> Sequence[SnippetChange]:
+        """Return change log entries after the `since` cursor, oldest first.
+        Every add, delete, favorite toggle and tag update appends an entry.
+        """
+        pass
+
+    @abstractmethod
+    def autocomplete(
+        self, field: CompletionField, prefix: str, limit: int = 10
+    ) -> Sequence[tuple[str, int]]:
+        """Suggest tag names or title words starting with `prefix`, as pairs of
+        the suggestion and the number of snippets using it, most used first.
+        """
+        pass
+
+    @abstractmethod
+    def suggest_tags(
+        self, tag_name: str, max_distance: int | None = None, limit: int = 5
+    ) -> Sequence[tuple[str, int]]:
+        """Suggest tag names in use within a small edit distance of `tag_name`,
+        for "did you mean" hints, with the number of snippets using each.
+        Returns nothing when `tag_name` is itself in use.
+        """
+        pass
+
+    @abstractmethod
+    def facets(self, term: str | None = None) -> SnippetFacets:
+        """Count snippets per language, tag and favorite flag.
+        With a `term`, only snippets matching a non-fuzzy search for it are counted.
+        """
+        pass
+
+    @abstractmethod
+    def find_duplicate(self, snippet: Snippet) -> Snippet | None:
+        """Return the oldest stored snippet with the same content hash as
+        `snippet`, other than `snippet` itself.
+        """
+        pass
+
+    @abstractmethod
+    def duplicate_groups(self) -> Sequence[Sequence[int]]:
+        """Return the IDs of snippets sharing a content hash, as one ascending
+        list per hash held by more than one snippet.
+        """
+        pass
+
+    @abstractmethod
+    def related(
+        self, snippet_id: int, limit: int = 10, threshold: float = 0.5
+    ) -> Sequence[tuple[Snippet, float]]:
+        """Return snippets with code similar to the given snippet's, each with
+        its estimated similarity, most similar first. Candidates are the
+        snippets sharing an LSH bucket with it, so the rest are never compared.
+        Raises `SnippetNotFoundError` if the snippet doesn't exist.
+        """
+        pass
+
+    @abstractmethod
+    def near_duplicates(
+        self, threshold: float = 0.8
+    ) -> Sequence[tuple[int, int, float]]:
+        """Return pairs of snippet IDs with an estimated similarity of at least
+        `threshold`, smaller ID first, most similar pairs first. Only pairs
+        sharing an LSH bucket are compared. Exact copies are represented by the
+        smallest of their IDs, see `similarity.candidate_pairs`.
+        """
+        pass
+
+    def dedupe(self, dry_run: bool = False) -> dict[int, int]:
+        """Collapse snippets with the same content hash into the oldest of them.
+        Tags and favorite flags of the removed copies are merged into the one
+        kept. Duplicates are grouped by hash, so snippets are never compared
+        with each other.
+
+        Args:
+            dry_run (bool): if True, only report what would be merged
+
+        Returns:
+            dict[int, int]: ID of each removed snippet mapped to the ID kept
+        """
+        merged = {}
+        for canonical_id, *duplicate_ids in self.duplicate_groups():
+            merged.update(dict.fromkeys(duplicate_ids, canonical_id))
+            if dry_run:
+                continue
+            canonical, *copies = self.get_many([canonical_id, *duplicate_ids])
+            self._merge_into(canonical, copies)
+            for duplicate_id in duplicate_ids:
+                self.delete(duplicate_id)
+        return merged
+
+    def batches(
+        self, batch_size: int = 1000, fields: Collection[str] | None = None
+    ) -> Iterator[Sequence[Snippet]]:
+        """Yield every snippet in ID order, `batch_size` at a time, for exports.
+        `fields` works as for `list`.
+        """
+        snippets = sorted(self.list(fields), key=lambda snippet: snippet.id)
+        for start in range(0, len(snippets), batch_size):
+            yield snippets[start : start + batch_size]
+
+    def _apply_duplicate_policy(
+        self, snippet: Snippet, policy: DuplicatePolicy
+    ) -> bool:
+        """Check a snippet about to be added against the stored snippets.
+
+        Args:
+            snippet (Snippet): snippet to add
+            policy (DuplicatePolicy): what to do if it is a duplicate
+
+        Returns:
+            bool: True if the snippet was merged and must not be stored
+
+        Raises:
+            DuplicateSnippetError: if it is a duplicate and `policy` is REJECT
+        """
+        if policy == DuplicatePolicy.ALLOW:
+            return False
+        existing = self.find_duplicate(snippet)
+        if existing is None:
+            return False
+        if policy == DuplicatePolicy.REJECT:
+            raise DuplicateSnippetError(existing.id)
+        snippet.duplicate_of = existing.id
+        if policy == DuplicatePolicy.LINK:
+            return False
+        self._merge_into(existing, [snippet])
+        return True
+
+    def _merge_into(self, snippet: Snippet, copies: Sequence[Snippet]) -> None:
+        """Add the tags and favorite flag of duplicate copies to a stored snippet."""
+        tag_names = {tag.name for tag in snippet.tags}
+        # fresh tags, since the copies' own tags link back to the copies and
+        # saving them would save the copies too
+        new_tags = [
+            Tag(name=tag.name)
+            for copy in copies
+            for tag in copy.tags
+            if tag.name not in tag_names
+        ]
+        if new_tags:
+            self.tag(snippet.id, *new_tags)
+        if not snippet.favorite and any(copy.favorite for copy in copies):
+            self.toggle_favorite(snippet.id)
+
+    @staticmethod
+    def _rank_by_similarity(
+        signature: str, candidates: dict[int, str], threshold: float
+    ) -> Sequence[tuple[int, float]]:
+        """Score candidate signatures against a signature, keeping those at or
+        above `threshold`, most similar first.
+        """
+        decoded = decode_signature(signature)
+        scored = [
+            (snippet_id, similarity(decoded, decode_signature(candidate)))
+            for snippet_id, candidate in candidates.items()
+        ]
+        return sorted(
+            ((snippet_id, score) for snippet_id, score in scored if score >= threshold),
+            key=lambda item: (-item[1], item[0]),
+        )
+
+    @staticmethod
+    def _score_pairs(
+        pairs: Collection[tuple[int, int]],
+        signatures: dict[int, str],
+        threshold: float,
+    ) -> Sequence[tuple[int, int, float]]:
+        """Score candidate pairs by their signatures, keeping those at or above
+        `threshold`, most similar first.
+        """
+        decoded = {
+            snippet_id: decode_signature(signature)
+            for snippet_id, signature in signatures.items()
+        }
+        scored = [
+            (first, second, similarity(decoded[first], decoded[second]))
+            for first, second in pairs
+        ]
+        return sorted(
+            (pair for pair in scored if pair[2] >= threshold),
+            key=lambda pair: (-pair[2], pair[0], pair[1]),
+        )
+
+    @staticmethod
+    def _search_mode(mode: SearchMode | None, fuzzy: bool) -> SearchMode:
+        if mode is None:
+            return SearchMode.FUZZY if fuzzy else SearchMode.SIMPLE
+        return SearchMode(mode)
+
     def _simple_search(
         self,
         snippets: Sequence[Snippet],
         term: str,
-        tag_name: str | None = None,
-        language: LangEnum | None = None,
     ) -> Sequence[Snippet]:
         """Perform a search of snippets using a simple "is in" filter.
         Expects to receive snippets to search across and term to search by.
-        Also allows filtering by tag or language.
+        The term is compared against the precomputed normalized fields.
+        Tag and language filters are applied by the caller beforehand, so only
+        candidate snippets are matched.
 
         Args:
             snippets (Sequence[Snippet]): sequence of snippets to search
             term (str): search term
-            tag_name (str | None): name of tag to filter by
-            language (LangEnum | None): language to filter by
 
         Returns:
             Sequence[Snippet]: list of snippets matching search criteria
         """
         results = []
-        term_lower = term.lower()
+        term_norm = normalize_text(term)
         for snippet in snippets:
             has_term_match = any(
-                [
-                    term_lower in snippet.title.lower(),
-                    term_lower in snippet.code.lower(),
-                    term_lower in snippet.description.lower(),
-                ]
+                term_norm in field_norm for field_norm in search_texts(snippet)
             )
-            has_language_match = language is None or snippet.language == language
-            has_tag_match = tag_name is None or tag_name in (
-                t.name for t in snippet.tags
-            )
-            if all([has_term_match, has_language_match, has_tag_match]):
+            if has_term_match:
                 results.append(snippet)
         return results
 
@@ -94,43 +391,29 @@ class SnippetRepository(ABC):  # pragma: no cover
         self,
         snippets: Sequence[Snippet],
         term: str,
-        tag_name: str | None = None,
-        language: LangEnum | None = None,
     ) -> Sequence[Snippet]:
         """Perform a fuzzy search of snippets.
         Uses SequenceMatcher from `difflib` package to perform search
         against title, description, and code of snippets.
         Expects to receive snippets to search across and term to search by.
-        Also allows filtering by tag or language.
+        Tag and language filters are applied by the caller beforehand.
 
         Args:
             snippets (Sequence[Snippet]): sequence of snippets to search
             term (str): search term
-            tag_name (str | None): name of tag to filter by
-            language (LangEnum | None): language to filter by
 
         Returns:
             Sequence[Snippet]: list of snippets matching search criteria
         """
         PASS_THRESHOLD = 0.6
         results = []
-        term_lower = term.lower()
+        term_norm = normalize_text(term)
         for snippet in snippets:
             has_term_match = any(
-                [
-                    SequenceMatcher(a=term_lower, b=snippet.title.lower()).ratio()
-                    >= PASS_THRESHOLD,
-                    SequenceMatcher(a=term_lower, b=snippet.code.lower()).ratio()
-                    >= PASS_THRESHOLD,
-                    SequenceMatcher(a=term_lower, b=snippet.description.lower()).ratio()
-                    >= PASS_THRESHOLD,
-                ]
+                SequenceMatcher(a=term_norm, b=field_norm).ratio() >= PASS_THRESHOLD
+                for field_norm in search_texts(snippet)
             )
-            has_language_match = language is None or snippet.language == language
-            has_tag_match = tag_name is None or tag_name in (
-                t.name for t in snippet.tags
-            )
-            if all([has_term_match, has_language_match, has_tag_match]):
+            if has_term_match:
                 results.append(snippet)
         return results
 
@@ -178,56 +461,378 @@ class SnippetRepository(ABC):  # pragma: no cover
         snippet.updated_at = datetime.now(timezone.utc)
 
 
+class _SnippetRecord:
+    """Compact storage for one snippet in `InMemorySnippetRepository`.
+    Holds plain attribute values without Pydantic or SQLAlchemy state.
+    Tag names are interned strings shared by all records carrying the tag.
+    """
+
+    __slots__ = (
+        "id",
+        "title",
+        "code",
+        "description",
+        "language",
+        "favorite",
+        "created_at",
+        "updated_at",
+        "title_norm",
+        "code_norm",
+        "description_norm",
+        "content_hash",
+        "duplicate_of",
+        "minhash",
+        "tag_names",
+    )
+
+    def __init__(self, snippet: Snippet, tag_names: tuple[str, ...]) -> None:
+        self.id = snippet.id
+        self.title = snippet.title
+        self.code = snippet.code
+        self.description = snippet.description
+        self.language = LangEnum(snippet.language)
+        self.favorite = snippet.favorite
+        self.created_at = snippet.created_at
+        self.updated_at = snippet.updated_at
+        # reuse the source string when normalizing didn't change it
+        self.title_norm = _share(snippet.title, snippet.title_norm)
+        self.code_norm = _share(snippet.code, snippet.code_norm)
+        self.description_norm = _share(snippet.description, snippet.description_norm)
+        self.content_hash = snippet.content_hash
+        self.duplicate_of = snippet.duplicate_of
+        self.minhash = snippet.minhash
+        self.tag_names = tag_names
+
+
+def _share(value: str | None, norm_value: str) -> str:
+    return value if value == norm_value else norm_value
+
+
+def _construct(model: type[SQLModel], values: dict) -> SQLModel:
+    """Build a table model from trusted values the way SQLAlchemy does when
+    loading a row, skipping validation and attribute events. Far cheaper than
+    calling the model, which matters when materializing many records.
+    """
+    instance = manager_of_class(model).new_instance()
+    instance.__dict__.update(values)
+    object.__setattr__(instance, "__pydantic_fields_set__", set(values))
+    return instance
+
+
 class InMemorySnippetRepository(SnippetRepository):
     """In-memory implementation of Snippet repository.
-    Maintains storage in an internal `_snippets` dictionary.
+    Maintains storage in an internal `_records` dictionary of compact
+    `_SnippetRecord` objects. `Snippet` objects are only built when returned
+    to the caller, so changes to a returned snippet don't affect the store.
+    An `_index` of tag and language postings narrows filtered searches.
+
+    Writes are recorded in a change log for `changes`, unless `log_changes` is
+    off, as for a copy of another store that keeps its own log.
     """
 
-    def __init__(self) -> None:
-        self._snippets: dict[int, Snippet] = {}
+    def __init__(self, log_changes: bool = True) -> None:
+        self._records: dict[int, _SnippetRecord] = {}
+        self._index = SnippetIndex()
+        self._next_id = 1
+        self._tag_ids: dict[str, int] = {}
+        self._next_tag_id = 1
+        self._log_changes = log_changes
+        # (cursor, snippet_id, operation, changed_at) tuples, in cursor order
+        self._changes: list[tuple[int, int, ChangeOperation, datetime]] = []
+
+    def _register_tags(self, tags: Sequence[Tag]) -> tuple[str, ...]:
+        """Intern tag names and give each distinct name a stable ID.
+        Like the database repository, IDs are set on the incoming tags.
+        """
+        tag_names: dict[str, None] = {}
+        for tag in tags:
+            name = sys.intern(tag.name)
+            tag_id = self._tag_ids.get(name)
+            if tag_id is None:
+                tag_id = self._next_tag_id if tag.id is None else tag.id
+                self._tag_ids[name] = tag_id
+                self._next_tag_id = max(self._next_tag_id, tag_id + 1)
+            if tag.id != tag_id:
+                tag.id = tag_id
+            tag_names[name] = None
+        return tuple(tag_names)
+
+    def _store_snippet(self, snippet: Snippet) -> None:
+        if not snippet.minhash:
+            snippet.update_minhash()
+        tag_names = self._register_tags(snippet.tags)
+        self._unindex(snippet.id)
+        record = _SnippetRecord(snippet, tag_names)
+        self._records[snippet.id] = record
+        self._index.add(
+            record.id,
+            record.language,
+            record.tag_names,
+            record.favorite,
+            record.content_hash,
+            record.minhash,
+            record.title,
+        )
+        self._index.add_text(
+            record.id, record.title, record.description, record.code, record.tag_names
+        )
+
+    def _text_index(self) -> BM25Index:
+        """Return the full-text index, building it on the first ranked search."""
+        if self._index.text is None:
+            text = BM25Index()
+            for record in self._records.values():
+                text.add(
+                    record.id,
+                    record.title,
+                    record.description,
+                    record.code,
+                    record.tag_names,
+                )
+            self._index.text = text
+        return self._index.text
+
+    def _log(self, snippet_id: int, operation: ChangeOperation) -> None:
+        if not self._log_changes:
+            return
+        cursor = len(self._changes) + 1
+        changed_at = datetime.now(timezone.utc)
+        self._changes.append((cursor, snippet_id, operation, changed_at))
+
+    def _unindex(self, snippet_id: int) -> None:
+        record = self._records.get(snippet_id)
+        if record is not None:
+            self._index.remove(
+                record.id,
+                record.language,
+                record.tag_names,
+                record.favorite,
+                record.content_hash,
+                record.minhash,
+                record.title,
+            )
+
+    def _materialize(self, record: _SnippetRecord) -> Snippet:
+        snippet = _construct(
+            Snippet,
+            {
+                "id": record.id,
+                "title": record.title,
+                "code": record.code,
+                "description": record.description,
+                "language": record.language,
+                "favorite": record.favorite,
+                "created_at": record.created_at,
+                "updated_at": record.updated_at,
+                "title_norm": record.title_norm,
+                "code_norm": record.code_norm,
+                "description_norm": record.description_norm,
+                "content_hash": record.content_hash,
+                "duplicate_of": record.duplicate_of,
+                "minhash": record.minhash,
+            },
+        )
+        tags = [
+            _construct(Tag, {"id": self._tag_ids[name], "name": name})
+            for name in record.tag_names
+        ]
+        set_committed_value(snippet, "tags", tags)
+        return snippet
 
-    def add(self, snippet: Snippet) -> None:
+    def add(
+        self, snippet: Snippet, duplicates: DuplicatePolicy = DuplicatePolicy.ALLOW
+    ) -> None:
+        if self._apply_duplicate_policy(snippet, duplicates):
+            return
         if snippet.id is None:
-            snippet.id = max(self._snippets.keys(), default=0) + 1
-        self._snippets[snippet.id] = snippet
+            snippet.id = self._next_id
+        self._next_id = max(self._next_id, snippet.id + 1)
+        self._store_snippet(snippet)
+        self._log(snippet.id, ChangeOperation.UPSERT)
 
-    def list(self) -> Sequence[Snippet]:
-        return list(self._snippets.values())
+    def list(self, fields: Collection[str] | None = None) -> Sequence[Snippet]:
+        return [self._materialize(record) for record in self._records.values()]
 
     def get(self, snippet_id: int) -> Snippet | None:
-        return self._snippets.get(snippet_id)
+        record = self._records.get(snippet_id)
+        if record is not None:
+            return self._materialize(record)
+
+    def get_many(
+        self, snippet_ids: Sequence[int], fields: Collection[str] | None = None
+    ) -> Sequence[Snippet]:
+        return [
+            self._materialize(self._records[snippet_id])
+            for snippet_id in dict.fromkeys(snippet_ids)
+            if snippet_id in self._records
+        ]
 
     def delete(self, snippet_id: int) -> None:
-        if snippet_id in self._snippets:
-            self._snippets.pop(snippet_id)
+        if snippet_id in self._records:
+            self._unindex(snippet_id)
+            self._records.pop(snippet_id)
+            self._log(snippet_id, ChangeOperation.DELETE)
         else:
             raise SnippetNotFoundError
 
+    def find_duplicate(self, snippet: Snippet) -> Snippet | None:
+        duplicate_id = self._index.find_duplicate(snippet.content_hash, snippet.id)
+        if duplicate_id is not None:
+            return self.get(duplicate_id)
+
+    def duplicate_groups(self) -> Sequence[Sequence[int]]:
+        return self._index.duplicate_groups()
+
+    def related(
+        self, snippet_id: int, limit: int = 10, threshold: float = 0.5
+    ) -> Sequence[tuple[Snippet, float]]:
+        record = self._records.get(snippet_id)
+        if record is None:
+            raise SnippetNotFoundError
+        candidates = {
+            candidate_id: self._records[candidate_id].minhash
+            for candidate_id in self._index.similar.candidates(
+                decode_signature(record.minhash)
+            )
+            if candidate_id != snippet_id
+        }
+        ranked = self._rank_by_similarity(record.minhash, candidates, threshold)
+        return [
+            (self._materialize(self._records[candidate_id]), score)
+            for candidate_id, score in ranked[:limit]
+        ]
+
+    def near_duplicates(
+        self, threshold: float = 0.8
+    ) -> Sequence[tuple[int, int, float]]:
+        pairs = self._index.similar.candidate_pairs(
+            lambda snippet_id: self._records[snippet_id].content_hash
+        )
+        signatures = {
+            snippet_id: self._records[snippet_id].minhash
+            for pair in pairs
+            for snippet_id in pair
+        }
+        return self._score_pairs(pairs, signatures, threshold)
+
     def search(
         self,
         term: str,
         tag_name: str | None = None,
         language: LangEnum | None = None,
         fuzzy: bool = False,
+        tags: str | None = None,
+        fields: Collection[str] | None = None,
+        mode: SearchMode | None = None,
+        limit: int | None = None,
+        within: Collection[int] | None = None,
     ) -> Sequence[Snippet]:
-        snippets = self._snippets.values()
+        mode = self._search_mode(mode, fuzzy)
+        tag_query = combine_tag_filters(tag_name, tags)
+        candidate_ids = self._index.candidates(tag_query, language, within)
+        if mode == SearchMode.RANKED:
+            within = None if candidate_ids is None else set(candidate_ids)
+            ranked = self._text_index().search(term, limit, within)
+            return [
+                self._materialize(self._records[snippet_id]) for snippet_id, _ in ranked
+            ]
 
-        if fuzzy:
-            return self._fuzzy_search(snippets, term, tag_name, language)
+        if candidate_ids is None:
+            records = list(self._records.values())
+        else:
+            records = [self._records[snippet_id] for snippet_id in candidate_ids]
+        if mode == SearchMode.REGEX:
+            matches = RegexQuery(term, self.REGEX_TIME_BUDGET).search(records, limit)
+        elif mode == SearchMode.FUZZY:
+            matches = self._fuzzy_search(records, term)
         else:
-            return self._simple_search(snippets, term, tag_name, language)
+            matches = self._simple_search(records, term)
+        return [self._materialize(record) for record in matches[:limit]]
 
     def toggle_favorite(self, snippet_id: int) -> None:
-        snippet = self.get(snippet_id)
-        if snippet is None:
+        record = self._records.get(snippet_id)
+        if record is None:
             raise SnippetNotFoundError
-        self._update_favorite(snippet)
+        self._update_favorite(record)
+        self._index.set_favorite(record.id, record.favorite)
+        self._log(snippet_id, ChangeOperation.UPSERT)
 
     def tag(self, snippet_id: int, /, *tags: Tag, remove: bool = False) -> None:
         snippet = self.get(snippet_id)
         if snippet is None:
             raise SnippetNotFoundError
         self._update_tags(snippet, tags, remove)
+        self._store_snippet(snippet)
+        self._log(snippet_id, ChangeOperation.UPSERT)
+
+    def changes(self, since: int = 0, limit: int = 100) -> Sequence[SnippetChange]:
+        start = bisect_right(self._changes, since, key=lambda change: change[0])
+        return [
+            SnippetChange(
+                cursor=cursor,
+                snippet_id=snippet_id,
+                operation=operation,
+                changed_at=changed_at,
+            )
+            for cursor, snippet_id, operation, changed_at in self._changes[
+                start : start + limit
+            ]
+        ]
+
+    def autocomplete(
+        self, field: CompletionField, prefix: str, limit: int = 10
+    ) -> Sequence[tuple[str, int]]:
+        return self._index.completions.complete(field, prefix, limit)
+
+    def suggest_tags(
+        self, tag_name: str, max_distance: int | None = None, limit: int = 5
+    ) -> Sequence[tuple[str, int]]:
+        return self._index.completions.suggest_tags(tag_name, max_distance, limit)
+
+    def facets(self, term: str | None = None) -> SnippetFacets:
+        if not normalize_text(term):
+            return self._index.facets()
+        matches = self._simple_search(list(self._records.values()), term)
+        return self._index.facets({record.id for record in matches})
+
+    def save_snapshot(
+        self,
+        path: str | Path,
+        source: str = "memory",
+        version: int | None = None,
+        identity: str = "",
+    ) -> None:
+        """Write the repository and its indexes to a snapshot file.
+
+        Args:
+            path (str | Path): snapshot file
+            source (str): name of the store the snippets were loaded from
+            version (int | None): version of that store the snippets reflect;
+                defaults to the repository's own change log cursor
+            identity (str): identity of that store, if it has one
+        """
+        if version is None:
+            version = len(self._changes)
+        write_snapshot(path, self, source, version, identity)
+
+    @classmethod
+    def load_snapshot(
+        cls, path: str | Path, source: str = "memory", identity: str = ""
+    ) -> tuple["InMemorySnippetRepository", int]:
+        """Load a repository from a snapshot file written by `save_snapshot`.
+
+        Returns:
+            tuple[InMemorySnippetRepository, int]: the repository, and the
+                version of the source store it reflects
+
+        Raises:
+            InvalidSnapshotError: if the file is missing, damaged, outdated or
+                taken from another source
+        """
+        repo, version = read_snapshot(path, source, identity)
+        if not isinstance(repo, cls):
+            raise InvalidSnapshotError(f"Snapshot {path} holds no {cls.__name__}")
+        return repo, version
 
 
 class DBSnippetRepository(SnippetRepository):
@@ -235,23 +840,281 @@ class DBSnippetRepository(SnippetRepository):
     Maintains storage in an external database. An internal `_engine` attribute
     points to a SQLAlchemy engine object that communicate with the database.
     The engine must be defined before this class is instantiated.
+
+    Ranked searches use a full-text index held in memory, and autocompletion
+    prefix indexes of tag names and title words. Each is built on first use and
+    caught up with the change log on later ones, so writes from other sessions
+    and processes are picked up too.
+
+    With a `WriteCoalescer`, snippets are written in transactions shared with
+    concurrent writes through it, instead of one transaction each.
     """
 
-    def __init__(self, engine: Engine) -> None:
+    MAX_IDS_PER_QUERY = 500
+    CATCH_UP_BATCH_SIZE = 500
+
+    def __init__(self, engine: Engine, coalescer: WriteCoalescer | None = None) -> None:
         self._engine = engine
+        self._coalescer = coalescer
+        self._text: BM25Index | None = None
+        self._text_cursor = 0
+        self._completions: CompletionIndex | None = None
+        self._completions_cursor = 0
+        # the title and tag names each snippet was added to the completions with
+        self._completion_entries: dict[int, tuple[str, tuple[str, ...]]] = {}
+        self._lock = threading.Lock()
 
     def _store_snippet(self, snippet: Snippet) -> None:
+        if self._coalescer is not None:
+            self._coalescer.store(snippet)
+            return
         with Session(self._engine) as session:
             session.add(snippet)
             session.commit()
             session.refresh(snippet)
 
-    def add(self, snippet: Snippet) -> None:
+    def _track_tags(self, tags: Sequence[Tag]) -> tuple[Tag, ...]:
+        """Swap incoming tags for existing database rows with the same name.
+        Tag names are unique, so new rows are only created for unseen names.
+
+        Args:
+            tags (Sequence[Tag]): tags as given by the caller
+
+        Returns:
+            tuple[Tag, ...]: one tag per distinct name, tracked where possible
+        """
+        unique_tags = {tag.name: tag for tag in tags}
+        with Session(self._engine) as session:
+            existing_tags = session.exec(
+                select(Tag).where(Tag.name.in_(unique_tags.keys()))
+            ).all()
+        existing_tags_dict = {tag.name: tag for tag in existing_tags}
+        return tuple(
+            existing_tags_dict.get(name, tag) for name, tag in unique_tags.items()
+        )
+
+    def _tag_query_clause(self, expr: TagExpr):
+        """Compile a tag expression into a SQL condition on `Snippet.id`.
+        Each tag becomes an IN subquery that the tag name and link indexes can
+        answer directly, instead of a correlated EXISTS check against every snippet.
+        """
+        match expr:
+            case TagTerm(name):
+                tagged_ids = (
+                    select(SnippetTagLink.snippet_id)
+                    .join(Tag, Tag.id == SnippetTagLink.tag_id)
+                    .where(Tag.name == name)
+                )
+                return Snippet.id.in_(tagged_ids)
+            case And(operands):
+                return and_(*(self._tag_query_clause(op) for op in operands))
+            case Or(operands):
+                return or_(*(self._tag_query_clause(op) for op in operands))
+            case Not(operand):
+                return not_(self._tag_query_clause(operand))
+
+    def _load_options(
+        self, fields: Collection[str] | None, mode: SearchMode = SearchMode.SIMPLE
+    ):
+        """Build loader options that only load the columns behind `fields`.
+        Unlisted columns, such as large code bodies, are left unloaded, and tags
+        are not queried unless asked for. Fuzzy and regex matching read the
+        normalized search fields in Python, so those are loaded for them, and
+        regex matching reads the original text too.
+        """
+        if fields is None:
+            return []
+        columns = [
+            getattr(Snippet, field) for field in fields if field not in ("id", "tags")
+        ]
+        if mode in (SearchMode.FUZZY, SearchMode.REGEX):
+            columns += [Snippet.title_norm, Snippet.code_norm, Snippet.description_norm]
+        if mode == SearchMode.REGEX:
+            columns += [Snippet.title, Snippet.code, Snippet.description]
+        options = [load_only(Snippet.id, *columns)]
+        if "tags" not in fields:
+            options.append(raiseload(Snippet.tags))
+        return options
+
+    @property
+    def url(self) -> str:
+        """The database URL, without its password."""
+        return self._engine.url.render_as_string(hide_password=True)
+
+    def latest_cursor(self) -> int:
+        """Return the cursor of the newest change log entry, or 0 if there is none.
+        It changes on every write, so it doubles as a version of the stored data.
+        """
+        with Session(self._engine) as session:
+            cursor = session.exec(select(func.max(SnippetChange.cursor))).one()
+        return cursor or 0
+
+    def identity(self) -> str:
+        """Return an identifier of this database, taken from its first change log
+        entry, or an empty string while nothing is logged. A database recreated
+        at the same URL logs its first change anew, so it gets another one even
+        once its cursor has passed the old database's.
+        """
+        with Session(self._engine) as session:
+            first = session.exec(
+                select(SnippetChange.cursor, SnippetChange.changed_at)
+                .order_by(SnippetChange.cursor)
+                .limit(1)
+            ).first()
+        if first is None:
+            return ""
+        cursor, changed_at = first
+        return f"{cursor}@{changed_at.isoformat()}"
+
+    def _text_index(self) -> BM25Index:
+        """Return the full-text index, up to date with the change log."""
+        with self._lock:
+            if self._text is None:
+                # read the cursor first, so writes landing during the load are
+                # applied again by the next catch-up instead of being missed
+                cursor = self.latest_cursor()
+                text = BM25Index()
+                for snippet in self.list():
+                    text.add(
+                        snippet.id,
+                        snippet.title,
+                        snippet.description,
+                        snippet.code,
+                        [tag.name for tag in snippet.tags],
+                    )
+                self._text, self._text_cursor = text, cursor
+            elif self.latest_cursor() != self._text_cursor:
+                self._catch_up_text()
+            return self._text
+
+    def _changed_snippets(
+        self, cursor: int, fields: Collection[str] | None = None
+    ) -> Iterator[tuple[int, list[int], Sequence[Snippet]]]:
+        """Walk the change log after `cursor` in batches. Yields the cursor of
+        each batch's last entry, the IDs of the snippets it changed, and those
+        of the snippets that still exist.
+        """
+        while True:
+            changes = self.changes(cursor, self.CATCH_UP_BATCH_SIZE)
+            if not changes:
+                return
+            changed_ids = list({change.snippet_id for change in changes})
+            cursor = changes[-1].cursor
+            yield cursor, changed_ids, self.get_many(changed_ids, fields)
+
+    def _catch_up_text(self) -> None:
+        """Reindex the snippets changed after the full-text index's cursor."""
+        for cursor, changed_ids, snippets in self._changed_snippets(self._text_cursor):
+            for snippet_id in changed_ids:
+                self._text.remove(snippet_id)
+            for snippet in snippets:
+                self._text.add(
+                    snippet.id,
+                    snippet.title,
+                    snippet.description,
+                    snippet.code,
+                    [tag.name for tag in snippet.tags],
+                )
+            self._text_cursor = cursor
+
+    def _add_completions(self, snippets: Sequence[Snippet]) -> None:
+        for snippet in snippets:
+            entry = (snippet.title, tuple(tag.name for tag in snippet.tags))
+            self._completions.add(*entry)
+            self._completion_entries[snippet.id] = entry
+
+    def _completion_index(self) -> CompletionIndex:
+        """Return the autocompletion index, up to date with the change log."""
+        fields = ["id", "title", "tags"]
+        with self._lock:
+            if self._completions is None:
+                cursor = self.latest_cursor()
+                self._completions, self._completion_entries = CompletionIndex(), {}
+                self._add_completions(self.list(fields))
+                self._completions_cursor = cursor
+            elif self.latest_cursor() != self._completions_cursor:
+                for cursor, changed_ids, snippets in self._changed_snippets(
+                    self._completions_cursor, fields
+                ):
+                    for snippet_id in changed_ids:
+                        entry = self._completion_entries.pop(snippet_id, None)
+                        if entry is not None:
+                            self._completions.remove(*entry)
+                    self._add_completions(snippets)
+                    self._completions_cursor = cursor
+            return self._completions
+
+    def _literals_clause(self, literals: Sequence[str]):
+        """Build the SQL condition for a normalized field holding every literal
+        a regex search requires, so only those rows are matched in Python.
+        Rows with large text lacking a normalized copy are always matched.
+        """
+        return or_(
+            *(
+                and_(
+                    *(column.contains(literal, autoescape=True) for literal in literals)
+                )
+                for column in (
+                    Snippet.title_norm,
+                    Snippet.code_norm,
+                    Snippet.description_norm,
+                )
+            ),
+            Snippet.code_norm.is_(None),
+            Snippet.description_norm.is_(None),
+        )
+
+    def _term_clause(self, term_norm: str):
+        """Build the SQL condition for a non-fuzzy search on a normalized term.
+        Rows with large text lacking a normalized copy are matched in Python
+        first and included by ID.
+        """
+        return or_(
+            Snippet.title_norm.contains(term_norm, autoescape=True),
+            Snippet.code_norm.contains(term_norm, autoescape=True),
+            Snippet.description_norm.contains(term_norm, autoescape=True),
+            Snippet.id.in_(self._unnormalized_matches(term_norm)),
+        )
+
+    def _unnormalized_matches(self, term_norm: str) -> list[int]:
+        """Return the IDs of snippets with large text lacking a normalized copy
+        that contain the term, decompressing only those snippets.
+        """
+        query = (
+            select(Snippet)
+            .options(
+                load_only(
+                    Snippet.id,
+                    Snippet.title_norm,
+                    Snippet.code_norm,
+                    Snippet.description_norm,
+                    Snippet.code,
+                    Snippet.description,
+                ),
+                raiseload(Snippet.tags),
+            )
+            .where(or_(Snippet.code_norm.is_(None), Snippet.description_norm.is_(None)))
+        )
+        with Session(self._engine) as session:
+            return [
+                snippet.id
+                for snippet in session.exec(query.execution_options(yield_per=100))
+                if any(term_norm in field_norm for field_norm in search_texts(snippet))
+            ]
+
+    def add(
+        self, snippet: Snippet, duplicates: DuplicatePolicy = DuplicatePolicy.ALLOW
+    ) -> None:
+        if self._apply_duplicate_policy(snippet, duplicates):
+            return
+        if snippet.tags:
+            snippet.tags = list(self._track_tags(snippet.tags))
         self._store_snippet(snippet)
 
-    def list(self) -> Sequence[Snippet]:
+    def list(self, fields: Collection[str] | None = None) -> Sequence[Snippet]:
+        query = select(Snippet).options(*self._load_options(fields))
         with Session(self._engine) as session:
-            snippets = session.exec(select(Snippet)).all()
+            snippets = session.exec(query).all()
         return snippets
 
     def get(self, snippet_id: int) -> Snippet | None:
@@ -259,6 +1122,46 @@ class DBSnippetRepository(SnippetRepository):
             snippet = session.get(Snippet, snippet_id)
         return snippet
 
+    def batches(
+        self, batch_size: int = 1000, fields: Collection[str] | None = None
+    ) -> Iterator[Sequence[Snippet]]:
+        # keyset pages, each read in its own session, so only one batch is ever
+        # held and no read transaction stays open between batches
+        query = (
+            select(Snippet)
+            .options(*self._load_options(fields))
+            .order_by(Snippet.id)
+            .limit(batch_size)
+        )
+        last_id = 0
+        while True:
+            with Session(self._engine) as session:
+                batch = session.exec(query.where(Snippet.id > last_id)).all()
+            if batch:
+                yield batch
+            if len(batch) < batch_size:
+                return
+            last_id = batch[-1].id
+
+    def get_many(
+        self, snippet_ids: Sequence[int], fields: Collection[str] | None = None
+    ) -> Sequence[Snippet]:
+        # one IN query for the snippets, plus one selectin query for their tags,
+        # per chunk of IDs so long lists stay under SQLite's bound parameter limit
+        unique_ids = list(dict.fromkeys(snippet_ids))
+        options = self._load_options(fields)
+        snippets = {}
+        with Session(self._engine) as session:
+            for start in range(0, len(unique_ids), self.MAX_IDS_PER_QUERY):
+                chunk = unique_ids[start : start + self.MAX_IDS_PER_QUERY]
+                query = select(Snippet).where(Snippet.id.in_(chunk)).options(*options)
+                snippets.update(
+                    (snippet.id, snippet) for snippet in session.exec(query)
+                )
+        return [
+            snippets[snippet_id] for snippet_id in unique_ids if snippet_id in snippets
+        ]
+
     def delete(self, snippet_id: int) -> None:
         with Session(self._engine) as session:
             snippet = session.get(Snippet, snippet_id)
@@ -268,34 +1171,153 @@ class DBSnippetRepository(SnippetRepository):
             else:
                 raise SnippetNotFoundError
 
+    def find_duplicate(self, snippet: Snippet) -> Snippet | None:
+        query = (
+            select(Snippet)
+            .where(Snippet.content_hash == snippet.content_hash)
+            .order_by(Snippet.id)
+            .limit(1)
+        )
+        if snippet.id is not None:
+            query = query.where(Snippet.id != snippet.id)
+        with Session(self._engine) as session:
+            return session.exec(query).first()
+
+    def duplicate_groups(self) -> Sequence[Sequence[int]]:
+        # one pass over the content hash index, in hash order, so each group's
+        # rows arrive together and only the groups themselves are held
+        shared_hashes = (
+            select(Snippet.content_hash)
+            .group_by(Snippet.content_hash)
+            .having(func.count() > 1)
+        )
+        query = (
+            select(Snippet.content_hash, Snippet.id)
+            .where(Snippet.content_hash.in_(shared_hashes))
+            .order_by(Snippet.content_hash, Snippet.id)
+            .execution_options(yield_per=1000)
+        )
+        with Session(self._engine) as session:
+            rows = session.exec(query)
+            groups = [
+                [snippet_id for _, snippet_id in group]
+                for _, group in groupby(rows, key=itemgetter(0))
+            ]
+        return sorted(groups)
+
+    def related(
+        self, snippet_id: int, limit: int = 10, threshold: float = 0.5
+    ) -> Sequence[tuple[Snippet, float]]:
+        with Session(self._engine) as session:
+            snippet = session.get(Snippet, snippet_id)
+            if snippet is None:
+                raise SnippetNotFoundError
+            buckets = band_buckets(decode_signature(snippet.minhash))
+            bucketed_ids = select(SnippetBucket.snippet_id).where(
+                SnippetBucket.bucket.in_(buckets)
+            )
+            candidates = session.exec(
+                select(Snippet.id, Snippet.minhash).where(
+                    Snippet.id.in_(bucketed_ids), Snippet.id != snippet_id
+                )
+            ).all()
+        ranked = self._rank_by_similarity(snippet.minhash, dict(candidates), threshold)[
+            :limit
+        ]
+        snippets = self.get_many([candidate_id for candidate_id, _ in ranked])
+        scores = dict(ranked)
+        return [(snippet, scores[snippet.id]) for snippet in snippets]
+
+    def near_duplicates(
+        self, threshold: float = 0.8
+    ) -> Sequence[tuple[int, int, float]]:
+        # one pass over the bucket index in bucket order, as for duplicate_groups,
+        # then the hashes and signatures of the snippets in shared buckets only
+        shared_buckets = (
+            select(SnippetBucket.bucket)
+            .group_by(SnippetBucket.bucket)
+            .having(func.count() > 1)
+        )
+        query = (
+            select(SnippetBucket.bucket, SnippetBucket.snippet_id)
+            .where(SnippetBucket.bucket.in_(shared_buckets))
+            .order_by(SnippetBucket.bucket)
+            .execution_options(yield_per=1000)
+        )
+        content_hashes, signatures = {}, {}
+        with Session(self._engine) as session:
+            rows = session.exec(query)
+            groups = [
+                [snippet_id for _, snippet_id in group]
+                for _, group in groupby(rows, key=itemgetter(0))
+            ]
+            ids = sorted({snippet_id for group in groups for snippet_id in group})
+            for start in range(0, len(ids), self.MAX_IDS_PER_QUERY):
+                chunk = ids[start : start + self.MAX_IDS_PER_QUERY]
+                for snippet_id, content_hash, signature in session.exec(
+                    select(Snippet.id, Snippet.content_hash, Snippet.minhash).where(
+                        Snippet.id.in_(chunk)
+                    )
+                ):
+                    content_hashes[snippet_id] = content_hash
+                    signatures[snippet_id] = signature
+        pairs = candidate_pairs(groups, content_hashes.__getitem__)
+        return self._score_pairs(pairs, signatures, threshold)
+
     def search(
         self,
         term: str,
         tag_name: str | None = None,
         language: LangEnum | None = None,
         fuzzy: bool = False,
+        tags: str | None = None,
+        fields: Collection[str] | None = None,
+        mode: SearchMode | None = None,
+        limit: int | None = None,
+        within: Collection[int] | None = None,
     ) -> Sequence[Snippet]:
-        if fuzzy:
+        mode = self._search_mode(mode, fuzzy)
+        filters = []
+        tag_query = combine_tag_filters(tag_name, tags)
+        if tag_query is not None:
+            filters.append(self._tag_query_clause(tag_query))
+        if language is not None:
+            filters.append(Snippet.language == language)
+        if within is not None:
+            filters.append(Snippet.id.in_(within))
+
+        if mode == SearchMode.RANKED:
+            within = None
+            if filters:
+                with Session(self._engine) as session:
+                    within = set(session.exec(select(Snippet.id).where(*filters)))
+            ranked = self._text_index().search(term, limit, within)
+            return self.get_many([snippet_id for snippet_id, _ in ranked], fields)
+
+        query = (
+            select(Snippet).options(*self._load_options(fields, mode)).where(*filters)
+        )
+        if mode == SearchMode.REGEX:
+            regex_query = RegexQuery(term, self.REGEX_TIME_BUDGET)
+            if regex_query.literals:
+                query = query.where(self._literals_clause(regex_query.literals))
+            with Session(self._engine) as session:
+                rows = session.exec(query.execution_options(yield_per=500))
+                return regex_query.search(rows, limit)
+        elif mode == SearchMode.FUZZY:
             with Session(self._engine) as session:
-                all_records = session.exec(select(Snippet)).all()
-                results = self._fuzzy_search(all_records, term, tag_name, language)
-                return results
+                candidates = session.exec(query).all()
+                results = self._fuzzy_search(candidates, term)
+                return results[:limit]
         else:
             results = []
-            term_lower = term.lower()
+            term_norm = normalize_text(term)
+            # an empty term matches everything, which leaves the filters above
+            # free to use their indexes
+            if term_norm:
+                query = query.where(self._term_clause(term_norm))
             with Session(self._engine) as session:
-                query = select(Snippet).where(
-                    or_(
-                        Snippet.title.ilike(f"%{term_lower}%"),
-                        Snippet.code.ilike(f"%{term_lower}%"),
-                        Snippet.description.ilike(f"%{term_lower}%"),
-                    )
-                )
-                if tag_name is not None:
-                    query = query.where(Snippet.tags.any(Tag.name == tag_name))
-                if language is not None:
-                    query = query.where(Snippet.language == language)
-                results = session.exec(query).all()
+                results = session.exec(query.limit(limit)).all()
             return results
 
     def toggle_favorite(self, snippet_id: int) -> None:
@@ -311,19 +1333,117 @@ class DBSnippetRepository(SnippetRepository):
             raise SnippetNotFoundError
 
         # get existing tags from database, if applicable
-        tag_names = {tag.name for tag in tags}
-        with Session(self._engine) as session:
-            existing_tags = session.exec(
-                select(Tag).where(Tag.name.in_(tag_names))
-            ).all()
-            existing_tags_dict = {tag.name: tag for tag in existing_tags}
-            tags_tracked = tuple(
-                [existing_tags_dict.get(tag.name, tag) for tag in tags]
-            )
+        tags_tracked = self._track_tags(tags)
 
         self._update_tags(snippet, tags_tracked, remove)
         self._store_snippet(snippet)
 
+    def changes(self, since: int = 0, limit: int = 100) -> Sequence[SnippetChange]:
+        # entries are written by a flush listener in models.py, so every
+        # session that writes snippets is logged, not only this repository's
+        query = (
+            select(SnippetChange)
+            .where(SnippetChange.cursor > since)
+            .order_by(SnippetChange.cursor)
+            .limit(limit)
+        )
+        with Session(self._engine) as session:
+            return session.exec(query).all()
+
+    def autocomplete(
+        self, field: CompletionField, prefix: str, limit: int = 10
+    ) -> Sequence[tuple[str, int]]:
+        return self._completion_index().complete(field, prefix, limit)
+
+    def suggest_tags(
+        self, tag_name: str, max_distance: int | None = None, limit: int = 5
+    ) -> Sequence[tuple[str, int]]:
+        return self._completion_index().suggest_tags(tag_name, max_distance, limit)
+
+    def facets(self, term: str | None = None) -> SnippetFacets:
+        term_norm = normalize_text(term)
+        if not term_norm:
+            # running counts, kept by a flush listener in models.py
+            with Session(self._engine) as session:
+                rows = session.exec(
+                    select(SnippetFacetCount).where(SnippetFacetCount.count > 0)
+                ).all()
+            counts = {(row.facet, row.value): row.count for row in rows}
+            return SnippetFacets.from_counts(
+                total=counts.get(("total", ""), 0),
+                favorites=counts.get(("favorite", ""), 0),
+                languages={
+                    LangEnum(value): count
+                    for (facet, value), count in counts.items()
+                    if facet == "language"
+                },
+                tags={
+                    value: count
+                    for (facet, value), count in counts.items()
+                    if facet == "tag"
+                },
+            )
+
+        # grouped counts over the language, favorite and tag link indexes,
+        # limited to the snippets matching the term
+        scope = [self._term_clause(term_norm)]
+        tag_scope = [SnippetTagLink.snippet_id.in_(select(Snippet.id).where(*scope))]
+        with Session(self._engine) as session:
+            total = session.exec(
+                select(func.count()).select_from(Snippet).where(*scope)
+            ).one()
+            favorites = session.exec(
+                select(func.count()).where(Snippet.favorite, *scope)
+            ).one()
+            languages = session.exec(
+                select(Snippet.language, func.count())
+                .where(*scope)
+                .group_by(Snippet.language)
+            ).all()
+            tags = session.exec(
+                select(Tag.name, func.count())
+                .join(SnippetTagLink, SnippetTagLink.tag_id == Tag.id)
+                .where(*tag_scope)
+                .group_by(Tag.name)
+            ).all()
+        return SnippetFacets.from_counts(
+            total=total,
+            favorites=favorites,
+            languages=dict(languages),
+            tags=dict(tags),
+        )
+
+
+class _StoredText(NamedTuple):
+    """The normalized text of a stored snippet dictionary, for matching search
+    terms without deserializing, and decompressing, every snippet.
+    """
+
+    title_norm: str
+    code_norm: str
+    description_norm: str
+    snippet_dict: dict
+
+    @classmethod
+    def from_dict(cls, snippet_dict: dict) -> "_StoredText":
+        if "title_norm" not in snippet_dict:  # written before normalized fields
+            return cls(
+                normalize_text(snippet_dict["title"]),
+                normalize_text(unpack_text(snippet_dict["code"])),
+                normalize_text(unpack_text(snippet_dict.get("description"))),
+                snippet_dict,
+            )
+        code_norm = snippet_dict["code_norm"]
+        description_norm = snippet_dict["description_norm"]
+        # large text is stored without a normalized copy
+        if code_norm is None:
+            code_norm = normalize_text(unpack_text(snippet_dict["code"]))
+        if description_norm is None:
+            description_norm = normalize_text(unpack_text(snippet_dict["description"]))
+        return cls(
+            snippet_dict["title_norm"], code_norm, description_norm, snippet_dict
+        )
+
 
 class JSONSnippetRepository(SnippetRepository):
     """File-based JSON implementation of Snippet repository.
@@ -334,55 +1454,195 @@ class JSONSnippetRepository(SnippetRepository):
     A series of helper methods handle the writing and reading of the file
     as well as the serialization and deserialization between Snippet objects
     and JSON-compatible python dictionaries.
+
+    An `_index` of tag and language postings is kept between calls. It is updated
+    by this repository's writes and rebuilt when the file changes underneath it.
+
+    The change log is appended to a separate `changes.jsonl` file, one entry
+    per line.
     """
 
+    _COMPRESSED_FIELDS = ("code", "description")
+
     def __init__(self, file_dir: Path) -> None:
         self._file_path = file_dir / "snippets.json"
+        self._changes_path = file_dir / "changes.jsonl"
+        self._index: SnippetIndex | None = None
+        self._index_stamp: tuple[int, int] | None = None
+        self._read_stamp: tuple[int, int] | None = None
 
         if not self._file_path.exists():
             self._file_path.write_text("{}")
 
+    def _file_stamp(self) -> tuple[int, int] | None:
+        """Return the modification time and size of the JSON file."""
+        try:
+            stat = self._file_path.stat()
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
     def _read(self) -> dict[str, Snippet]:
         """Read JSON file and return content as dictionary."""
+        # stamp before reading, so a write that lands mid-read triggers a rebuild
+        self._read_stamp = self._file_stamp()
         try:
             with open(self._file_path, "r") as f:
                 return json.load(f)
         except (json.JSONDecodeError, FileNotFoundError):
             return {}
 
+    @staticmethod
+    def _signature(snippet_dict: dict) -> str:
+        """Return the encoded MinHash signature of a snippet dictionary, computing
+        it for snippets written before signatures were stored.
+        """
+        return snippet_dict.get("minhash") or encode_signature(
+            minhash(unpack_text(snippet_dict["code"]))
+        )
+
+    @staticmethod
+    def _content_hash(snippet_dict: dict) -> str:
+        """Return the content hash of a snippet dictionary, computing it for
+        snippets written before content hashes were stored.
+        """
+        return snippet_dict.get("content_hash") or hash_content(
+            unpack_text(snippet_dict["code"]), snippet_dict["language"]
+        )
+
+    @classmethod
+    def _index_entry(
+        cls,
+        snippet_dict: dict,
+    ) -> tuple[int, LangEnum, list[str], bool, str, str, str]:
+        """Extract the ID, language, tag names, favorite flag, content hash,
+        signature and title to index from a snippet dictionary.
+        """
+        tag_names = [tag["name"] for tag in snippet_dict.get("tags", [])]
+        return (
+            snippet_dict["id"],
+            LangEnum(snippet_dict["language"]),
+            tag_names,
+            snippet_dict.get("favorite", False),
+            cls._content_hash(snippet_dict),
+            cls._signature(snippet_dict),
+            snippet_dict["title"],
+        )
+
+    def _get_index(self, data: dict) -> SnippetIndex:
+        """Return the index for `data`, the content returned by the last `_read`.
+        Rebuilds the index if the file changed since the index was last in sync.
+        """
+        if self._index is None or self._index_stamp != self._read_stamp:
+            self._index = SnippetIndex()
+            for snippet_dict in data.values():
+                self._index.add(*self._index_entry(snippet_dict))
+            self._index_stamp = self._read_stamp
+        return self._index
+
+    def _get_text_index(self, data: dict) -> BM25Index:
+        """Return the full-text index for `data`, building it on the first
+        ranked search after the index was last rebuilt.
+        """
+        index = self._get_index(data)
+        if index.text is None:
+            text = BM25Index()
+            for snippet_dict in data.values():
+                text.add(
+                    snippet_dict["id"],
+                    snippet_dict["title"],
+                    unpack_text(snippet_dict.get("description")),
+                    unpack_text(snippet_dict["code"]),
+                    [tag["name"] for tag in snippet_dict.get("tags", [])],
+                )
+            index.text = text
+        return index.text
+
     def _write(self, data: dict) -> None:
         """Write dictionary of snippets to JSON file."""
         with open(self._file_path, "w") as f:
             return json.dump(data, f, indent=4)
 
+    def _last_cursor(self) -> int:
+        """Return the cursor of the last change log entry.
+        Only the tail of the file is read.
+        """
+        try:
+            with open(self._changes_path, "rb") as f:
+                f.seek(0, 2)
+                f.seek(max(f.tell() - 4096, 0))
+                lines = f.read().splitlines()
+        except FileNotFoundError:
+            return 0
+        return json.loads(lines[-1])["cursor"] if lines else 0
+
+    def _log(self, snippet_id: int, operation: ChangeOperation) -> None:
+        change = SnippetChange(
+            cursor=self._last_cursor() + 1, snippet_id=snippet_id, operation=operation
+        )
+        with open(self._changes_path, "a") as f:
+            f.write(change.model_dump_json() + "\n")
+
     def _serialize(self, snippet: Snippet) -> dict:
-        """Serialize a Snippet object into a JSON-compatible dictionary."""
+        """Serialize a Snippet object into a JSON-compatible dictionary.
+        Large code and description bodies are compressed, see `get_compressor`.
+        """
         snippet_dict = snippet.model_dump(mode="json")
         snippet_dict["tags"] = [tag.model_dump(mode="json") for tag in snippet.tags]
+        compressor = get_compressor()
+        for field in self._COMPRESSED_FIELDS:
+            snippet_dict[field] = pack_text(compressor.compress(snippet_dict[field]))
         return snippet_dict
 
     def _deserialize(self, snippet_dict: dict) -> Snippet:
         """Deserialize a dictionary into a Snippet object."""
         tags_dict = snippet_dict.pop("tags", [])
+        for field in self._COMPRESSED_FIELDS:
+            snippet_dict[field] = unpack_text(snippet_dict.get(field))
         snippet = Snippet.model_validate(snippet_dict)
         snippet.tags = [Tag.model_validate(tag) for tag in tags_dict]
+        if "title_norm" not in snippet_dict:  # written before normalized fields
+            snippet.update_search_fields()
+        if "content_hash" not in snippet_dict:  # written before content hashes
+            snippet.update_content_hash()
         return snippet
 
     def _store_snippet(self, snippet: Snippet) -> None:
         """Helper method to store an update to a single Snippet."""
+        if not snippet.minhash:
+            snippet.update_minhash()
         data = self._read()
+        index = self._get_index(data)
         snippet_dict = self._serialize(snippet)
+        previous_dict = data.get(str(snippet.id))
         data[str(snippet.id)] = snippet_dict
         self._write(data)
 
-    def add(self, snippet: Snippet) -> None:
+        if previous_dict is not None:
+            index.remove(*self._index_entry(previous_dict))
+        index.add(*self._index_entry(snippet_dict))
+        index.add_text(
+            snippet.id,
+            snippet.title,
+            snippet.description,
+            snippet.code,
+            [tag.name for tag in snippet.tags],
+        )
+        self._index_stamp = self._file_stamp()
+        self._log(snippet.id, ChangeOperation.UPSERT)
+
+    def add(
+        self, snippet: Snippet, duplicates: DuplicatePolicy = DuplicatePolicy.ALLOW
+    ) -> None:
+        if self._apply_duplicate_policy(snippet, duplicates):
+            return
         data = self._read()
         existing_ids = [int(k) for k in data.keys()]
         if snippet.id is None:
             snippet.id = max(existing_ids, default=0) + 1
         self._store_snippet(snippet)
 
-    def list(self) -> Sequence[Snippet]:
+    def list(self, fields: Collection[str] | None = None) -> Sequence[Snippet]:
         data = self._read()
         return [self._deserialize(snippet_dict) for snippet_dict in data.values()]
 
@@ -391,28 +1651,113 @@ class JSONSnippetRepository(SnippetRepository):
         if snippet_dict is not None:
             return self._deserialize(snippet_dict)
 
+    def get_many(
+        self, snippet_ids: Sequence[int], fields: Collection[str] | None = None
+    ) -> Sequence[Snippet]:
+        data = self._read()
+        return [
+            self._deserialize(data[str(snippet_id)])
+            for snippet_id in dict.fromkeys(snippet_ids)
+            if str(snippet_id) in data
+        ]
+
     def delete(self, snippet_id: int) -> None:
         data = self._read()
         if str(snippet_id) in data:
-            del data[str(snippet_id)]
+            index = self._get_index(data)
+            snippet_dict = data.pop(str(snippet_id))
             self._write(data)
+            index.remove(*self._index_entry(snippet_dict))
+            self._index_stamp = self._file_stamp()
+            self._log(snippet_id, ChangeOperation.DELETE)
         else:
             raise SnippetNotFoundError
 
+    def find_duplicate(self, snippet: Snippet) -> Snippet | None:
+        data = self._read()
+        index = self._get_index(data)
+        duplicate_id = index.find_duplicate(snippet.content_hash, snippet.id)
+        if duplicate_id is not None:
+            return self._deserialize(data[str(duplicate_id)])
+
+    def duplicate_groups(self) -> Sequence[Sequence[int]]:
+        return self._get_index(self._read()).duplicate_groups()
+
+    def related(
+        self, snippet_id: int, limit: int = 10, threshold: float = 0.5
+    ) -> Sequence[tuple[Snippet, float]]:
+        data = self._read()
+        index = self._get_index(data)
+        snippet_dict = data.get(str(snippet_id))
+        if snippet_dict is None:
+            raise SnippetNotFoundError
+        signature = self._signature(snippet_dict)
+        candidates = {
+            candidate_id: self._signature(data[str(candidate_id)])
+            for candidate_id in index.similar.candidates(decode_signature(signature))
+            if candidate_id != snippet_id
+        }
+        ranked = self._rank_by_similarity(signature, candidates, threshold)
+        return [
+            (self._deserialize(data[str(candidate_id)]), score)
+            for candidate_id, score in ranked[:limit]
+        ]
+
+    def near_duplicates(
+        self, threshold: float = 0.8
+    ) -> Sequence[tuple[int, int, float]]:
+        data = self._read()
+        pairs = self._get_index(data).similar.candidate_pairs(
+            lambda snippet_id: self._content_hash(data[str(snippet_id)])
+        )
+        signatures = {
+            snippet_id: self._signature(data[str(snippet_id)])
+            for pair in pairs
+            for snippet_id in pair
+        }
+        return self._score_pairs(pairs, signatures, threshold)
+
     def search(
         self,
         term: str,
         tag_name: str | None = None,
         language: LangEnum | None = None,
         fuzzy: bool = False,
+        tags: str | None = None,
+        fields: Collection[str] | None = None,
+        mode: SearchMode | None = None,
+        limit: int | None = None,
+        within: Collection[int] | None = None,
     ) -> Sequence[Snippet]:
+        mode = self._search_mode(mode, fuzzy)
         data = self._read()
-        snippets = [self._deserialize(snippet_dict) for snippet_dict in data.values()]
+        tag_query = combine_tag_filters(tag_name, tags)
+        candidate_ids = self._get_index(data).candidates(tag_query, language, within)
+        if mode == SearchMode.RANKED:
+            within = None if candidate_ids is None else set(candidate_ids)
+            ranked = self._get_text_index(data).search(term, limit, within)
+            return [
+                self._deserialize(data[str(snippet_id)]) for snippet_id, _ in ranked
+            ]
 
-        if fuzzy:
-            return self._fuzzy_search(snippets, term, tag_name, language)
+        if candidate_ids is None:
+            snippet_dicts = list(data.values())
+        else:
+            snippet_dicts = [data[str(snippet_id)] for snippet_id in candidate_ids]
+        stored = [_StoredText.from_dict(snippet_dict) for snippet_dict in snippet_dicts]
+        if mode == SearchMode.REGEX:
+            regex_query = RegexQuery(term, self.REGEX_TIME_BUDGET)
+            candidates = (
+                self._deserialize(match.snippet_dict)
+                for match in stored
+                if regex_query.could_match(match)
+            )
+            return regex_query.search(candidates, limit)
+        elif mode == SearchMode.FUZZY:
+            matches = self._fuzzy_search(stored, term)
         else:
-            return self._simple_search(snippets, term, tag_name, language)
+            matches = self._simple_search(stored, term)
+        return [self._deserialize(match.snippet_dict) for match in matches[:limit]]
 
     def toggle_favorite(self, snippet_id: int) -> None:
         snippet = self.get(snippet_id)
@@ -427,3 +1772,292 @@ class JSONSnippetRepository(SnippetRepository):
             raise SnippetNotFoundError
         self._update_tags(snippet, tags, remove)
         self._store_snippet(snippet)
+
+    def autocomplete(
+        self, field: CompletionField, prefix: str, limit: int = 10
+    ) -> Sequence[tuple[str, int]]:
+        return self._get_index(self._read()).completions.complete(field, prefix, limit)
+
+    def suggest_tags(
+        self, tag_name: str, max_distance: int | None = None, limit: int = 5
+    ) -> Sequence[tuple[str, int]]:
+        completions = self._get_index(self._read()).completions
+        return completions.suggest_tags(tag_name, max_distance, limit)
+
+    def facets(self, term: str | None = None) -> SnippetFacets:
+        data = self._read()
+        index = self._get_index(data)
+        if not normalize_text(term):
+            return index.facets()
+        stored = [_StoredText.from_dict(snippet_dict) for snippet_dict in data.values()]
+        matches = self._simple_search(stored, term)
+        return index.facets({match.snippet_dict["id"] for match in matches})
+
+    def changes(self, since: int = 0, limit: int = 100) -> Sequence[SnippetChange]:
+        changes = []
+        try:
+            with open(self._changes_path, "r") as f:
+                for line in f:
+                    change = json.loads(line)
+                    if change["cursor"] > since:
+                        changes.append(SnippetChange.model_validate(change))
+                        if len(changes) == limit:
+                            break
+        except FileNotFoundError:
+            pass
+        return changes
+
+
+class ConsistencyMode(StrEnum):
+    """How `TieredSnippetRepository` notices writes made by other processes.
+
+    EXCLUSIVE: this process is the only writer, so the tier is never checked.
+    STRICT: every read checks the database version first.
+    BOUNDED: the version is checked at most once per `max_staleness` seconds.
+    """
+
+    EXCLUSIVE = "exclusive"
+    STRICT = "strict"
+    BOUNDED = "bounded"
+
+
+class TieredSnippetRepository(SnippetRepository):
+    """Database repository with an in-memory hot tier.
+    Reads and searches are served by an `InMemorySnippetRepository` loaded from
+    the database. Writes go to the database first and are applied to the tier
+    only once committed, so a failed write leaves both unchanged.
+
+    The tier is loaded on first use, or up front with `warm_up`, using one query
+    for all snippets and one for their tags. Afterwards it follows the database
+    change log: changes since the tier's cursor, its own and other processes',
+    are applied as deltas. The `consistency` mode decides how often the log is
+    checked for changes made by other processes; see `ConsistencyMode`.
+
+    With a `snapshot_path`, the tier is loaded from a snapshot of an earlier
+    run when there is one for the same database, and only the changes logged
+    since it was taken are read. `save_snapshot` writes one; loading from the
+    database writes one too.
+    """
+
+    CATCH_UP_BATCH_SIZE = 500
+
+    def __init__(
+        self,
+        db: DBSnippetRepository,
+        consistency: ConsistencyMode = ConsistencyMode.BOUNDED,
+        max_staleness: float = 1.0,
+        snapshot_path: str | Path | None = None,
+    ) -> None:
+        self._db = db
+        self._consistency = ConsistencyMode(consistency)
+        self._max_staleness = max_staleness
+        self._snapshot_path = snapshot_path
+        self._tier: InMemorySnippetRepository | None = None
+        self._cursor = 0
+        self._checked_at = 0.0
+        # API requests run in a thread pool and share one tier
+        self._lock = threading.RLock()
+
+    def warm_up(self) -> None:
+        """Load every snippet into the tier, from the snapshot if there is a
+        usable one, or else from the database.
+        """
+        with self._lock:
+            if self._snapshot_path is not None and self._load_snapshot():
+                return
+            # read the cursor first, so writes landing during the load are
+            # applied again by the next catch-up instead of being missed
+            cursor = self._db.latest_cursor()
+            # the database keeps the change log; the tier would only grow one
+            tier = InMemorySnippetRepository(log_changes=False)
+            for snippet in self._db.list():
+                tier.add(snippet)
+            self._tier = tier
+            self._cursor = cursor
+            self._checked_at = time.monotonic()
+            if self._snapshot_path is not None:
+                self.save_snapshot()
+
+    def _load_snapshot(self) -> bool:
+        """Load the tier from the snapshot and catch it up with the change log.
+        Returns False if there is no snapshot of this database to load, or the
+        snapshot was taken from another database at the same URL.
+        """
+        try:
+            tier, cursor = InMemorySnippetRepository.load_snapshot(
+                self._snapshot_path, self._db.url, self._db.identity()
+            )
+        except InvalidSnapshotError:
+            return False
+        if cursor > self._db.latest_cursor():
+            return False  # taken from a database since replaced
+        self._tier, self._cursor = tier, cursor
+        self._catch_up()
+        self._checked_at = time.monotonic()
+        return True
+
+    @property
+    def snapshot_path(self) -> str | Path | None:
+        return self._snapshot_path
+
+    def save_snapshot(self) -> None:
+        """Write the tier, as of its change log cursor, to the snapshot file."""
+        if self._snapshot_path is None:
+            raise ValueError("No snapshot path set")
+        with self._lock:
+            tier = self._current_tier()
+            tier.save_snapshot(
+                self._snapshot_path, self._db.url, self._cursor, self._db.identity()
+            )
+
+    def _catch_up(self) -> None:
+        """Apply change log entries after the tier's cursor to the tier."""
+        while True:
+            changes = self._db.changes(self._cursor, self.CATCH_UP_BATCH_SIZE)
+            if not changes:
+                return
+            changed_ids = {change.snippet_id for change in changes}
+            snippets = self._db.get_many(list(changed_ids))
+            for snippet in snippets:
+                self._tier.add(snippet)  # replaces the stored snippet with this ID
+            for snippet_id in changed_ids - {snippet.id for snippet in snippets}:
+                if self._tier.get(snippet_id) is not None:
+                    self._tier.delete(snippet_id)
+            self._cursor = changes[-1].cursor
+
+    def _check_for_changes(self) -> None:
+        if self._consistency == ConsistencyMode.EXCLUSIVE:
+            return
+        now = time.monotonic()
+        if (
+            self._consistency == ConsistencyMode.BOUNDED
+            and now - self._checked_at < self._max_staleness
+        ):
+            return
+        self._checked_at = now
+        if self._db.latest_cursor() != self._cursor:
+            self._catch_up()
+
+    def _current_tier(self) -> InMemorySnippetRepository:
+        if self._tier is None:
+            self.warm_up()
+        else:
+            self._check_for_changes()
+        return self._tier
+
+    @contextmanager
+    def _write_through(self) -> Iterator[None]:
+        """Wrap a database write, then catch the tier up with the change log.
+        If the write raises, the tier is left as it was. Catching up applies the
+        write along with anything other processes wrote before it.
+
+        The write itself runs without the lock, so reads aren't held up by it
+        and concurrent writes can share a commit through a `WriteCoalescer`.
+        """
+        with self._lock:
+            self._current_tier()
+        yield
+        with self._lock:
+            self._catch_up()
+
+    def add(
+        self, snippet: Snippet, duplicates: DuplicatePolicy = DuplicatePolicy.ALLOW
+    ) -> None:
+        with self._write_through():
+            self._db.add(snippet, duplicates)
+
+    def list(self, fields: Collection[str] | None = None) -> Sequence[Snippet]:
+        with self._lock:
+            return self._current_tier().list(fields=fields)
+
+    def get(self, snippet_id: int) -> Snippet | None:
+        with self._lock:
+            return self._current_tier().get(snippet_id)
+
+    def get_many(
+        self, snippet_ids: Sequence[int], fields: Collection[str] | None = None
+    ) -> Sequence[Snippet]:
+        with self._lock:
+            return self._current_tier().get_many(snippet_ids, fields=fields)
+
+    def delete(self, snippet_id: int) -> None:
+        with self._write_through():
+            self._db.delete(snippet_id)
+
+    def find_duplicate(self, snippet: Snippet) -> Snippet | None:
+        with self._lock:
+            return self._current_tier().find_duplicate(snippet)
+
+    def duplicate_groups(self) -> Sequence[Sequence[int]]:
+        with self._lock:
+            return self._current_tier().duplicate_groups()
+
+    def related(
+        self, snippet_id: int, limit: int = 10, threshold: float = 0.5
+    ) -> Sequence[tuple[Snippet, float]]:
+        with self._lock:
+            return self._current_tier().related(snippet_id, limit, threshold)
+
+    def near_duplicates(
+        self, threshold: float = 0.8
+    ) -> Sequence[tuple[int, int, float]]:
+        with self._lock:
+            return self._current_tier().near_duplicates(threshold)
+
+    def search(
+        self,
+        term: str,
+        tag_name: str | None = None,
+        language: LangEnum | None = None,
+        fuzzy: bool = False,
+        tags: str | None = None,
+        fields: Collection[str] | None = None,
+        mode: SearchMode | None = None,
+        limit: int | None = None,
+        within: Collection[int] | None = None,
+    ) -> Sequence[Snippet]:
+        with self._lock:
+            return self._current_tier().search(
+                term,
+                tag_name=tag_name,
+                language=language,
+                fuzzy=fuzzy,
+                tags=tags,
+                fields=fields,
+                mode=mode,
+                limit=limit,
+                within=within,
+            )
+
+    def toggle_favorite(self, snippet_id: int) -> None:
+        with self._write_through():
+            self._db.toggle_favorite(snippet_id)
+
+    def tag(self, snippet_id: int, /, *tags: Tag, remove: bool = False) -> None:
+        with self._write_through():
+            self._db.tag(snippet_id, *tags, remove=remove)
+
+    def changes(self, since: int = 0, limit: int = 100) -> Sequence[SnippetChange]:
+        return self._db.changes(since, limit)
+
+    def batches(
+        self, batch_size: int = 1000, fields: Collection[str] | None = None
+    ) -> Iterator[Sequence[Snippet]]:
+        # exports read the database a batch at a time instead of locking the tier
+        return self._db.batches(batch_size, fields)
+
+    def autocomplete(
+        self, field: CompletionField, prefix: str, limit: int = 10
+    ) -> Sequence[tuple[str, int]]:
+        with self._lock:
+            return self._current_tier().autocomplete(field, prefix, limit)
+
+    def suggest_tags(
+        self, tag_name: str, max_distance: int | None = None, limit: int = 5
+    ) -> Sequence[tuple[str, int]]:
+        with self._lock:
+            return self._current_tier().suggest_tags(tag_name, max_distance, limit)
+
+    def facets(self, term: str | None = None) -> SnippetFacets:
+        with self._lock:
+            return self._current_tier().facets(term)
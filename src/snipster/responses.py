@@ -0,0 +1,116 @@
+from operator import attrgetter
+from typing import Any, Callable, Sequence
+
+import orjson
+from pydantic import BaseModel
+from starlette.responses import Response
+
+from .exceptions import InvalidFieldsError
+from .models import Snippet, SnippetRead, SnippetSummary
+
+SNIPPET_FIELDS = tuple(SnippetRead.model_fields)
+SUMMARY_FIELDS = tuple(SnippetSummary.model_fields)
+
+
+def _tag_dicts(snippet: Snippet) -> list[dict[str, Any]]:
+    return [{"name": tag.name, "id": tag.id} for tag in snippet.tags]
+
+
+_FIELD_GETTERS: dict[str, Callable[[Snippet], Any]] = {
+    field: _tag_dicts if field == "tags" else attrgetter(field)
+    for field in SNIPPET_FIELDS
+}
+
+
+def parse_fields(text: str | None) -> tuple[str, ...] | None:
+    """Parse a comma-separated `fields` parameter, such as `title,tags`.
+    `summary` stands for the fields of `SnippetSummary`. The ID is always
+    included, and fields come back in `SnippetRead` order.
+
+    Args:
+        text (str | None): requested fields
+
+    Returns:
+        tuple[str, ...] | None: field names, or None when all fields are wanted
+
+    Raises:
+        InvalidFieldsError: if a field name is unknown
+    """
+    if text is None or not text.strip():
+        return None
+    requested = {"id"}
+    for name in text.split(","):
+        name = name.strip()
+        if name == "summary":
+            requested.update(SUMMARY_FIELDS)
+        elif name in _FIELD_GETTERS:
+            requested.add(name)
+        elif name:
+            raise InvalidFieldsError(
+                f"Unknown field '{name}', expected one of: "
+                + ", ".join(("summary", *SNIPPET_FIELDS))
+            )
+    return tuple(field for field in SNIPPET_FIELDS if field in requested)
+
+
+def snippet_to_dict(
+    snippet: Snippet, fields: Sequence[str] | None = None
+) -> dict[str, Any]:
+    """Convert a snippet row into the JSON shape of `SnippetRead`.
+    Reads attributes straight off the row instead of validating a `SnippetRead`,
+    since rows loaded from a repository are already valid. With `fields`, only
+    those attributes are read, so columns left unloaded are never touched.
+    """
+    if fields is not None:
+        return {field: _FIELD_GETTERS[field](snippet) for field in fields}
+    return {
+        "title": snippet.title,
+        "code": snippet.code,
+        "description": snippet.description,
+        "language": snippet.language,
+        "favorite": snippet.favorite,
+        "id": snippet.id,
+        "created_at": snippet.created_at,
+        "updated_at": snippet.updated_at,
+        "duplicate_of": snippet.duplicate_of,
+        "tags": _tag_dicts(snippet),
+    }
+
+
+def dumps(content: Any, fields: Sequence[str] | None = None) -> bytes:
+    """Serialize content to JSON bytes with orjson.
+    Snippets are encoded by `snippet_to_dict`, limited to `fields` if given.
+    UTC datetimes end in `Z`, matching Pydantic's JSON output.
+    """
+
+    def encode_default(value: Any) -> Any:
+        """Convert objects orjson can't serialize natively."""
+        if isinstance(value, Snippet):
+            return snippet_to_dict(value, fields)
+        if isinstance(value, BaseModel):
+            return value.model_dump(mode="json")
+        raise TypeError(
+            f"Object of type {type(value).__name__} is not JSON serializable"
+        )
+
+    return orjson.dumps(content, default=encode_default, option=orjson.OPT_UTC_Z)
+
+
+class SnippetJSONResponse(Response):
+    """JSON response rendered with orjson.
+    Endpoints returning snippets pass the rows in directly, which skips the
+    `response_model` validation and `jsonable_encoder` passes FastAPI would run.
+    `fields` limits which snippet attributes are included.
+    """
+
+    media_type = "application/json"
+
+    def __init__(
+        self, content: Any, fields: Sequence[str] | None = None, **kwargs
+    ) -> None:
+        # set before the base class renders the content
+        self.fields = fields
+        super().__init__(content, **kwargs)
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content, self.fields)
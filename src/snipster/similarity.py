@@ -0,0 +1,202 @@
+"""MinHash signatures and locality-sensitive hashing for near-duplicate snippets.
+
+A signature summarizes the set of token shingles in a snippet's code, so that
+the share of equal values in two signatures estimates the Jaccard similarity
+of their shingle sets. Signatures use one-permutation hashing: each shingle is
+hashed once and lands in one of `NUM_HASHES` bins, which keeps the cost linear
+in the length of the code. Empty bins borrow from the next filled bin.
+
+For lookups, a signature is cut into `BANDS` bands of `ROWS` values and each
+band is hashed to a bucket. Snippets sharing a bucket are candidates, which
+finds most pairs above about 0.5 similarity without comparing every pair.
+Exact copies would still pair up with each other in every bucket, so they are
+collapsed into one snippet first, and buckets shared by more than
+`MAX_BUCKET_SIZE` snippets, such as those of trivial code, are skipped, which
+keeps pairing about linear in the number of snippets.
+"""
+
+import base64
+import hashlib
+import re
+from array import array
+from typing import Callable, Iterable
+
+NUM_HASHES = 64
+BANDS = 16
+ROWS = NUM_HASHES // BANDS
+SHINGLE_SIZE = 3
+MAX_BUCKET_SIZE = 64
+
+_TOKEN = re.compile(r"\w+|[^\w\s]")
+_EMPTY = 0xFFFFFFFF
+_ROTATION = 0x9E3779B1
+
+
+def _hash64(data: bytes) -> int:
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), "little")
+
+
+def shingles(code: str | None) -> set[int]:
+    """Hash each run of `SHINGLE_SIZE` consecutive tokens in the code.
+    Tokens are words and single punctuation characters, case-folded, so
+    whitespace and letter case don't matter.
+    """
+    tokens = _TOKEN.findall((code or "").casefold())
+    if not tokens:
+        return set()
+    count = max(len(tokens) - SHINGLE_SIZE + 1, 1)
+    return {
+        _hash64(" ".join(tokens[i : i + SHINGLE_SIZE]).encode()) for i in range(count)
+    }
+
+
+def minhash(code: str | None) -> array:
+    """Compute the MinHash signature of the code, as `NUM_HASHES` 32-bit values.
+
+    Args:
+        code (str | None): code to sign
+
+    Returns:
+        array: signature, an array of unsigned ints
+    """
+    bins = [_EMPTY] * NUM_HASHES
+    for shingle in shingles(code):
+        slot, value = shingle % NUM_HASHES, shingle >> 32
+        if value < bins[slot]:
+            bins[slot] = value
+
+    signature = array("I", bins)
+    if all(value == _EMPTY for value in bins):
+        return signature
+    for slot, value in enumerate(bins):
+        if value != _EMPTY:
+            continue
+        # rotate in the next filled bin, offset by distance so that two
+        # borrowed bins only match when both signatures borrowed alike
+        distance = 1
+        while bins[(slot + distance) % NUM_HASHES] == _EMPTY:
+            distance += 1
+        borrowed = bins[(slot + distance) % NUM_HASHES]
+        signature[slot] = (borrowed + distance * _ROTATION) & 0xFFFFFFFF
+    return signature
+
+
+def encode_signature(signature: array) -> str:
+    """Encode a signature as text, for storage."""
+    return base64.b64encode(signature.tobytes()).decode("ascii")
+
+
+def decode_signature(text: str) -> array:
+    """Decode a signature stored with `encode_signature`."""
+    signature = array("I")
+    signature.frombytes(base64.b64decode(text))
+    return signature
+
+
+def similarity(a: array, b: array) -> float:
+    """Estimate the Jaccard similarity of two snippets from their signatures."""
+    return sum(x == y for x, y in zip(a, b)) / NUM_HASHES
+
+
+def band_buckets(signature: array) -> list[int]:
+    """Hash each band of a signature to a bucket.
+    The band number is part of the hash, so buckets of different bands never
+    collide. Buckets are signed 64-bit integers, to fit a database column.
+    """
+    raw = signature.tobytes()
+    width = ROWS * signature.itemsize
+    buckets = []
+    for band in range(BANDS):
+        data = band.to_bytes(1, "little") + raw[band * width : (band + 1) * width]
+        buckets.append(_hash64(data) - (1 << 63))
+    return buckets
+
+
+class LSHIndex:
+    """Maps LSH buckets to the IDs of the snippets whose signatures fall in them.
+    Most buckets hold a single snippet, so a lone ID is stored as a bare int
+    and only shared buckets get a list, which saves memory on large stores.
+    """
+
+    def __init__(self) -> None:
+        self._buckets: dict[int, int | list[int]] = {}
+
+    def add(self, snippet_id: int, signature: array) -> None:
+        """Index a snippet. A snippet that is already indexed must be removed first."""
+        for bucket in band_buckets(signature):
+            ids = self._buckets.get(bucket)
+            if ids is None:
+                self._buckets[bucket] = snippet_id
+            elif isinstance(ids, int):
+                self._buckets[bucket] = [ids, snippet_id]
+            else:
+                ids.append(snippet_id)
+
+    def remove(self, snippet_id: int, signature: array) -> None:
+        """Remove a snippet using the signature it was indexed with."""
+        for bucket in band_buckets(signature):
+            ids = self._buckets.get(bucket)
+            if ids == snippet_id:
+                del self._buckets[bucket]
+            elif isinstance(ids, list) and snippet_id in ids:
+                ids.remove(snippet_id)
+                if len(ids) == 1:
+                    self._buckets[bucket] = ids[0]
+
+    def candidates(self, signature: array) -> set[int]:
+        """Return the IDs sharing at least one bucket with the signature."""
+        ids = set()
+        for bucket in band_buckets(signature):
+            bucket_ids = self._buckets.get(bucket, ())
+            if isinstance(bucket_ids, int):
+                ids.add(bucket_ids)
+            else:
+                ids.update(bucket_ids)
+        return ids
+
+    def candidate_pairs(
+        self, content_hash_of: Callable[[int], str]
+    ) -> set[tuple[int, int]]:
+        """Return the pairs of IDs sharing a bucket, smaller ID first, as
+        `candidate_pairs` does.
+        """
+        return candidate_pairs(
+            (ids for ids in self._buckets.values() if isinstance(ids, list)),
+            content_hash_of,
+        )
+
+
+def candidate_pairs(
+    groups: Iterable[Iterable[int]], content_hash_of: Callable[[int], str]
+) -> set[tuple[int, int]]:
+    """Pair up the IDs within each group of snippets sharing a bucket.
+
+    Snippets with the same content hash stand in for each other, so only the
+    smallest of their IDs is paired; `duplicate_groups` lists the copies.
+    Groups of more than `MAX_BUCKET_SIZE` distinct snippets are skipped.
+
+    Args:
+        groups (Iterable[Iterable[int]]): IDs of the snippets in each bucket
+        content_hash_of (Callable[[int], str]): returns a snippet's content hash
+
+    Returns:
+        set[tuple[int, int]]: candidate pairs, smaller ID first
+    """
+    groups = [list(group) for group in groups]
+    first_ids: dict[str, int] = {}
+    for group in groups:
+        for snippet_id in group:
+            content_hash = content_hash_of(snippet_id)
+            first_id = first_ids.get(content_hash)
+            if first_id is None or snippet_id < first_id:
+                first_ids[content_hash] = snippet_id
+
+    pairs = set()
+    for group in groups:
+        ids = sorted({first_ids[content_hash_of(snippet_id)] for snippet_id in group})
+        if len(ids) > MAX_BUCKET_SIZE:
+            continue
+        for i, first in enumerate(ids):
+            for second in ids[i + 1 :]:
+                pairs.add((first, second))
+    return pairs
@@ -0,0 +1,163 @@
+"""Binary snapshots of in-memory state for fast cold starts.
+
+Loading an in-memory repository from the database builds every record and
+index entry one snippet at a time. A snapshot stores the finished objects
+instead, so loading one is a single unpickling pass over a memory-mapped file.
+
+A snapshot file starts with a fixed header:
+
+- 8 bytes: `MAGIC`
+- u16: `FORMAT_VERSION`, bumped whenever the stored classes change shape
+- u64: version of the source store the state was taken at, such as the
+  change log cursor of the database
+- u32: CRC-32 of the payload
+- u16: length of the source store's name
+- u16: length of the source store's identity
+- bytes: the name, then the identity, in UTF-8
+
+The name, such as a database URL, says where the state was loaded from. The
+identity tells apart stores that were recreated under the same name, whose
+versions start over and could otherwise pass for later ones of the old store.
+
+The payload that follows is a pickle. Unpickling only resolves the classes in
+`_ALLOWED_GLOBALS`, the repository, record and index classes an in-memory
+repository is made of and a few standard types, so a snapshot can't call
+anything else. Snapshots should still be stored where only the application
+writes. A class added to the in-memory state must be added to the allowlist,
+and `FORMAT_VERSION` bumped.
+"""
+
+import mmap
+import os
+import pickle
+import struct
+import zlib
+from pathlib import Path
+from typing import Any
+
+from .exceptions import InvalidSnapshotError
+
+MAGIC = b"SNIPSNAP"
+FORMAT_VERSION = 3
+_HEADER = struct.Struct("<8sHQIHH")
+
+_PACKAGE = __name__.rpartition(".")[0]
+_PACKAGE_CLASSES = {
+    "autocomplete": ["CompletionIndex", "PrefixIndex"],
+    "fulltext": ["BM25Index"],
+    "index": ["PostingsIndex", "SnippetIndex"],
+    "models": ["ChangeOperation", "LangEnum"],
+    "repo": ["InMemorySnippetRepository", "_SnippetRecord"],
+    "similarity": ["LSHIndex"],
+    "spelling": ["BKTree"],
+}
+_ALLOWED_GLOBALS = {
+    ("builtins", "set"),
+    ("builtins", "frozenset"),
+    ("datetime", "datetime"),
+    ("datetime", "timedelta"),
+    ("datetime", "timezone"),
+} | {
+    (f"{_PACKAGE}.{module}", name)
+    for module, names in _PACKAGE_CLASSES.items()
+    for name in names
+}
+
+
+class _SnapshotUnpickler(pickle.Unpickler):
+    def find_class(self, module: str, name: str) -> Any:
+        # a dotted name would resolve attributes of the class, or of the module
+        if "." not in name and (module, name) in _ALLOWED_GLOBALS:
+            return super().find_class(module, name)
+        raise pickle.UnpicklingError(f"{module}.{name} is not allowed in snapshots")
+
+
+def write_snapshot(
+    path: str | Path, state: Any, source: str, version: int, identity: str = ""
+) -> None:
+    """Write a snapshot, replacing any previous one at `path` atomically.
+
+    Args:
+        path (str | Path): snapshot file
+        state (Any): objects to store
+        source (str): name of the store the state was loaded from
+        version (int): version of that store the state reflects
+        identity (str): identity of that store, if it has one
+    """
+    path = Path(path)
+    payload = pickle.dumps(state, protocol=pickle.HIGHEST_PROTOCOL)
+    source_bytes = source.encode()
+    identity_bytes = identity.encode()
+    header = _HEADER.pack(
+        MAGIC,
+        FORMAT_VERSION,
+        version,
+        zlib.crc32(payload),
+        len(source_bytes),
+        len(identity_bytes),
+    )
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(header + source_bytes + identity_bytes)
+        f.write(payload)
+    os.replace(tmp_path, path)
+
+
+def read_snapshot(path: str | Path, source: str, identity: str = "") -> tuple[Any, int]:
+    """Read a snapshot taken from `source`.
+
+    Args:
+        path (str | Path): snapshot file
+        source (str): name of the store the snapshot must come from
+        identity (str): identity that store must have had
+
+    Returns:
+        tuple[Any, int]: the stored objects, and the source version they reflect
+
+    Raises:
+        InvalidSnapshotError: if the file is missing, damaged, of another format
+            version or taken from another source
+    """
+    try:
+        with open(path, "rb") as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                return _parse(data, source, identity)
+    except (OSError, ValueError) as e:  # missing, unreadable or empty files
+        raise InvalidSnapshotError(f"Can't read snapshot {path}: {e}")
+
+
+def _parse(data: mmap.mmap, source: str, identity: str) -> tuple[Any, int]:
+    if len(data) < _HEADER.size:
+        raise InvalidSnapshotError("Snapshot is truncated")
+    magic, format_version, version, checksum, source_size, identity_size = (
+        _HEADER.unpack_from(data)
+    )
+    if magic != MAGIC:
+        raise InvalidSnapshotError("Not a snapshot file")
+    if format_version != FORMAT_VERSION:
+        raise InvalidSnapshotError(
+            f"Snapshot format {format_version} is not the current {FORMAT_VERSION}"
+        )
+    identity_start = _HEADER.size + source_size
+    start = identity_start + identity_size
+    snapshot_source = bytes(data[_HEADER.size : identity_start]).decode(
+        errors="replace"
+    )
+    if snapshot_source != source:
+        raise InvalidSnapshotError(
+            f"Snapshot was taken from '{snapshot_source}', not '{source}'"
+        )
+    if bytes(data[identity_start:start]).decode(errors="replace") != identity:
+        raise InvalidSnapshotError(
+            f"Snapshot was taken from another store at '{source}'"
+        )
+    with memoryview(data) as view:
+        damaged = zlib.crc32(view[start:]) != checksum
+    if damaged:
+        raise InvalidSnapshotError("Snapshot is damaged")
+    data.seek(start)
+    try:
+        state = _SnapshotUnpickler(data).load()
+    except Exception as e:
+        raise InvalidSnapshotError(f"Can't load snapshot: {e}")
+    return state, version
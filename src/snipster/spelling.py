@@ -0,0 +1,105 @@
+"""Edit-distance lookups for "did you mean" suggestions on tag names.
+
+A BK-tree arranges words so that every child of a node sits at a known
+Levenshtein distance from it. By the triangle inequality, a search for words
+within distance `k` of a query only needs to follow the children whose
+distance to their parent is within `k` of the query's distance to the parent,
+so a lookup compares the query with a small part of the words. Distances
+are only computed as far as pruning needs them, which ends most comparisons
+after a few rows.
+"""
+
+
+def edit_distance(a: str, b: str, limit: int | None = None) -> int:
+    """Return the Levenshtein distance between two strings.
+    With a `limit`, stops as soon as the distance is known to exceed it and
+    returns `limit + 1`.
+    """
+    if len(a) < len(b):
+        a, b = b, a
+    if limit is not None and len(a) - len(b) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(
+                min(
+                    previous[j] + 1,
+                    current[j - 1] + 1,
+                    previous[j - 1] + (char_a != char_b),
+                )
+            )
+        if limit is not None and min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+
+class BKTree:
+    """A BK-tree of words under Levenshtein distance.
+    A node is a list of its word and a dictionary of children by distance.
+    Removed words stay in the tree as waypoints and are skipped by searches;
+    the tree is rebuilt once they make up half of it.
+    """
+
+    def __init__(self) -> None:
+        self._root: list | None = None
+        self._words: set[str] = set()
+        self._removed: set[str] = set()
+
+    def __len__(self) -> int:
+        return len(self._words)
+
+    def __contains__(self, word: str) -> bool:
+        return word in self._words
+
+    def add(self, word: str) -> None:
+        if word in self._words:
+            return
+        self._words.add(word)
+        if word in self._removed:
+            self._removed.discard(word)  # still a node of the tree
+            return
+        if self._root is None:
+            self._root = [word, {}]
+            return
+        node = self._root
+        while True:
+            distance = edit_distance(word, node[0])
+            child = node[1].get(distance)
+            if child is None:
+                node[1][distance] = [word, {}]
+                return
+            node = child
+
+    def remove(self, word: str) -> None:
+        if word not in self._words:
+            return
+        self._words.discard(word)
+        self._removed.add(word)
+        if len(self._removed) > len(self._words):
+            words = self._words
+            self._root, self._words, self._removed = None, set(), set()
+            for kept in sorted(words):
+                self.add(kept)
+
+    def search(self, word: str, max_distance: int) -> list[tuple[int, str]]:
+        """Return the words within `max_distance` of `word`, as pairs of
+        distance and word, closest first and alphabetical among equals.
+        """
+        if self._root is None:
+            return []
+        matches = []
+        nodes = [self._root]
+        while nodes:
+            node_word, children = nodes.pop()
+            # past this limit no child is close enough to be worth visiting
+            limit = max(children, default=0) + max_distance
+            distance = edit_distance(word, node_word, limit)
+            if distance <= max_distance and node_word not in self._removed:
+                matches.append((distance, node_word))
+            for child_distance, child in children.items():
+                if abs(child_distance - distance) <= max_distance:
+                    nodes.append(child)
+        return sorted(matches)
@@ -0,0 +1,85 @@
+import asyncio
+from typing import Any, AsyncIterator, Awaitable, Callable
+
+from starlette.concurrency import run_in_threadpool
+
+from .models import ChangeOperation
+from .repo import SnippetRepository
+from .responses import dumps
+
+
+def change_page(repo: SnippetRepository, since: int, limit: int) -> dict[str, Any]:
+    """Build a page of changes after `since`, in the shape of `ChangePage`.
+    Only the latest change per snippet is kept, and upserts carry the current
+    snippet, so a client can apply the page without fetching anything else.
+    An upsert for a snippet deleted since is dropped; its tombstone follows.
+
+    Args:
+        repo (SnippetRepository): repository to read the change log from
+        since (int): cursor of the last change the client has applied
+        limit (int): maximum number of change log entries to read
+
+    Returns:
+        dict[str, Any]: changes, the cursor to resume from, and whether more
+            changes are waiting
+    """
+    changes = repo.changes(since, limit)
+    latest = {change.snippet_id: change for change in changes}
+    upserted_ids = [
+        snippet_id
+        for snippet_id, change in latest.items()
+        if change.operation == ChangeOperation.UPSERT
+    ]
+    snippets = {snippet.id: snippet for snippet in repo.get_many(upserted_ids)}
+
+    entries = []
+    for change in sorted(latest.values(), key=lambda change: change.cursor):
+        snippet = snippets.get(change.snippet_id)
+        if change.operation == ChangeOperation.UPSERT and snippet is None:
+            continue
+        entries.append(
+            {
+                "cursor": change.cursor,
+                "snippet_id": change.snippet_id,
+                "operation": change.operation,
+                "snippet": snippet,  # only fetched for upserts
+            }
+        )
+    return {
+        "changes": entries,
+        "cursor": changes[-1].cursor if changes else since,
+        "has_more": len(changes) == limit,
+    }
+
+
+async def change_events(
+    repo: SnippetRepository,
+    since: int,
+    is_disconnected: Callable[[], Awaitable[bool]],
+    poll_interval: float = 1.0,
+    heartbeat_interval: float = 15.0,
+    limit: int = 100,
+) -> AsyncIterator[str]:
+    """Stream changes after `since` as server-sent events.
+    Each event's `id` is its cursor, so a reconnecting client resumes through
+    the `Last-Event-ID` header. The change log is polled while the client is
+    connected, and a comment is sent when idle to keep proxies from closing
+    the connection.
+    """
+    cursor = since
+    idle = 0.0
+    while not await is_disconnected():
+        page = await run_in_threadpool(change_page, repo, cursor, limit)
+        for entry in page["changes"]:
+            data = dumps(entry).decode()
+            yield f"id: {entry['cursor']}\nevent: change\ndata: {data}\n\n"
+        cursor = page["cursor"]
+        if page["has_more"]:
+            continue
+        if page["changes"]:
+            idle = 0.0
+        await asyncio.sleep(poll_interval)
+        idle += poll_interval
+        if idle >= heartbeat_interval:
+            yield ": keep-alive\n\n"
+            idle = 0.0
@@ -1,7 +1,10 @@
 import pytest
 from fastapi.testclient import TestClient
 
-from src.snipster.api import app, create_engine, get_repo
+from src.snipster import export
+from src.snipster.api import app, get_repo, get_search_sessions
+from src.snipster.db import create_db_engine
+from src.snipster.incremental import SearchSessions
 from src.snipster.models import SQLModel
 from src.snipster.repo import DBSnippetRepository
 
@@ -9,7 +12,7 @@ from src.snipster.repo import DBSnippetRepository
 @pytest.fixture()
 def test_repo(tmp_path):
     db_path = tmp_path / "test.db"
-    engine = create_engine(f"sqlite:///{db_path}", echo=True)
+    engine = create_db_engine(f"sqlite:///{db_path}", echo=True)
 
     SQLModel.metadata.create_all(engine)
     repo = DBSnippetRepository(engine)
@@ -209,4 +212,304 @@ def test_tag_snippet_422(client: TestClient):
     assert response.status_code == 422
 
 
-# TODO: add tests for search endpoint
+def test_search_snippets(client: TestClient, add_snippet, add_another_snippet):
+    response = client.get("/snippets/search/", params={"term": "select"})
+    data = response.json()
+
+    assert response.status_code == 200
+    assert [snippet["id"] for snippet in data] == [2]
+
+
+def test_search_snippets_ranked(client: TestClient, add_snippet, add_another_snippet):
+    response = client.get(
+        "/snippets/search/",
+        params={"term": "my_table records hello", "mode": "ranked", "limit": 1},
+    )
+    data = response.json()
+
+    assert response.status_code == 200
+    assert [snippet["id"] for snippet in data] == [2]
+
+
+def test_search_snippets_regex(client: TestClient, add_snippet, add_another_snippet):
+    response = client.get(
+        "/snippets/search/", params={"term": r"print\('\w+", "mode": "regex"}
+    )
+
+    assert response.status_code == 200
+    assert [snippet["id"] for snippet in response.json()] == [1]
+
+    response = client.get(
+        "/snippets/search/", params={"term": r"(a+)+", "mode": "regex"}
+    )
+    assert response.status_code == 422
+
+
+def test_autocomplete(client: TestClient, add_snippet, add_another_snippet):
+    client.post("snippets/1/tags", json=["training", "legacy"])
+    client.post("snippets/2/tags", json=["training"])
+
+    response = client.get("/autocomplete", params={"field": "tag", "prefix": "T"})
+
+    assert response.status_code == 200
+    assert response.json() == [{"value": "training", "count": 2}]
+
+    response = client.get(
+        "/autocomplete", params={"field": "title", "prefix": "", "limit": 1}
+    )
+    assert response.json() == [{"value": "all", "count": 1}]
+
+    response = client.get("/autocomplete", params={"field": "code", "prefix": "x"})
+    assert response.status_code == 422
+
+
+def test_suggest_tags(client: TestClient, add_snippet, add_another_snippet):
+    client.post("snippets/1/tags", json=["training", "legacy"])
+    client.post("snippets/2/tags", json=["training"])
+
+    response = client.get("/tags/suggestions", params={"name": "Trainign"})
+
+    assert response.status_code == 200
+    assert response.json() == [{"value": "training", "count": 2}]
+
+    response = client.get("/tags/suggestions", params={"name": "legacy"})
+    assert response.json() == []
+
+    response = client.get(
+        "/tags/suggestions", params={"name": "legacy", "max_distance": 9}
+    )
+    assert response.status_code == 422
+
+
+@pytest.fixture()
+def search_sessions():
+    sessions = SearchSessions(debounce=0)
+    app.dependency_overrides[get_search_sessions] = lambda: sessions
+    return sessions
+
+
+def test_search_incremental(
+    client: TestClient, search_sessions, add_snippet, add_another_snippet
+):
+    for term, expected in [("g", [1, 2]), ("ge", [2]), ("get it", [2]), ("x", [])]:
+        response = client.get(
+            "/snippets/search/incremental", params={"term": term, "session": "s1"}
+        )
+        assert response.status_code == 200
+        assert [snippet["id"] for snippet in response.json()] == expected
+    assert search_sessions.refined == 2
+
+    response = client.get(
+        "/snippets/search/incremental",
+        params={"term": "get", "session": "s1", "fields": "title", "limit": 1},
+    )
+    assert response.json() == [{"title": "Get it all", "id": 2}]
+
+
+def test_search_incremental_superseded(
+    client: TestClient, search_sessions, add_snippet, monkeypatch
+):
+    monkeypatch.setattr(search_sessions, "is_current", lambda *args: False)
+
+    response = client.get(
+        "/snippets/search/incremental", params={"term": "snip", "session": "s1"}
+    )
+
+    assert response.status_code == 204
+    assert search_sessions.searches == 0
+
+
+def test_search_incremental_invalid(client: TestClient, search_sessions):
+    response = client.get(
+        "/snippets/search/incremental",
+        params={"term": "", "session": "s1", "tags": "(sql"},
+    )
+    assert response.status_code == 422
+
+    response = client.get("/snippets/search/incremental", params={"term": "x"})
+    assert response.status_code == 422
+
+
+def test_write_stats_disabled(client: TestClient):
+    response = client.get("/metrics/writes")
+    assert response.status_code == 404
+
+
+def test_search_snippets_by_tag_expression(
+    client: TestClient, add_snippet, add_another_snippet
+):
+    client.post("snippets/1/tags", json=["training", "legacy"])
+    client.post("snippets/2/tags", json=["training"])
+
+    response = client.get(
+        "/snippets/search/", params={"term": "", "tags": "training NOT legacy"}
+    )
+    data = response.json()
+
+    assert response.status_code == 200
+    assert [snippet["id"] for snippet in data] == [2]
+
+
+def test_search_snippets_invalid_tag_expression(client: TestClient):
+    response = client.get("/snippets/search/", params={"term": "", "tags": "AND"})
+
+    assert response.status_code == 422
+
+
+def test_get_facets(client: TestClient, add_snippet, add_another_snippet):
+    client.post("snippets/1/tags", json=["training"])
+    client.post("/snippets/2/favorite")
+
+    response = client.get("/snippets/facets")
+    data = response.json()
+
+    assert response.status_code == 200
+    assert data == {
+        "total": 2,
+        "favorites": 1,
+        "languages": {"py": 1, "sql": 1},
+        "tags": {"training": 1},
+    }
+
+    response = client.get("/snippets/facets", params={"term": "select"})
+    data = response.json()
+
+    assert data["total"] == 1
+    assert data["languages"] == {"sql": 1}
+
+
+def test_get_snippets_with_fields(client: TestClient, add_snippet):
+    client.post("snippets/1/tags", json=["training"])
+
+    response = client.get("/snippets", params={"fields": "title,tags"})
+    data = response.json()
+
+    assert response.status_code == 200
+    assert data == [
+        {"title": "First snip", "id": 1, "tags": [{"name": "training", "id": 1}]}
+    ]
+
+
+def test_get_snippets_summary(client: TestClient, add_snippet):
+    response = client.get("/snippets", params={"fields": "summary"})
+    data = response.json()
+
+    assert response.status_code == 200
+    assert set(data[0]) == {"id", "title", "language", "favorite", "tags"}
+
+
+def test_get_snippets_unknown_field(client: TestClient):
+    response = client.get("/snippets", params={"fields": "title,secret"})
+
+    assert response.status_code == 422
+
+
+def test_search_snippets_with_fields(
+    client: TestClient, add_snippet, add_another_snippet
+):
+    params = {"term": "select", "fields": "language"}
+    response = client.get("/snippets/search/", params=params)
+    data = response.json()
+
+    assert response.status_code == 200
+    assert data == [{"language": "sql", "id": 2}]
+
+    params["fuzzy"] = True
+    params["term"] = "get it all"
+    response = client.get("/snippets/search/", params=params)
+
+    assert response.json() == [{"language": "sql", "id": 2}]
+
+
+def test_get_snippets_by_ids(client: TestClient, add_snippet, add_another_snippet):
+    response = client.get("/snippets", params={"ids": [2, 99, 1], "fields": "title"})
+    data = response.json()
+
+    assert response.status_code == 200
+    assert data == [{"title": "Get it all", "id": 2}, {"title": "First snip", "id": 1}]
+
+
+def test_get_changes(client: TestClient, add_snippet, add_another_snippet):
+    client.post("snippets/1/tags", json=["training"])
+    client.delete("/snippets/2")
+
+    response = client.get("/snippets/changes")
+    data = response.json()
+
+    assert response.status_code == 200
+    assert data["cursor"] == 4
+    assert not data["has_more"]
+    assert [(c["snippet_id"], c["operation"]) for c in data["changes"]] == [
+        (1, "upsert"),
+        (2, "delete"),
+    ]
+    assert data["changes"][0]["snippet"]["tags"][0]["name"] == "training"
+    assert data["changes"][1]["snippet"] is None
+
+
+def test_get_changes_paged(client: TestClient, add_snippet, add_another_snippet):
+    response = client.get("/snippets/changes", params={"since": 0, "limit": 1})
+    data = response.json()
+
+    assert [c["snippet_id"] for c in data["changes"]] == [1]
+    assert data["has_more"]
+
+    response = client.get("/snippets/changes", params={"since": data["cursor"]})
+    data = response.json()
+
+    assert [c["snippet_id"] for c in data["changes"]] == [2]
+    assert not data["has_more"]
+
+
+def test_add_duplicate_snippet(client: TestClient, add_snippet):
+    payload = {"title": "Copy", "code": "print('hello world')\n", "language": "py"}
+
+    response = client.post("/snippets", json=payload, params={"duplicates": "reject"})
+    assert response.status_code == 409
+    assert response.json()["detail"] == "Snippet duplicates snippet with ID 1"
+
+    response = client.post("/snippets", json=payload, params={"duplicates": "merge"})
+    assert response.status_code == 200
+    assert response.json()["id"] == 1
+    assert response.json()["title"] == "First snip"
+
+    response = client.post("/snippets", json=payload, params={"duplicates": "link"})
+    assert response.json()["id"] == 2
+    assert response.json()["duplicate_of"] == 1
+
+
+def test_get_related_snippets(client: TestClient, add_snippet, add_another_snippet):
+    payload = {"title": "Hello", "code": "print('hello world!')", "language": "py"}
+    client.post("/snippets", json=payload)
+
+    params = {"fields": "title", "threshold": 0.4}
+    response = client.get("/snippets/1/related", params=params)
+    data = response.json()
+
+    assert response.status_code == 200
+    assert data == [
+        {"similarity": data[0]["similarity"], "snippet": {"title": "Hello", "id": 3}}
+    ]
+    assert client.get("/snippets/9/related").status_code == 404
+
+
+def test_export_snippets(client: TestClient, add_snippet, add_another_snippet):
+    pa = pytest.importorskip("pyarrow")
+
+    response = client.get("/snippets/export", params={"format": "arrow"})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/vnd.apache.arrow.stream"
+    table = pa.ipc.open_stream(response.content).read_all()
+    assert table.column("language").to_pylist() == ["py", "sql"]
+
+    response = client.get("/snippets/export", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-type"] == "application/vnd.apache.parquet"
+    assert "content-encoding" not in response.headers
+    assert response.content.startswith(b"PAR1")
+
+
+def test_export_snippets_without_pyarrow(client: TestClient, monkeypatch):
+    monkeypatch.setattr(export, "pa", None)
+
+    response = client.get("/snippets/export")
+    assert response.status_code == 501
@@ -0,0 +1,110 @@
+import pytest
+
+from src.snipster.autocomplete import (
+    CompletionField,
+    CompletionIndex,
+    PrefixIndex,
+    title_words,
+)
+
+
+@pytest.fixture()
+def index() -> PrefixIndex:
+    index = PrefixIndex()
+    for key in ["python", "pyspark", "python", "postgres", "rust", "python"]:
+        index.add(key)
+    index.add("pyspark")
+    return index
+
+
+def test_complete_by_popularity(index):
+    assert index.complete("py") == [("python", 3), ("pyspark", 2)]
+    assert index.complete("p", limit=2) == [("python", 3), ("pyspark", 2)]
+    assert index.complete("r") == [("rust", 1)]
+    assert index.complete("go") == []
+
+
+def test_complete_ties_alphabetical(index):
+    assert index.complete("") == [
+        ("python", 3),
+        ("pyspark", 2),
+        ("postgres", 1),
+        ("rust", 1),
+    ]
+
+
+def test_discard(index):
+    index.discard("pyspark")
+    assert index.complete("pys") == [("pyspark", 1)]
+
+    index.discard("pyspark")
+    index.discard("missing")
+    assert index.complete("pys") == []
+
+
+def test_title_words():
+    assert title_words("Parse JSON with parse_json!") == {
+        "parse",
+        "json",
+        "with",
+        "parse_json",
+    }
+
+
+def test_completion_index_normalizes_prefix():
+    index = CompletionIndex()
+    index.add("Window Functions", ["big-data", "sql"])
+    index.add("Windowed joins", ["big-data"])
+
+    assert index.complete(CompletionField.TAG, "Big D") == [("big-data", 2)]
+    assert index.complete(CompletionField.TITLE, " WIN") == [
+        ("window", 1),
+        ("windowed", 1),
+    ]
+
+    index.remove("Windowed joins", ["big-data"])
+    assert index.complete(CompletionField.TAG, "big") == [("big-data", 1)]
+    assert index.complete(CompletionField.TITLE, "win") == [("window", 1)]
+
+
+def test_cached_completions_follow_changes():
+    index = PrefixIndex()
+    for i in range(PrefixIndex.CACHE_MIN_MATCHES + 1):
+        index.add(f"tag-{i:03}")
+    assert index.complete("tag", limit=1) == [("tag-000", 1)]
+
+    index.add("tag-064")
+    assert index.complete("tag", limit=1) == [("tag-064", 2)]
+
+    index.discard("tag-064")
+    assert index.complete("tag", limit=1) == [("tag-000", 1)]
+
+
+def test_suggest_tags():
+    index = CompletionIndex()
+    index.add("a", ["python", "pyspark"])
+    index.add("b", ["python", "pytest"])
+    index.add("c", ["sql", "rust"])
+
+    assert index.suggest_tags("Pyhton") == [("python", 2)]
+    assert index.suggest_tags("pytset") == [("pytest", 1)]
+    assert index.suggest_tags("pythn", max_distance=3) == [
+        ("python", 2),
+        ("pytest", 1),
+    ]
+    assert index.suggest_tags("sq") == [("sql", 1)]
+    assert index.suggest_tags("pyth", limit=1) == []  # short names allow 1 edit
+    assert index.suggest_tags("python") == []
+    assert index.suggest_tags("  ") == []
+
+
+def test_suggest_tags_follows_removals():
+    index = CompletionIndex()
+    index.add("a", ["python"])
+    index.add("b", ["python"])
+
+    index.remove("a", ["python"])
+    assert index.suggest_tags("pyhton") == [("python", 1)]
+
+    index.remove("b", ["python"])
+    assert index.suggest_tags("pyhton") == []
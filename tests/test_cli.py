@@ -10,6 +10,7 @@ runner = CliRunner()
 def db_setup(tmp_path, monkeypatch):
     db_path = tmp_path / "test.db"
     monkeypatch.setenv("DATABASE_URL", f"sqlite:///{db_path}")
+    monkeypatch.setenv("SNIPSTER_CACHE_DIR", "")
 
 
 @pytest.fixture()
@@ -121,6 +122,26 @@ def test_search_snippet(add_snippet, add_another_snippet):
     assert "No snippets found matching the search criteria." in result.output
 
 
+def test_search_snippet_ranked(add_snippet, add_another_snippet):
+    result = runner.invoke(app, ["search", "records", "--mode", "ranked"])
+    assert "SELECT * FROM MY_TABLE;" in result.output
+    assert "print('hello world')" not in result.output
+
+    result = runner.invoke(app, ["search", "l", "--limit", "1"])
+    assert "print('hello world')" in result.output
+    assert "SELECT * FROM MY_TABLE;" not in result.output
+
+
+def test_search_snippet_regex(add_snippet, add_another_snippet):
+    result = runner.invoke(app, ["search", "--regex", r"SELECT \* FROM \w+;"])
+    assert "SELECT * FROM MY_TABLE;" in result.output
+    assert "print('hello world')" not in result.output
+
+    result = runner.invoke(app, ["search", "--regex", "fn (x"])
+    assert result.exit_code == 1
+    assert "Regex search failed" in result.output
+
+
 def test_search_snippet_by_language(add_snippet, add_another_snippet):
     result = runner.invoke(app, ["search", "select", "--language", "py"])
     assert "No snippets found matching the search criteria." in result.output
@@ -211,3 +232,113 @@ def test_no_duplicate_tag_added(add_snippet):
     result = runner.invoke(app, ["tag", "1", "Test Tag", "Test Tag"])
     assert "#test-tag" in result.output
     assert "#test-tag #test-tag" not in result.output
+
+
+def test_search_snippet_by_tag_expression(add_snippet, add_another_snippet):
+    runner.invoke(app, ["tag", "1", "beginner", "legacy"])
+    runner.invoke(app, ["tag", "2", "beginner"])
+
+    result = runner.invoke(app, ["search", "", "--tag", "beginner NOT legacy"])
+    assert "SELECT * FROM MY_TABLE;" in result.output
+    assert "print('hello world')" not in result.output
+
+    result = runner.invoke(app, ["search", "", "--tag", "legacy OR missing"])
+    assert "print('hello world')" in result.output
+    assert "SELECT * FROM MY_TABLE;" not in result.output
+
+
+def test_tag_suggests_similar_tags(add_snippet, add_another_snippet):
+    runner.invoke(app, ["tag", "1", "beginner"])
+
+    result = runner.invoke(app, ["tag", "2", "begginer"])
+    assert "Did you mean #beginner?" in result.output
+    assert "#begginer" in result.output
+
+    result = runner.invoke(app, ["tag", "2", "beginner"])
+    assert "Did you mean" not in result.output
+
+
+def test_search_suggests_similar_tags(add_snippet):
+    runner.invoke(app, ["tag", "1", "beginner"])
+
+    result = runner.invoke(app, ["search", "", "--tag", "begginer OR missing"])
+    assert "No snippets found matching the search criteria." in result.output
+    assert "No snippet is tagged #begginer. Did you mean #beginner?" in result.output
+    assert "#missing" not in result.output
+
+
+def test_search_snippet_invalid_tag_expression(add_snippet):
+    result = runner.invoke(app, ["search", "", "--tag", "(beginner"])
+    assert result.exit_code == 1
+    assert "Invalid tag filter" in result.output
+
+
+def test_stats(add_snippet, add_another_snippet):
+    runner.invoke(app, ["tag", "1", "training"])
+    result = runner.invoke(app, ["stats"])
+    assert result.exit_code == 0
+    assert "2 snippets, 0 favorites" in result.output
+    assert "#training" in result.output
+
+    result = runner.invoke(app, ["stats", "--term", "select"])
+    assert "1 snippets" in result.output
+    assert "#training" not in result.output
+
+
+def test_stats_no_snippets():
+    result = runner.invoke(app, ["stats"])
+    assert result.exit_code == 0
+    assert "No snippets found." in result.output
+
+
+def test_add_duplicate_snippet(add_snippet):
+    args = ["add", "Copy", "print('hello world')", "py", "--duplicates"]
+
+    result = runner.invoke(app, [*args, "reject"])
+    assert result.exit_code == 1
+    assert "duplicates snippet with ID 1" in result.output
+
+    result = runner.invoke(app, [*args, "merge"])
+    assert result.exit_code == 0
+    assert "Snippet 'Copy' merged into snippet 1." in result.output
+
+
+def test_dedupe(add_snippet, add_another_snippet):
+    runner.invoke(app, ["add", "Copy", "print('hello world')", "py"])
+
+    result = runner.invoke(app, ["dedupe", "--dry-run"])
+    assert result.exit_code == 0
+    assert "Would merge 1 duplicates into 1 snippets" in result.output
+
+    result = runner.invoke(app, ["dedupe"])
+    assert "Merged 1 duplicates into 1 snippets" in result.output
+    assert "No snippet found" in runner.invoke(app, ["get", "3"]).output
+
+    result = runner.invoke(app, ["dedupe"])
+    assert "No duplicate snippets found." in result.output
+
+
+def test_near_dupes(add_snippet, add_another_snippet):
+    runner.invoke(app, ["add", "Hello", "print('hello world!')", "py"])
+
+    result = runner.invoke(app, ["near-dupes", "--threshold", "0.4"])
+    assert result.exit_code == 0
+    assert "1 near-duplicate pairs" in result.output
+    assert "1: First snip" in result.output
+    assert "3: Hello" in result.output
+
+    result = runner.invoke(app, ["near-dupes", "--threshold", "1"])
+    assert "No near-duplicate snippets found." in result.output
+
+
+def test_export(add_snippet, add_another_snippet, tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    path = tmp_path / "snippets.parquet"
+
+    result = runner.invoke(app, ["export", str(path), "--format", "parquet"])
+    assert result.exit_code == 0
+    assert f"Exported 2 snippets to {path}." in " ".join(result.output.split())
+    assert pq.read_table(path).column("title").to_pylist() == [
+        "First snip",
+        "Get it all",
+    ]
@@ -0,0 +1,147 @@
+import threading
+
+import pytest
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session, create_engine, select
+
+from src.snipster.coalescer import WriteCoalescer
+from src.snipster.models import LangEnum, Snippet, SQLModel, Tag
+from src.snipster.repo import (
+    ConsistencyMode,
+    DBSnippetRepository,
+    TieredSnippetRepository,
+)
+
+
+@pytest.fixture()
+def engine(tmp_path):
+    # threads need a shared database, which an in-memory one is not
+    engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}")
+    SQLModel.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+def make_snippet(i: int) -> Snippet:
+    return Snippet(title=f"Snip {i}", code=f"x = {i}", language=LangEnum.PYTHON)
+
+
+def run_together(*calls) -> list[Exception | None]:
+    """Run calls on threads released at once, returning what each raised."""
+    barrier = threading.Barrier(len(calls))
+    errors = [None] * len(calls)
+
+    def run(i, call):
+        barrier.wait()
+        try:
+            call()
+        except Exception as e:
+            errors[i] = e
+
+    threads = [
+        threading.Thread(target=run, args=(i, call)) for i, call in enumerate(calls)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return errors
+
+
+def test_store_single_write(engine):
+    coalescer = WriteCoalescer(engine, window=0)
+    repo = DBSnippetRepository(engine, coalescer)
+    snippet = make_snippet(1)
+    snippet.tags = [Tag(name="demo")]
+
+    repo.add(snippet)
+
+    assert snippet.id == 1
+    assert [tag.name for tag in repo.get(1).tags] == ["demo"]
+    stats = coalescer.stats()
+    assert (stats.batches, stats.writes, stats.max_batch_size) == (1, 1, 1)
+
+
+def test_concurrent_writes_share_a_commit(engine):
+    coalescer = WriteCoalescer(engine, window=5, max_batch=8)
+    repo = DBSnippetRepository(engine, coalescer)
+    snippets = [make_snippet(i) for i in range(8)]
+
+    errors = run_together(*(lambda s=s: repo.add(s) for s in snippets))
+
+    assert errors == [None] * 8
+    assert sorted(snippet.id for snippet in snippets) == list(range(1, 9))
+    assert len(repo.list()) == 8
+    assert len(repo.changes(limit=100)) == 8
+    stats = coalescer.stats()
+    assert (stats.batches, stats.writes, stats.max_batch_size) == (1, 8, 8)
+    assert stats.mean_batch_size == 8
+    assert stats.mean_commit_ms > 0
+
+
+def test_tiered_writes_share_a_commit(engine):
+    coalescer = WriteCoalescer(engine, window=5, max_batch=8)
+    repo = TieredSnippetRepository(
+        DBSnippetRepository(engine, coalescer), ConsistencyMode.EXCLUSIVE
+    )
+    repo.warm_up()
+    snippets = [make_snippet(i) for i in range(8)]
+
+    errors = run_together(*(lambda s=s: repo.add(s) for s in snippets))
+
+    assert errors == [None] * 8
+    assert coalescer.stats().max_batch_size > 1
+    assert len(repo.list()) == 8
+    assert [s.id for s in repo.search("snip 7")] == [snippets[7].id]
+
+
+def test_new_tag_shared_within_batch(engine):
+    coalescer = WriteCoalescer(engine, window=5, max_batch=2)
+    repo = DBSnippetRepository(engine)
+    repo.add(make_snippet(1))
+    repo.add(make_snippet(2))
+    repo = DBSnippetRepository(engine, coalescer)
+
+    errors = run_together(
+        lambda: repo.tag(1, Tag(name="new")), lambda: repo.tag(2, Tag(name="new"))
+    )
+
+    assert errors == [None, None]
+    with Session(engine) as session:
+        assert len(session.exec(select(Tag)).all()) == 1
+    assert [s.id for s in repo.search("", tag_name="new")] == [1, 2]
+    assert coalescer.stats().failed_batches == 0
+
+
+def test_same_snippet_twice_in_batch(engine):
+    DBSnippetRepository(engine).add(make_snippet(1))
+    coalescer = WriteCoalescer(engine, window=5, max_batch=2)
+    repo = DBSnippetRepository(engine, coalescer)
+
+    errors = run_together(
+        lambda: repo.toggle_favorite(1), lambda: repo.tag(1, Tag(name="a"))
+    )
+
+    assert errors == [None, None]
+    snippet = repo.get(1)
+    assert snippet.favorite
+    assert [tag.name for tag in snippet.tags] == ["a"]
+    assert coalescer.stats().batches == 1
+
+
+def test_failed_write_does_not_fail_batch(engine):
+    DBSnippetRepository(engine).add(make_snippet(1))
+    coalescer = WriteCoalescer(engine, window=5, max_batch=2)
+    repo = DBSnippetRepository(engine, coalescer)
+    conflicting = make_snippet(2)
+    conflicting.id = 1  # a new row with the ID of a stored one
+
+    errors = run_together(
+        lambda: repo.add(make_snippet(3)), lambda: repo.add(conflicting)
+    )
+
+    assert errors[0] is None
+    assert isinstance(errors[1], IntegrityError)
+    assert [snippet.title for snippet in repo.list()] == ["Snip 1", "Snip 3"]
+    stats = coalescer.stats()
+    assert (stats.batches, stats.failed_batches, stats.writes) == (1, 1, 2)
@@ -0,0 +1,78 @@
+import pytest
+
+from src.snipster.compressed import (
+    Codec,
+    TextCompressor,
+    decode_stored,
+    get_compressor,
+    pack_text,
+    unpack_text,
+)
+
+LARGE_CODE = "SELECT id, title FROM snippet WHERE language = 'sql';\n" * 200
+
+
+@pytest.fixture()
+def compressor() -> TextCompressor:
+    return TextCompressor(Codec.ZLIB, min_size=1024)
+
+
+def test_compress_round_trip(compressor):
+    compressed = compressor.compress(LARGE_CODE)
+
+    assert isinstance(compressed, bytes)
+    assert len(compressed) < len(LARGE_CODE)
+    assert TextCompressor.decompress(compressed) == LARGE_CODE
+
+
+def test_compress_keeps_small_text(compressor):
+    assert compressor.compress("print('hello world')") == "print('hello world')"
+    assert compressor.compress(None) is None
+
+
+def test_compress_keeps_text_that_does_not_shrink():
+    compressor = TextCompressor(Codec.ZLIB, min_size=0)
+
+    assert compressor.compress("x = 1") == "x = 1"
+
+
+def test_compress_off():
+    compressor = TextCompressor(Codec.OFF, min_size=0)
+
+    assert compressor.compress(LARGE_CODE) == LARGE_CODE
+
+
+def test_decompress_plain_text():
+    assert TextCompressor.decompress("print('hello world')") == "print('hello world')"
+    assert TextCompressor.decompress(None) is None
+
+
+@pytest.mark.parametrize("text", ["print('hello world')", "x^2 + 1", "x", ""])
+def test_decode_stored_plain_text(text):
+    assert decode_stored(text.encode()) == text
+
+
+def test_decode_stored_compressed(compressor):
+    assert decode_stored(compressor.compress(LARGE_CODE)) == LARGE_CODE
+    assert decode_stored(None) is None
+
+
+def test_pack_text(compressor):
+    packed = pack_text(compressor.compress(LARGE_CODE))
+
+    assert packed["codec"] == Codec.ZLIB
+    assert unpack_text(packed) == LARGE_CODE
+    assert pack_text("print('hello world')") == "print('hello world')"
+    assert unpack_text("print('hello world')") == "print('hello world')"
+
+
+def test_get_compressor_reads_environment(monkeypatch):
+    monkeypatch.setenv("SNIPSTER_COMPRESSION", "zlib")
+    monkeypatch.setenv("SNIPSTER_COMPRESS_MIN_SIZE", "100")
+    get_compressor.cache_clear()
+    try:
+        compressor = get_compressor()
+        assert compressor.codec == Codec.ZLIB
+        assert compressor.min_size == 100
+    finally:
+        get_compressor.cache_clear()
@@ -0,0 +1,65 @@
+import pytest
+from sqlalchemy import pool, text
+
+from src.snipster.db import create_db_engine
+
+
+def pragma(engine, name: str):
+    with engine.connect() as connection:
+        return connection.execute(text(f"PRAGMA {name}")).scalar()
+
+
+@pytest.fixture()
+def database_url(tmp_path) -> str:
+    return f"sqlite:///{tmp_path / 'test.db'}"
+
+
+def test_sqlite_pragmas(database_url):
+    engine = create_db_engine(database_url)
+
+    assert pragma(engine, "journal_mode") == "wal"
+    assert pragma(engine, "synchronous") == 1  # normal
+    assert pragma(engine, "cache_size") == -65536
+    assert pragma(engine, "mmap_size") == 268435456
+    assert pragma(engine, "temp_store") == 2  # memory
+    assert pragma(engine, "busy_timeout") == 5000
+    assert pragma(engine, "foreign_keys") == 1
+
+
+def test_sqlite_pragmas_from_env(database_url, monkeypatch):
+    monkeypatch.setenv("SNIPSTER_SQLITE_SYNCHRONOUS", "full")
+    monkeypatch.setenv("SNIPSTER_SQLITE_JOURNAL_MODE", "")
+
+    engine = create_db_engine(database_url)
+
+    assert pragma(engine, "synchronous") == 2
+    assert pragma(engine, "journal_mode") == "delete"
+
+
+def test_sqlite_pragma_invalid(database_url, monkeypatch):
+    monkeypatch.setenv("SNIPSTER_SQLITE_CACHE_SIZE", "1; DROP TABLE snippet")
+
+    with pytest.raises(ValueError, match="cache_size"):
+        create_db_engine(database_url)
+
+
+def test_pool_options(database_url, monkeypatch):
+    assert create_db_engine(database_url).pool.size() == 5
+
+    monkeypatch.setenv("SNIPSTER_DB_POOL_SIZE", "2")
+    assert create_db_engine(database_url).pool.size() == 2
+
+    engine = create_db_engine(database_url, poolclass=pool.NullPool)
+    assert isinstance(engine.pool, pool.NullPool)
+
+
+def test_in_memory_database():
+    engine = create_db_engine("sqlite://")
+
+    assert pragma(engine, "foreign_keys") == 1
+    assert not isinstance(engine.pool, pool.QueuePool)
+
+
+def test_database_url_from_env(database_url, monkeypatch):
+    monkeypatch.setenv("DATABASE_URL", database_url)
+    assert str(create_db_engine().url) == database_url
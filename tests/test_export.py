@@ -0,0 +1,89 @@
+import io
+
+import pytest
+
+from src.snipster import export
+from src.snipster.export import ExportFormat, export_snippets, iter_export
+from src.snipster.models import LangEnum, Snippet, Tag
+from src.snipster.repo import InMemorySnippetRepository
+
+pa = pytest.importorskip("pyarrow")
+pq = pytest.importorskip("pyarrow.parquet")
+
+
+@pytest.fixture(params=["memory", "db"])
+def repo(request, create_db_repo):
+    repo = create_db_repo if request.param == "db" else InMemorySnippetRepository()
+    for i in range(5):
+        repo.add(
+            Snippet(
+                title=f"Snippet {i}",
+                code=f"print({i})",
+                language=[LangEnum.PYTHON, LangEnum.SQL][i % 2],
+                tags=[Tag(name="perf"), Tag(name=f"tag-{i % 2}")] if i < 4 else [],
+            )
+        )
+    return repo
+
+
+def read(data: bytes, format: ExportFormat) -> "pa.Table":
+    if format == ExportFormat.PARQUET:
+        return pq.read_table(pa.BufferReader(data))
+    return pa.ipc.open_stream(data).read_all()
+
+
+@pytest.mark.parametrize("format", list(ExportFormat))
+def test_export_snippets(repo, format):
+    sink = io.BytesIO()
+    assert export_snippets(repo, sink, format, batch_size=2) == 5
+
+    table = read(sink.getvalue(), format)
+    assert table.column("id").to_pylist() == [1, 2, 3, 4, 5]
+    assert table.column("language").to_pylist() == ["py", "sql", "py", "sql", "py"]
+    assert [sorted(tags) for tags in table.column("tags").to_pylist()] == [
+        ["perf", "tag-0"],
+        ["perf", "tag-1"],
+        ["perf", "tag-0"],
+        ["perf", "tag-1"],
+        [],
+    ]
+    row = table.slice(0, 1).to_pylist()[0]
+    assert row["title"] == "Snippet 0"
+    assert row["code"] == "print(0)"
+    assert row["description"] is None
+    assert row["created_at"] is not None
+
+
+def test_export_dictionary_encodes(repo):
+    table = read(b"".join(iter_export(repo)), ExportFormat.PARQUET)
+
+    assert pa.types.is_dictionary(table.schema.field("language").type)
+    assert pa.types.is_dictionary(table.schema.field("tags").type.value_type)
+
+
+def test_export_parquet_row_group_per_batch(repo, tmp_path):
+    path = tmp_path / "snippets.parquet"
+    export_snippets(repo, path, batch_size=2)
+
+    assert pq.ParquetFile(path).metadata.num_row_groups == 3
+
+
+@pytest.mark.parametrize("format", list(ExportFormat))
+def test_iter_export(repo, format):
+    chunks = list(iter_export(repo, format, batch_size=2))
+
+    assert len(chunks) > 1
+    assert read(b"".join(chunks), format).num_rows == 5
+
+
+def test_export_empty_repo():
+    sink = io.BytesIO()
+    assert export_snippets(InMemorySnippetRepository(), sink) == 0
+    assert read(sink.getvalue(), ExportFormat.PARQUET).num_rows == 0
+
+
+def test_export_needs_pyarrow(monkeypatch):
+    monkeypatch.setattr(export, "pa", None)
+
+    with pytest.raises(ValueError, match="pyarrow"):
+        iter_export(InMemorySnippetRepository())
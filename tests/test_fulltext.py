@@ -0,0 +1,78 @@
+import random
+
+import pytest
+
+from src.snipster.fulltext import BM25Index, tokenize
+
+
+def test_tokenize_splits_identifiers():
+    assert list(tokenize("getUserId")) == ["getuserid", "get", "user", "id"]
+    assert list(tokenize("parse_json2")) == ["parse_json2", "parse", "json", "2"]
+    assert list(tokenize("HTTPServer")) == ["httpserver", "http", "server"]
+
+
+def test_tokenize_keeps_operators():
+    tokens = list(tokenize("SELECT data->>'name' FROM t WHERE x::int <> 3;"))
+    assert tokens == [
+        "select", "data", "->>", "name", "from", "t", "where", "x", "::", "int",
+        "<>", "3",
+    ]  # fmt: skip
+
+
+@pytest.fixture()
+def index() -> BM25Index:
+    index = BM25Index()
+    index.add(1, "Get user", "Fetch a user by ID", "def get_user(user_id): ...", ["py"])
+    index.add(2, "Select all", "All rows", "SELECT * FROM users;", ["sql"])
+    index.add(3, "User cache", None, "cache = {}", ["py", "cache"])
+    return index
+
+
+def test_search_ranks_by_score(index):
+    results = index.search("user")
+
+    assert [doc_id for doc_id, _ in results] == [1, 3]
+    assert results[0][1] > results[1][1] > 0
+
+
+def test_search_weights_fields(index):
+    # "cache" is in the title, tags and code of 3 only
+    assert [doc_id for doc_id, _ in index.search("cache users")] == [3, 2]
+
+
+def test_search_limit_and_within(index):
+    assert [doc_id for doc_id, _ in index.search("user", limit=1)] == [1]
+    assert [doc_id for doc_id, _ in index.search("user", within={3})] == [3]
+    assert index.search("user", limit=0) == []
+    assert index.search("missing") == []
+
+
+def test_remove(index):
+    index.remove(1)
+    index.remove(99)
+
+    assert 1 not in index
+    assert len(index) == 2
+    assert [doc_id for doc_id, _ in index.search("user")] == [3]
+
+
+def test_top_k_matches_exhaustive_scoring():
+    rng = random.Random(3)
+    words = ["select", "join", "async", "trait", "vector", "cache", "lock", "parse"]
+    index = BM25Index()
+    for doc_id in range(1, 501):
+        index.add(
+            doc_id,
+            " ".join(rng.choices(words, k=3)),
+            " ".join(rng.choices(words, k=rng.randint(0, 8))),
+            " ".join(rng.choices(words, k=rng.randint(1, 30))),
+            rng.sample(words, k=2),
+        )
+    for doc_id in rng.sample(range(1, 501), k=100):
+        index.remove(doc_id)
+
+    for _ in range(20):
+        query = " ".join(rng.sample(words, k=rng.randint(1, 3)))
+        ranked = index.search(query)
+        for limit in (1, 5, 25):
+            assert index.search(query, limit=limit) == ranked[:limit]
@@ -0,0 +1,160 @@
+import os
+
+import pytest
+from rich.console import Console
+
+from src.snipster import highlight
+from src.snipster.highlight import Highlighter, content_hash, get_lexer
+from src.snipster.models import LangEnum
+
+CODE = "SELECT * FROM MY_TABLE;"
+
+
+@pytest.fixture()
+def highlighter(tmp_path) -> Highlighter:
+    return Highlighter(cache_dir=tmp_path / "cache")
+
+
+def render(renderable, styles: bool = False) -> str:
+    console = Console(width=80, record=True, force_terminal=True)
+    console.print(renderable)
+    return console.export_text(styles=styles)
+
+
+def test_lexer_cached_per_language():
+    assert get_lexer(LangEnum.SQL) is get_lexer(LangEnum.SQL)
+    assert get_lexer(LangEnum.SQL) is not get_lexer(LangEnum.PYTHON)
+
+
+def test_content_hash_depends_on_language():
+    assert content_hash(CODE, LangEnum.SQL) == content_hash(CODE, LangEnum.SQL)
+    assert content_hash(CODE, LangEnum.SQL) != content_hash(CODE, LangEnum.PYTHON)
+
+
+def test_tokens_lexed_once(highlighter):
+    tokens = highlighter.tokens(CODE, LangEnum.SQL)
+    assert "".join(value for _, value in tokens).strip() == CODE
+    assert highlighter.tokens(CODE, LangEnum.SQL) is tokens
+    assert highlighter.lex_count == 1
+
+
+def test_html_fragment(highlighter):
+    fragment = highlighter.html(CODE, LangEnum.SQL)
+    assert "<span" in fragment
+    assert "SELECT" in fragment
+    assert "<pre" not in fragment
+    assert highlighter.html(CODE, LangEnum.SQL) is fragment
+    assert highlighter.lex_count == 1
+
+
+def test_disk_cache_shared_between_instances(tmp_path):
+    first = Highlighter(cache_dir=tmp_path / "cache")
+    first.html(CODE, LangEnum.SQL)
+
+    second = Highlighter(cache_dir=tmp_path / "cache")
+    assert second.tokens(CODE, LangEnum.SQL) == first.tokens(CODE, LangEnum.SQL)
+    assert second.html(CODE, LangEnum.SQL) == first.html(CODE, LangEnum.SQL)
+    assert second.lex_count == 0
+
+
+def test_disk_cache_bounded(tmp_path):
+    highlighter = Highlighter(cache_dir=tmp_path / "cache", max_disk_entries=3)
+    for i in range(10):
+        highlighter.tokens(f"SELECT {i};", LangEnum.SQL)
+    assert len(list((tmp_path / "cache").iterdir())) == 3
+
+
+def test_disk_cache_lists_directory_only_when_full(tmp_path, monkeypatch):
+    highlighter = Highlighter(cache_dir=tmp_path / "cache", max_disk_entries=10)
+    scans = []
+    real_scandir = os.scandir
+    monkeypatch.setattr(
+        highlight.os, "scandir", lambda path: scans.append(path) or real_scandir(path)
+    )
+    for i in range(10):
+        highlighter.tokens(f"SELECT {i};", LangEnum.SQL)
+    assert scans == []
+
+    highlighter.tokens("SELECT 10;", LangEnum.SQL)
+    highlighter.tokens("SELECT 11;", LangEnum.SQL)
+    assert len(scans) == 1
+    assert len(list((tmp_path / "cache").iterdir())) == 10
+
+
+def test_memory_cache_bounded():
+    highlighter = Highlighter(max_memory_entries=2)
+    for i in range(3):
+        highlighter.tokens(f"SELECT {i};", LangEnum.SQL)
+    highlighter.tokens("SELECT 0;", LangEnum.SQL)
+    assert highlighter.lex_count == 4
+
+
+def test_syntax_renders_from_cache(highlighter):
+    output = render(highlighter.syntax(CODE, LangEnum.SQL))
+    assert CODE in output
+    render(highlighter.syntax(CODE, LangEnum.SQL))
+    assert highlighter.lex_count == 1
+
+
+def test_syntax_text_shared_between_instances(tmp_path):
+    first = Highlighter(cache_dir=tmp_path / "cache")
+    expected = render(first.syntax(CODE, LangEnum.SQL), styles=True)
+
+    second = Highlighter(cache_dir=tmp_path / "cache")
+    assert render(second.syntax(CODE, LangEnum.SQL), styles=True) == expected
+    assert second.lex_count == 0
+
+
+def test_syntax_cached_per_theme(highlighter):
+    dark = render(highlighter.syntax(CODE, LangEnum.SQL), styles=True)
+    light = render(highlighter.syntax(CODE, LangEnum.SQL, theme="default"), styles=True)
+    assert dark != light
+    assert highlighter.lex_count == 2
+
+
+def test_syntax_with_line_range_not_cached(highlighter):
+    code = f"{CODE}\n{CODE}"
+    output = render(highlighter.syntax(code, LangEnum.SQL, line_range=(2, 2)))
+    assert output.count(CODE) == 1
+    assert highlighter.lex_count == 0
+
+
+@pytest.mark.parametrize("content", ["", "[[", '{"plain": 1}'])
+def test_unreadable_disk_entry_is_a_miss(tmp_path, content):
+    Highlighter(cache_dir=tmp_path / "cache").tokens(CODE, LangEnum.SQL)
+    (entry,) = (tmp_path / "cache").iterdir()
+    entry.write_text(content)
+
+    highlighter = Highlighter(cache_dir=tmp_path / "cache")
+    assert highlighter.tokens(CODE, LangEnum.SQL)
+    assert highlighter.lex_count == 1
+    assert entry.read_text() not in ("", content)
+
+
+def test_disk_read_does_not_recreate_pruned_entry(tmp_path, monkeypatch):
+    Highlighter(cache_dir=tmp_path / "cache").html(CODE, LangEnum.SQL)
+    highlighter = Highlighter(cache_dir=tmp_path / "cache")
+    real_utime = os.utime
+
+    def prune_then_utime(path, *args):
+        # another process prunes the entry between the read and the touch
+        os.unlink(path)
+        real_utime(path, *args)
+
+    monkeypatch.setattr(highlight.os, "utime", prune_then_utime)
+    assert CODE.split()[0] in highlighter.html(CODE, LangEnum.SQL)
+    assert list((tmp_path / "cache").glob("*.html")) == []
+
+
+def test_disk_cache_leaves_other_writers_temporary_files(tmp_path):
+    cache_dir = tmp_path / "cache"
+    cache_dir.mkdir()
+    in_progress = cache_dir / "entry.json.tmp"
+    in_progress.write_text("partial")
+    highlighter = Highlighter(cache_dir=cache_dir, max_disk_entries=2)
+
+    for i in range(5):
+        highlighter.tokens(f"SELECT {i};", LangEnum.SQL)
+
+    assert in_progress.exists()
+    assert len([path for path in cache_dir.iterdir() if path.suffix != ".tmp"]) == 2
@@ -0,0 +1,153 @@
+import pytest
+
+from src.snipster.incremental import SearchSessions
+from src.snipster.models import LangEnum, Snippet
+from src.snipster.repo import InMemorySnippetRepository
+
+
+@pytest.fixture(params=["memory", "db"])
+def repo(request, create_db_repo):
+    repo = InMemorySnippetRepository() if request.param == "memory" else create_db_repo
+    for title, code, language in [
+        ("Select all", "SELECT * FROM users;", LangEnum.SQL),
+        ("Select one", "SELECT id FROM users LIMIT 1;", LangEnum.SQL),
+        ("Selector", "document.querySelector('p')", LangEnum.PYTHON),
+        ("Hello", "print('hello')", LangEnum.PYTHON),
+    ]:
+        repo.add(Snippet(title=title, code=code, language=language))
+    return repo
+
+
+@pytest.fixture()
+def sessions() -> SearchSessions:
+    return SearchSessions(debounce=0)
+
+
+def titles(snippets) -> list[str]:
+    return [snippet.title for snippet in snippets]
+
+
+def test_search_refines_previous_term(repo, sessions):
+    assert titles(sessions.search(repo, "a", "sel")) == [
+        "Select all",
+        "Select one",
+        "Selector",
+    ]
+    assert sessions.refined == 0
+
+    assert titles(sessions.search(repo, "a", "selec")) == [
+        "Select all",
+        "Select one",
+        "Selector",
+    ]
+    assert titles(sessions.search(repo, "a", "select O")) == ["Select one"]
+    assert titles(sessions.search(repo, "a", "select o")) == ["Select one"]
+    assert sessions.refined == 3
+    assert sessions.searches == 4
+
+
+def test_search_matches_full_search(repo, sessions):
+    for term in ["s", "se", "sel", "selector", "selec", "users", "hello"]:
+        expected = [snippet.id for snippet in repo.search(term)]
+        assert [snippet.id for snippet in sessions.search(repo, "a", term)] == expected
+
+
+def test_search_keeps_sessions_apart(repo, sessions):
+    sessions.search(repo, "a", "sel")
+    sessions.search(repo, "b", "select")
+    assert sessions.refined == 0
+
+
+def test_search_keeps_filters_apart(repo, sessions):
+    sessions.search(repo, "a", "sel", language=LangEnum.SQL)
+    assert titles(sessions.search(repo, "a", "sele")) == [
+        "Select all",
+        "Select one",
+        "Selector",
+    ]
+    assert sessions.refined == 0
+    assert titles(sessions.search(repo, "a", "selec", language=LangEnum.SQL)) == [
+        "Select all",
+        "Select one",
+    ]
+    assert sessions.refined == 1
+
+
+def test_search_limit(repo, sessions):
+    assert titles(sessions.search(repo, "a", "sel", limit=2)) == [
+        "Select all",
+        "Select one",
+    ]
+    # more matches than the page, so nothing was cached to refine
+    assert titles(sessions.search(repo, "a", "sele", limit=3)) == [
+        "Select all",
+        "Select one",
+        "Selector",
+    ]
+    assert sessions.refined == 0
+    assert titles(sessions.search(repo, "a", "selec", limit=2)) == [
+        "Select all",
+        "Select one",
+    ]
+    assert sessions.refined == 1
+
+
+def test_search_sees_changes(repo, sessions):
+    sessions.search(repo, "a", "sel")
+    repo.add(Snippet(title="Selected", code="x", language=LangEnum.RUST))
+
+    assert "Selected" in titles(sessions.search(repo, "a", "selec"))
+    assert sessions.refined == 0
+
+
+def test_begin_supersedes_earlier_requests(sessions):
+    first = sessions.begin("a")
+    assert sessions.is_current("a", first)
+
+    second = sessions.begin("a")
+    assert not sessions.is_current("a", first)
+    assert sessions.is_current("a", second)
+    assert sessions.is_current("b", sessions.begin("b"))
+    assert not sessions.is_current("c", 1)
+
+
+def test_sessions_evicted_least_recently_used(repo):
+    sessions = SearchSessions(debounce=0, max_sessions=2)
+    sessions.search(repo, "a", "sel")
+    sessions.search(repo, "b", "sel")
+    sessions.search(repo, "a", "sele")
+    sessions.search(repo, "c", "sel")
+
+    sessions.search(repo, "a", "selec")
+    sessions.search(repo, "b", "selec")
+    assert sessions.refined == 2  # "b" was evicted
+
+
+def test_search_skips_caching_when_changes_arrive_meanwhile(
+    repo, sessions, monkeypatch
+):
+    search = repo.search
+
+    def search_then_write(*args, **kwargs):
+        results = search(*args, **kwargs)
+        # a write lands after the search read, and another request catches up
+        repo.add(Snippet(title="Select new", code="", language=LangEnum.SQL))
+        sessions._catch_up(repo)
+        return results
+
+    monkeypatch.setattr(repo, "search", search_then_write)
+    sessions.search(repo, "a", "select")
+    monkeypatch.setattr(repo, "search", search)
+
+    assert "Select new" in titles(sessions.search(repo, "a", "select"))
+
+
+def test_change_log_read_without_lock(repo, sessions, monkeypatch):
+    changes = repo.changes
+
+    def unlocked_changes(*args):
+        assert not sessions._lock.locked()
+        return changes(*args)
+
+    monkeypatch.setattr(repo, "changes", unlocked_changes)
+    assert titles(sessions.search(repo, "a", "hello")) == ["Hello"]
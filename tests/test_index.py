@@ -0,0 +1,84 @@
+from src.snipster.index import PostingsIndex, SnippetIndex
+from src.snipster.models import LangEnum
+from src.snipster.query import TagTerm, parse_tag_query
+
+
+def test_postings_drop_empty_keys():
+    postings = PostingsIndex()
+    postings.add("sql", 1)
+    postings.discard("sql", 1)
+    postings.discard("missing", 1)
+
+    assert "sql" not in postings
+    assert postings.get("sql") == frozenset()
+
+
+def test_candidates_intersect_filters():
+    index = SnippetIndex()
+    index.add(1, LangEnum.SQL, ["perf"])
+    index.add(2, LangEnum.SQL, ["perf", "legacy"])
+    index.add(3, LangEnum.PYTHON, ["perf"])
+
+    assert index.candidates() is None
+    assert index.candidates(TagTerm("perf")) == [1, 2, 3]
+    assert index.candidates(TagTerm("perf"), language=LangEnum.SQL) == [1, 2]
+    assert index.candidates(TagTerm("legacy"), language=LangEnum.PYTHON) == []
+    assert index.candidates(TagTerm("unknown")) == []
+
+
+def test_candidates_tag_expression():
+    index = SnippetIndex()
+    index.add(1, LangEnum.SQL, ["sql", "perf"])
+    index.add(2, LangEnum.SQL, ["sql"])
+    index.add(3, LangEnum.RUST, ["rust"])
+    index.add(4, LangEnum.RUST, ["rust", "legacy"])
+
+    query = parse_tag_query("(sql AND perf) OR rust NOT legacy")
+    assert index.candidates(query) == [1, 3]
+    assert index.candidates(query, language=LangEnum.RUST) == [3]
+    assert index.candidates(parse_tag_query("NOT sql")) == [3, 4]
+
+
+def test_remove_snippet():
+    index = SnippetIndex()
+    index.add(1, LangEnum.SQL, ["perf"])
+    index.add(2, LangEnum.SQL, [])
+    index.remove(1, LangEnum.SQL, ["perf"])
+
+    assert index.candidates(language=LangEnum.SQL) == [2]
+    assert "perf" not in index.by_tag
+    assert index.ids == {2}
+
+
+def test_facets_counted_from_postings():
+    index = SnippetIndex()
+    index.add(1, LangEnum.PYTHON, ["web"], favorite=True)
+    index.add(2, LangEnum.SQL, ["web", "perf"])
+    index.add(3, LangEnum.SQL, [])
+    index.set_favorite(3, True)
+    index.remove(1, LangEnum.PYTHON, ["web"], favorite=True)
+
+    facets = index.facets()
+    assert facets.total == 2
+    assert facets.favorites == 1
+    assert facets.languages == {LangEnum.SQL: 2}
+    assert facets.tags == {"perf": 1, "web": 1}
+
+    facets = index.facets({2})
+    assert facets.total == 1
+    assert facets.favorites == 0
+    assert facets.tags == {"perf": 1, "web": 1}
+
+
+def test_duplicates_found_by_content_hash():
+    index = SnippetIndex()
+    index.add(1, LangEnum.SQL, [], content_hash="a")
+    index.add(2, LangEnum.SQL, [], content_hash="b")
+    index.add(3, LangEnum.SQL, [], content_hash="a")
+    index.add(4, LangEnum.SQL, [], content_hash="a")
+    index.remove(1, LangEnum.SQL, [], content_hash="a")
+
+    assert index.find_duplicate("a") == 3
+    assert index.find_duplicate("a", exclude_id=3) == 4
+    assert index.find_duplicate("b", exclude_id=2) is None
+    assert index.duplicate_groups() == [[3, 4]]
@@ -0,0 +1,111 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from fastapi.testclient import TestClient
+
+from src.snipster.middleware import CompressionMiddleware, negotiate_encoding
+
+LARGE_BODY = "SELECT * FROM my_table;\n" * 200
+
+
+@pytest.fixture()
+def middleware_app():
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, minimum_size=100)
+
+    @app.get("/large")
+    def large():
+        return PlainTextResponse(LARGE_BODY)
+
+    @app.get("/small")
+    def small():
+        return PlainTextResponse("tiny")
+
+    @app.get("/events")
+    def events():
+        return StreamingResponse(
+            iter(["data: " + LARGE_BODY + "\n\n"]), media_type="text/event-stream"
+        )
+
+    @app.get("/download")
+    def download():
+        return StreamingResponse(
+            iter([LARGE_BODY, LARGE_BODY]), media_type="application/octet-stream"
+        )
+
+    return app
+
+
+@pytest.fixture()
+def client(middleware_app):
+    return TestClient(middleware_app)
+
+
+def get_middleware(client: TestClient) -> CompressionMiddleware:
+    client.get("/small")  # builds the middleware stack
+    app = client.app.middleware_stack
+    while not isinstance(app, CompressionMiddleware):
+        app = app.app
+    return app
+
+
+@pytest.mark.parametrize(
+    "header, expected",
+    [
+        ("gzip, deflate", "gzip"),
+        ("GZIP;q=0.5", "gzip"),
+        ("gzip;q=0", None),
+        ("*", "zstd"),
+        ("br;q=0.2, zstd;q=0.8", "zstd"),
+        ("br, zstd", "zstd"),
+        ("identity", None),
+        ("", None),
+    ],
+)
+def test_negotiate_encoding(header, expected):
+    assert negotiate_encoding(header, ["zstd", "br", "gzip"]) == expected
+
+
+def test_large_response_compressed(client):
+    response = client.get("/large", headers={"Accept-Encoding": "gzip"})
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert int(response.headers["content-length"]) < len(LARGE_BODY)
+    assert "Accept-Encoding" in response.headers["vary"]
+    assert response.text == LARGE_BODY
+
+
+def test_small_or_unaccepted_response_not_compressed(client):
+    response = client.get("/small", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in response.headers
+
+    response = client.get("/large", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in response.headers
+    assert response.text == LARGE_BODY
+
+
+def test_compressed_bytes_cached(client):
+    middleware = get_middleware(client)
+
+    client.get("/large", headers={"Accept-Encoding": "gzip"})
+    client.get("/large", headers={"Accept-Encoding": "gzip"})
+
+    assert middleware.cache.misses == 1
+    assert middleware.cache.hits == 1
+    assert len(middleware.cache) == 1
+
+
+def test_event_stream_not_compressed(client):
+    response = client.get("/events", headers={"Accept-Encoding": "gzip"})
+
+    assert "content-encoding" not in response.headers
+    assert LARGE_BODY in response.text
+
+
+def test_streamed_response_not_buffered(client):
+    middleware = get_middleware(client)
+    response = client.get("/download", headers={"Accept-Encoding": "gzip"})
+
+    assert "content-encoding" not in response.headers
+    assert response.text == LARGE_BODY * 2
+    assert len(middleware.cache) == 0
@@ -0,0 +1,159 @@
+import zlib
+from pathlib import Path
+
+import pytest
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import text
+
+from src.snipster.db import create_db_engine
+from src.snipster.repo import DBSnippetRepository
+
+ROOT = Path(__file__).parent.parent
+
+
+@pytest.fixture()
+def database_url(tmp_path, monkeypatch) -> str:
+    database_url = f"sqlite:///{tmp_path / 'snipster.sqlite'}"
+    monkeypatch.setenv("DATABASE_URL", database_url)
+    return database_url
+
+
+@pytest.fixture()
+def config() -> Config:
+    config = Config(ROOT / "alembic.ini")
+    config.set_main_option("script_location", str(ROOT / "migrations"))
+    return config
+
+
+def test_upgrade_and_downgrade_populated_db(database_url, config):
+    command.upgrade(config, "5c1e9a7d3b20")
+    engine = create_db_engine(database_url)
+    with engine.begin() as connection:
+        connection.execute(
+            text(
+                "INSERT INTO snippet (id, title, code, language, favorite, created_at)"
+                " VALUES (1, 'Hello', 'print(1)', 'PYTHON', 0, '2025-01-01')"
+            )
+        )
+        connection.execute(text("INSERT INTO tag (id, name) VALUES (1, 'beginner')"))
+        connection.execute(
+            text("INSERT INTO snippettaglink (snippet_id, tag_id) VALUES (1, 1)")
+        )
+
+    command.upgrade(config, "head")
+    command.downgrade(config, "5c1e9a7d3b20")
+
+    with engine.connect() as connection:
+        assert connection.execute(text("SELECT title FROM snippet")).all() == [
+            ("Hello",)
+        ]
+        assert connection.execute(text("SELECT * FROM snippettaglink")).all() == [
+            (1, 1)
+        ]
+    engine.dispose()
+
+
+def test_text_columns_become_binary(database_url, config):
+    large_code = "SELECT * FROM snippet;\n" * 100
+    command.upgrade(config, "07bfc58e2377")
+    engine = create_db_engine(database_url)
+    with engine.begin() as connection:
+        # compressed values used to be stored as BLOBs in the text columns
+        connection.execute(
+            text(
+                "INSERT INTO snippet (id, title, code, description, language,"
+                " favorite, created_at) VALUES"
+                " (1, 'Small', 'x^2', NULL, 'py', 0, '2025-01-01'),"
+                " (2, 'Large', :code, 'Big', 'sql', 0, '2025-01-01')"
+            ),
+            {"code": zlib.compress(large_code.encode())},
+        )
+
+    command.upgrade(config, "head")
+    with engine.connect() as connection:
+        assert connection.execute(
+            text("SELECT typeof(code), typeof(description) FROM snippet")
+        ).all() == [("blob", "null"), ("blob", "blob")]
+    repo = DBSnippetRepository(engine)
+    assert [(s.code, s.description) for s in repo.list()] == [
+        ("x^2", None),
+        (large_code, "Big"),
+    ]
+
+    command.downgrade(config, "07bfc58e2377")
+    with engine.connect() as connection:
+        assert connection.execute(
+            text("SELECT typeof(code), code FROM snippet")
+        ).all() == [
+            ("text", "x^2"),
+            ("text", large_code),
+        ]
+    engine.dispose()
+
+
+def test_compressed_text_loses_normalized_copy(database_url, config):
+    large_code = "SELECT * FROM snippet;\n" * 100
+    command.upgrade(config, "b41d7e2a9c53")
+    engine = create_db_engine(database_url)
+    with engine.begin() as connection:
+        connection.execute(
+            text(
+                "INSERT INTO snippet (id, title, code, language, favorite,"
+                " created_at, title_norm, code_norm, description_norm) VALUES"
+                " (1, 'Small', CAST('x^2' AS BLOB), 'py', 0, '2025-01-01',"
+                " 'small', 'x^2', ''),"
+                " (2, 'Large', :code, 'sql', 0, '2025-01-01', 'large', :norm, '')"
+            ),
+            {
+                "code": zlib.compress(large_code.encode()),
+                "norm": " ".join(large_code.casefold().split()),
+            },
+        )
+
+    command.upgrade(config, "head")
+    with engine.connect() as connection:
+        assert connection.execute(text("SELECT code_norm FROM snippet")).all() == [
+            ("x^2",),
+            (None,),
+        ]
+    repo = DBSnippetRepository(engine)
+    assert [s.id for s in repo.search("select * from")] == [2]
+
+    command.downgrade(config, "b41d7e2a9c53")
+    with engine.connect() as connection:
+        norm = connection.execute(text("SELECT code_norm FROM snippet")).all()[1][0]
+    assert norm == " ".join(large_code.casefold().split())
+    engine.dispose()
+
+
+def test_facet_counts_backfilled(database_url, config):
+    command.upgrade(config, "d5a8c3f1e604")
+    engine = create_db_engine(database_url)
+    with engine.begin() as connection:
+        connection.execute(
+            text(
+                "INSERT INTO snippet (id, title, code, language, favorite,"
+                " created_at) VALUES"
+                " (1, 'One', CAST('1' AS BLOB), 'py', 1, '2025-01-01'),"
+                " (2, 'Two', CAST('2' AS BLOB), 'py', 0, '2025-01-01'),"
+                " (3, 'Three', CAST('3' AS BLOB), 'sql', 0, '2025-01-01')"
+            )
+        )
+        connection.execute(text("INSERT INTO tag (id, name) VALUES (1, 'beginner')"))
+        connection.execute(
+            text(
+                "INSERT INTO snippettaglink (snippet_id, tag_id) VALUES (1, 1), (3, 1)"
+            )
+        )
+
+    command.upgrade(config, "head")
+    repo = DBSnippetRepository(engine)
+    facets = repo.facets()
+    assert (facets.total, facets.favorites) == (3, 1)
+    assert facets.languages == {"py": 2, "sql": 1}
+    assert facets.tags == {"beginner": 2}
+
+    repo.delete(1)
+    assert repo.facets().tags == {"beginner": 1}
+    engine.dispose()
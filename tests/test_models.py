@@ -1,4 +1,5 @@
 import pytest
+from sqlalchemy.exc import IntegrityError
 from sqlmodel import Session, SQLModel, create_engine
 
 from src.snipster.models import LangEnum, Snippet, Tag
@@ -8,6 +9,7 @@ engine = create_engine("sqlite:///:memory:", echo=True)
 
 @pytest.fixture(scope="function", autouse=True)
 def set_up_database():
+    SQLModel.metadata.drop_all(engine)
     SQLModel.metadata.create_all(engine)
 
 
@@ -67,3 +69,41 @@ def test_create_snippet_with_cls_method():
         assert snippet.created_at is not None
         assert snippet.updated_at is None
         assert snippet.favorite is False
+
+
+def test_tag_name_unique():
+    with Session(engine) as session:
+        session.add(Tag(name="beginner"))
+        session.commit()
+        session.add(Tag(name="Beginner"))
+        with pytest.raises(IntegrityError):
+            session.commit()
+
+
+def test_snippet_search_fields_normalized():
+    snippet = Snippet(
+        title="First  Snip",
+        code="print('Hello\n    World')",
+        language=LangEnum.PYTHON,
+    )
+
+    assert snippet.title_norm == "first snip"
+    assert snippet.code_norm == "print('hello world')"
+    assert snippet.description_norm == ""
+
+    snippet.description = "Say HELLO"
+    assert snippet.description_norm == "say hello"
+
+
+def test_snippet_content_hash_ignores_layout():
+    snippet = Snippet(title="One", code="x = 1\n", language=LangEnum.PYTHON)
+    copy = Snippet(title="Two", code="\r\n    x = 1   \r\n", language=LangEnum.PYTHON)
+    other = Snippet(title="Three", code="x = 2", language=LangEnum.PYTHON)
+
+    assert snippet.content_hash == copy.content_hash
+    assert snippet.content_hash != other.content_hash
+
+    copy.language = LangEnum.RUST
+    assert snippet.content_hash != copy.content_hash
+    other.code = "x = 1"
+    assert snippet.content_hash == other.content_hash
@@ -0,0 +1,93 @@
+from types import SimpleNamespace
+
+import pytest
+
+from src.snipster.exceptions import InvalidSearchPatternError, SearchTimeoutError
+from src.snipster.models import normalize_text
+from src.snipster.patterns import RegexQuery
+
+
+def make_text(title: str, code: str, description: str | None = None):
+    return SimpleNamespace(
+        title=title,
+        code=code,
+        description=description,
+        title_norm=normalize_text(title),
+        code_norm=normalize_text(code),
+        description_norm=normalize_text(description),
+    )
+
+
+@pytest.mark.parametrize(
+    "pattern, literals",
+    [
+        (r"fn \w+_async", ["fn", "_async"]),
+        (r"^SELECT\s+\*\s+FROM\b", ["select", "*", "from"]),
+        (r"(?:get|set)_user", ["_user"]),
+        (r"colou?r", ["colo", "r"]),
+        (r"(ab)+c", ["ab", "c"]),
+        (r"x*y?", []),
+        (r"[a-z]+", []),
+    ],
+)
+def test_required_literals(pattern, literals):
+    assert RegexQuery(pattern).literals == literals
+
+
+@pytest.mark.parametrize(
+    "pattern",
+    [
+        r"(a+)+b",
+        r"(\w+\s*)*$",
+        r"(?:x|y*)+",
+        r"(a|aa)*b",
+        r"(?:ab|a)+c",
+        r"(?:ab|\w)+c",
+        r"(ab?)+c",
+    ],
+)
+def test_ambiguous_repeats_rejected(pattern):
+    with pytest.raises(InvalidSearchPatternError):
+        RegexQuery(pattern)
+
+
+@pytest.mark.parametrize("pattern", [r"(?:get|set)+_\w+", r"(\w|_)+!", r"(ab)+c"])
+def test_unambiguous_repeats_allowed(pattern):
+    RegexQuery(pattern)
+
+
+def test_rejected_pattern_would_backtrack():
+    # (a|aa)*b took seconds on this text before it was rejected
+    with pytest.raises(InvalidSearchPatternError):
+        RegexQuery(r"(a|aa)*b", time_budget=0.1).search(
+            [make_text("t", "a" * 34 + "!b")]
+        )
+
+
+def test_possessive_repeats_allowed():
+    assert RegexQuery(r"(?:a++)+b").literals == ["a", "b"]
+
+
+def test_invalid_pattern():
+    with pytest.raises(InvalidSearchPatternError):
+        RegexQuery(r"fn (\w+")
+
+
+def test_search():
+    snippets = [
+        make_text("Async fn", "fn load_async() {}"),
+        make_text("Sync fn", "fn load() {}"),
+        make_text("Notes", "", "call fn save_async first"),
+    ]
+    query = RegexQuery(r"fn \w+_async")
+
+    assert query.search(snippets) == [snippets[0], snippets[2]]
+    assert query.search(snippets, limit=1) == [snippets[0]]
+    assert query.could_match(snippets[1]) is False
+
+
+def test_search_time_budget():
+    snippets = [make_text("First", "x = 1"), make_text("Second", "x = 2")]
+
+    with pytest.raises(SearchTimeoutError):
+        RegexQuery(r"x = \d", time_budget=-1).search(snippets)
@@ -0,0 +1,84 @@
+import pytest
+
+from src.snipster.exceptions import InvalidTagQueryError
+from src.snipster.query import (
+    And,
+    Not,
+    Or,
+    TagTerm,
+    combine_tag_filters,
+    evaluate,
+    parse_tag_query,
+    tag_names,
+)
+
+POSTINGS = {
+    "sql": {1, 2, 3},
+    "perf": {2, 3, 4},
+    "rust": {5, 6},
+    "legacy": {3, 6},
+}
+UNIVERSE = {1, 2, 3, 4, 5, 6, 7}
+
+
+def run(text: str) -> set[int]:
+    expr = parse_tag_query(text)
+    return set(evaluate(expr, lambda name: POSTINGS.get(name, set()), UNIVERSE))
+
+
+def test_parse_single_tag():
+    assert parse_tag_query("  Perf ") == TagTerm("perf")
+
+
+def test_parse_precedence():
+    assert parse_tag_query("(sql AND perf) OR rust NOT legacy") == Or(
+        (
+            And((TagTerm("sql"), TagTerm("perf"))),
+            And((TagTerm("rust"), Not(TagTerm("legacy")))),
+        )
+    )
+
+
+def test_parse_keywords_case_insensitive():
+    assert parse_tag_query("sql and not perf") == parse_tag_query("sql AND NOT perf")
+
+
+@pytest.mark.parametrize(
+    "text",
+    ["", "   ", "sql AND", "(sql OR perf", "sql)", "OR sql", "NOT", "sql AND OR perf"],
+)
+def test_parse_invalid(text):
+    with pytest.raises(InvalidTagQueryError):
+        parse_tag_query(text)
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("sql", {1, 2, 3}),
+        ("sql AND perf", {2, 3}),
+        ("sql perf", {2, 3}),
+        ("sql OR rust", {1, 2, 3, 5, 6}),
+        ("sql NOT legacy", {1, 2}),
+        ("NOT sql", {4, 5, 6, 7}),
+        ("(sql AND perf) OR rust NOT legacy", {2, 3, 5}),
+        ("sql AND NOT (perf OR legacy)", {1}),
+        ("unknown OR rust", {5, 6}),
+    ],
+)
+def test_evaluate(text, expected):
+    assert run(text) == expected
+
+
+def test_combine_tag_filters():
+    assert combine_tag_filters() is None
+    assert combine_tag_filters(tag_name="sql") == TagTerm("sql")
+    assert combine_tag_filters("sql", "perf OR rust") == And(
+        (TagTerm("sql"), Or((TagTerm("perf"), TagTerm("rust"))))
+    )
+
+
+def test_tag_names():
+    expr = parse_tag_query("(SQL AND perf) OR sql NOT Legacy")
+    assert tag_names(expr) == ["sql", "perf", "legacy"]
+    assert tag_names(TagTerm("rust")) == ["rust"]
@@ -1,15 +1,32 @@
-import pytest
+import json
 
-from src.snipster.exceptions import SnippetNotFoundError
-from src.snipster.models import LangEnum, Snippet, Tag
+import pytest
+from sqlalchemy import event, inspect, text
+from sqlmodel import Session, select
+
+from src.snipster.autocomplete import CompletionField
+from src.snipster.compressed import get_compressor
+from src.snipster.exceptions import (
+    DuplicateSnippetError,
+    InvalidSearchPatternError,
+    InvalidTagQueryError,
+    SearchTimeoutError,
+    SnippetNotFoundError,
+)
+from src.snipster.models import ChangeOperation, LangEnum, Snippet, Tag
 from src.snipster.repo import (
+    ConsistencyMode,
+    DBSnippetRepository,
+    DuplicatePolicy,
     InMemorySnippetRepository,
     JSONSnippetRepository,
+    SearchMode,
     SnippetRepository,
+    TieredSnippetRepository,
 )
 
 
-@pytest.fixture(scope="function", params=["memory", "db", "json"])
+@pytest.fixture(scope="function", params=["memory", "db", "json", "tiered"])
 def repo(request, create_db_repo, tmp_path) -> SnippetRepository:
     match request.param:
         case "memory":
@@ -18,6 +35,8 @@ def repo(request, create_db_repo, tmp_path) -> SnippetRepository:
             return create_db_repo
         case "json":
             return JSONSnippetRepository(tmp_path)
+        case "tiered":
+            return TieredSnippetRepository(create_db_repo)
         case _:
             raise ValueError(f"Unknown repo: {request.param}")
 
@@ -179,6 +198,89 @@ def test_search_snippet_by_tag(repo, add_snippets):
     assert len(results) == 0
 
 
+def test_search_snippet_limit(repo, add_snippets):
+    assert [s.id for s in repo.search("select", limit=1)] == [2]
+    assert [s.id for s in repo.search("get it", fuzzy=True, limit=1)] == [2]
+
+
+def test_search_snippet_within(repo, add_snippets):
+    assert [s.id for s in repo.search("select", within=[3, 99])] == [3]
+    assert [s.id for s in repo.search("", within={1, 3}, language=LangEnum.SQL)] == [3]
+    assert repo.search("select", within=[]) == []
+    results = repo.search("my_table limit", mode=SearchMode.RANKED, within=[2])
+    assert [s.id for s in results] == [2]
+
+
+def test_ranked_search_snippet(repo, add_snippets):
+    results = repo.search("my_table limit", mode=SearchMode.RANKED)
+    assert [s.id for s in results] == [3, 2]
+
+    results = repo.search("my_table limit", mode=SearchMode.RANKED, limit=1)
+    assert [s.id for s in results] == [3]
+
+    results = repo.search("hello", mode=SearchMode.RANKED, language=LangEnum.SQL)
+    assert results == []
+
+    results = repo.search("beginner", mode=SearchMode.RANKED)
+    assert [s.id for s in results] == [1]
+
+    assert repo.search("Non-existent", mode=SearchMode.RANKED) == []
+
+
+def test_ranked_search_follows_updates(repo, add_snippets):
+    assert repo.search("legacy", mode=SearchMode.RANKED) == []
+
+    repo.tag(2, Tag(name="legacy"))
+    assert [s.id for s in repo.search("legacy", mode=SearchMode.RANKED)] == [2]
+
+    repo.delete(2)
+    assert repo.search("legacy", mode=SearchMode.RANKED) == []
+    assert [s.id for s in repo.search("my_table", mode=SearchMode.RANKED)] == [3]
+
+
+def test_ranked_search_follows_other_writers_db(create_db_repo, example_snippet_1):
+    repo = create_db_repo
+    repo.add(example_snippet_1)
+    assert repo.search("window", mode=SearchMode.RANKED) == []
+
+    other_repo = DBSnippetRepository(repo._engine)
+    other_repo.add(
+        Snippet(title="Window function", code="SELECT 1", language=LangEnum.SQL)
+    )
+    assert [s.id for s in repo.search("window", mode=SearchMode.RANKED)] == [2]
+
+
+def test_regex_search_snippet(repo, add_snippets):
+    results = repo.search(r"FROM MY_TABLE( LIMIT \d+)?;", mode=SearchMode.REGEX)
+    assert [s.id for s in results] == [2, 3]
+
+    results = repo.search(r"LIMIT \d+", mode=SearchMode.REGEX)
+    assert [s.id for s in results] == [3]
+
+    results = repo.search(r"records", mode=SearchMode.REGEX, limit=1)
+    assert [s.id for s in results] == [2]
+
+    # matching is case-sensitive unless the pattern says otherwise
+    assert repo.search(r"from my_table", mode=SearchMode.REGEX) == []
+    results = repo.search(r"(?i)from my_table", mode=SearchMode.REGEX)
+    assert [s.id for s in results] == [2, 3]
+
+    results = repo.search(r"print\(", mode=SearchMode.REGEX, language=LangEnum.SQL)
+    assert results == []
+
+
+def test_regex_search_invalid_pattern(repo, add_snippets):
+    with pytest.raises(InvalidSearchPatternError):
+        repo.search(r"(\w+\s?)+$", mode=SearchMode.REGEX)
+
+
+def test_regex_search_time_budget(repo, add_snippets, monkeypatch):
+    monkeypatch.setattr(SnippetRepository, "REGEX_TIME_BUDGET", -1)
+
+    with pytest.raises(SearchTimeoutError):
+        repo.search(r"SELECT", mode=SearchMode.REGEX)
+
+
 def test_fuzzy_search_snippet(repo, add_snippets):
     results = repo.search("Get iT", fuzzy=True)
     assert len(results) == 2
@@ -250,3 +352,675 @@ def test_no_duplicate_tag_added_db(
     repo_db.tag(example_snippet_2.id, Tag(name="beginner"))
     snippet = repo_db.get(example_snippet_2.id)
     assert snippet.tags[0].id == example_snippet_1.tags[0].id
+
+
+def test_add_snippet_reuses_existing_tag_db(
+    create_db_repo, example_snippet_1, example_snippet_2
+):
+    repo_db = create_db_repo
+    repo_db.add(example_snippet_1)
+    example_snippet_2.tags = [Tag(name="beginner"), Tag(name="Beginner")]
+    repo_db.add(example_snippet_2)
+
+    snippet = repo_db.get(example_snippet_2.id)
+    assert len(snippet.tags) == 1
+    assert snippet.tags[0].id == example_snippet_1.tags[0].id
+    assert len(repo_db.search("", tag_name="beginner")) == 2
+
+
+def test_search_snippet_ignores_case_and_whitespace(repo, add_snippets):
+    results = repo.search("  from   my_table LIMIT ")
+    assert len(results) == 1
+    assert results[0].title == "Get some of it"
+
+
+def test_search_snippet_term_wildcards_are_literal(repo, add_snippets):
+    assert len(repo.search("%")) == 0
+    assert len(repo.search("my_t")) == 2
+
+
+def test_json_repo_reads_snippets_without_search_fields(tmp_path, example_snippet_2):
+    repo = JSONSnippetRepository(tmp_path)
+    repo.add(example_snippet_2)
+    data = repo._read()
+    for snippet_dict in data.values():
+        for norm_field in ("title_norm", "code_norm", "description_norm"):
+            del snippet_dict[norm_field]
+    repo._write(data)
+
+    assert len(repo.search("select * from")) == 1
+
+
+def test_memory_repo_ids_not_reused(example_snippet_2, example_snippet_3):
+    repo = InMemorySnippetRepository()
+    repo.add(example_snippet_2)
+    repo.delete(example_snippet_2.id)
+    repo.add(example_snippet_3)
+    assert example_snippet_3.id == 2
+
+
+def test_memory_repo_returns_copies(example_snippet_1):
+    repo = InMemorySnippetRepository()
+    repo.add(example_snippet_1)
+    snippet = repo.get(example_snippet_1.id)
+    snippet.title = "Changed"
+    snippet.tags.clear()
+
+    stored = repo.get(example_snippet_1.id)
+    assert stored.title == "First snip"
+    assert len(stored.tags) == 2
+
+
+def test_memory_repo_shares_tag_names(example_snippet_1):
+    repo = InMemorySnippetRepository()
+    repo.add(example_snippet_1)
+    repo.add(Snippet(title="x", code="x", language=LangEnum.PYTHON, tags=[]))
+    repo.tag(2, Tag(name="beginner"))
+
+    first, second = repo._records[1], repo._records[2]
+    assert first.tag_names[0] is second.tag_names[0]
+    assert repo.get(2).tags[0].id == example_snippet_1.tags[0].id
+
+
+def test_search_by_tag_follows_updates(repo, add_snippets):
+    repo.tag(2, Tag(name="beginner"))
+    assert [s.id for s in repo.search("", tag_name="beginner")] == [1, 2]
+
+    repo.tag(1, Tag(name="beginner"), remove=True)
+    assert [s.id for s in repo.search("", tag_name="beginner")] == [2]
+
+    repo.delete(2)
+    assert repo.search("", tag_name="beginner") == []
+    assert [s.id for s in repo.search("", language=LangEnum.SQL)] == [3]
+
+
+def test_json_repo_index_rebuilt_after_external_change(
+    tmp_path, example_snippet_1, example_snippet_2
+):
+    repo = JSONSnippetRepository(tmp_path)
+    repo.add(example_snippet_1)
+    assert len(repo.search("", tag_name="beginner")) == 1
+
+    other_repo = JSONSnippetRepository(tmp_path)
+    other_repo.tag(example_snippet_1.id, Tag(name="beginner"), remove=True)
+    other_repo.add(example_snippet_2)
+
+    assert repo.search("", tag_name="beginner") == []
+    assert len(repo.search("", language=LangEnum.SQL)) == 1
+
+
+def test_search_snippet_by_tag_expression(repo, add_snippets):
+    repo.tag(2, Tag(name="perf"))
+    repo.tag(3, Tag(name="perf"), Tag(name="legacy"))
+
+    results = repo.search("", tags="beginner OR perf NOT legacy")
+    assert [s.id for s in results] == [1, 2]
+
+    results = repo.search("", tags="NOT perf")
+    assert [s.id for s in results] == [1]
+
+    results = repo.search("select", tag_name="perf", tags="legacy")
+    assert [s.id for s in results] == [3]
+
+    results = repo.search("", tags="(training AND perf) OR missing")
+    assert results == []
+
+
+def test_search_snippet_invalid_tag_expression(repo, add_snippets):
+    with pytest.raises(InvalidTagQueryError):
+        repo.search("", tags="perf AND")
+
+
+def test_facets(repo, add_snippets):
+    facets = repo.facets()
+    assert facets.total == 3
+    assert facets.favorites == 0
+    assert facets.languages == {LangEnum.SQL: 2, LangEnum.PYTHON: 1}
+    assert facets.tags == {"beginner": 1, "training": 1}
+
+
+def test_facets_follow_updates(repo, add_snippets):
+    repo.toggle_favorite(2)
+    repo.tag(2, Tag(name="beginner"))
+    repo.tag(1, Tag(name="training"), remove=True)
+    repo.delete(3)
+
+    facets = repo.facets()
+    assert facets.total == 2
+    assert facets.favorites == 1
+    assert facets.languages == {LangEnum.PYTHON: 1, LangEnum.SQL: 1}
+    assert facets.tags == {"beginner": 2}
+
+
+def test_facets_read_from_running_counts_db(
+    create_db_repo, example_snippet_1, example_snippet_2, example_snippet_3
+):
+    repo = create_db_repo
+    for snippet in (example_snippet_1, example_snippet_2, example_snippet_3):
+        repo.add(snippet)
+    # writes from any session are counted, not only the repository's
+    with Session(repo._engine) as session:
+        session.add(
+            Snippet(
+                title="Copy",
+                code="print('hello world')",
+                language=LangEnum.PYTHON,
+                favorite=True,
+                tags=[session.exec(select(Tag).where(Tag.name == "beginner")).one()],
+            )
+        )
+        session.commit()
+    repo.dedupe()
+
+    statements = []
+    event.listen(
+        repo._engine,
+        "before_cursor_execute",
+        lambda conn, cursor, statement, *args: statements.append(statement),
+    )
+    facets = repo.facets()
+
+    assert facets.total == 3
+    assert facets.favorites == 1
+    assert facets.languages == {LangEnum.SQL: 2, LangEnum.PYTHON: 1}
+    assert facets.tags == {"beginner": 1, "training": 1}
+    assert len(statements) == 1
+    assert "FROM snippetfacetcount" in statements[0]
+
+
+def test_facets_count_writes_to_expired_snippets_db(create_db_repo):
+    repo = create_db_repo
+    with Session(repo._engine) as session:
+        snippet = Snippet(title="t", code="x", language=LangEnum.SQL)
+        session.add(snippet)
+        session.commit()  # expires every attribute
+        snippet.language = LangEnum.PYTHON
+        snippet.favorite = True
+        session.commit()
+        snippet.tags = [Tag(name="beginner")]
+        session.commit()
+        facets = repo.facets()
+        assert (facets.total, facets.favorites) == (1, 1)
+        assert facets.languages == {LangEnum.PYTHON: 1}
+        assert facets.tags == {"beginner": 1}
+        session.delete(snippet)
+        session.commit()
+
+    facets = repo.facets()
+    assert (facets.total, facets.favorites) == (0, 0)
+    assert facets.languages == facets.tags == {}
+
+
+def test_facets_scoped_to_term(repo, add_snippets):
+    repo.toggle_favorite(1)
+
+    facets = repo.facets("select")
+    assert facets.total == 2
+    assert facets.favorites == 0
+    assert facets.languages == {LangEnum.SQL: 2}
+    assert facets.tags == {}
+
+    assert repo.facets("no such snippet").total == 0
+
+
+def test_autocomplete(repo, add_snippets):
+    repo.tag(2, Tag(name="training"))
+
+    assert repo.autocomplete(CompletionField.TAG, "tr") == [("training", 2)]
+    assert repo.autocomplete(CompletionField.TAG, "") == [
+        ("training", 2),
+        ("beginner", 1),
+    ]
+    assert repo.autocomplete(CompletionField.TITLE, "G") == [("get", 2)]
+    assert repo.autocomplete(CompletionField.TITLE, "s", limit=2) == [
+        ("snip", 1),
+        ("some", 1),
+    ]
+
+
+def test_autocomplete_follows_updates(repo, add_snippets):
+    assert repo.autocomplete(CompletionField.TITLE, "get") == [("get", 2)]
+
+    repo.delete(2)
+    repo.tag(1, Tag(name="beginner"), remove=True)
+    assert repo.autocomplete(CompletionField.TITLE, "get") == [("get", 1)]
+    assert repo.autocomplete(CompletionField.TAG, "b") == []
+
+
+def test_suggest_tags(repo, add_snippets):
+    repo.tag(2, Tag(name="training"))
+    repo.tag(3, Tag(name="trainer"))
+
+    assert repo.suggest_tags("begginer") == [("beginner", 1)]
+    assert repo.suggest_tags("trainin") == [("training", 2), ("trainer", 1)]
+    assert repo.suggest_tags("trainin", limit=1) == [("training", 2)]
+    assert repo.suggest_tags("trainin", max_distance=0) == []
+    assert repo.suggest_tags("training") == []
+
+    repo.tag(1, Tag(name="beginner"), remove=True)
+    assert repo.suggest_tags("begginer") == []
+
+
+def test_autocomplete_follows_other_writers_db(create_db_repo, example_snippet_1):
+    repo = create_db_repo
+    repo.add(example_snippet_1)
+    assert repo.autocomplete(CompletionField.TITLE, "sec") == []
+
+    other_repo = DBSnippetRepository(repo._engine)
+    other_repo.add(Snippet(title="Second snip", code="x", language=LangEnum.PYTHON))
+    assert repo.autocomplete(CompletionField.TITLE, "sn") == [("snip", 2)]
+    assert repo.autocomplete(CompletionField.TITLE, "sec") == [("second", 1)]
+
+
+def test_list_snippets_with_fields(repo, add_snippets):
+    snippets = repo.list(fields=["id", "title"])
+    assert [s.title for s in snippets] == [s.title for s in add_snippets]
+
+    results = repo.search("select", fields=["id", "title"])
+    assert [s.id for s in results] == [2, 3]
+
+
+def test_list_snippets_with_fields_defers_code_db(create_db_repo, example_snippet_1):
+    repo = create_db_repo
+    repo.add(example_snippet_1)
+
+    snippet = repo.list(fields=["id", "title"])[0]
+    unloaded = inspect(snippet).unloaded
+    assert "code" in unloaded
+    assert "description" in unloaded
+    assert snippet.title == "First snip"
+
+
+def test_get_many(repo, add_snippets):
+    snippets = repo.get_many([3, 99, 1, 3])
+    assert [s.id for s in snippets] == [3, 1]
+    assert [t.name for t in snippets[1].tags] == ["beginner", "training"]
+
+    assert repo.get_many([]) == []
+
+
+def test_get_many_in_chunks_db(
+    create_db_repo, example_snippet_1, example_snippet_2, example_snippet_3
+):
+    repo_db = create_db_repo
+    repo_db.MAX_IDS_PER_QUERY = 2
+    for snippet in (example_snippet_1, example_snippet_2, example_snippet_3):
+        repo_db.add(snippet)
+
+    snippets = repo_db.get_many([2, 1, 3])
+    assert [s.id for s in snippets] == [2, 1, 3]
+
+
+@pytest.mark.parametrize(
+    "consistency, max_staleness, sees_external_write",
+    [
+        (ConsistencyMode.EXCLUSIVE, 1.0, False),
+        (ConsistencyMode.STRICT, 1.0, True),
+        (ConsistencyMode.BOUNDED, 0.0, True),
+        (ConsistencyMode.BOUNDED, 60.0, False),
+    ],
+)
+def test_tiered_repo_consistency(
+    create_db_repo,
+    example_snippet_1,
+    example_snippet_2,
+    consistency,
+    max_staleness,
+    sees_external_write,
+):
+    repo = TieredSnippetRepository(create_db_repo, consistency, max_staleness)
+    repo.add(example_snippet_1)
+    repo.warm_up()
+
+    create_db_repo.add(example_snippet_2)  # another process writing
+    assert (repo.get(example_snippet_2.id) is not None) == sees_external_write
+
+
+def test_tiered_repo_serves_reads_from_memory(
+    create_db_repo, example_snippet_1, monkeypatch
+):
+    repo = TieredSnippetRepository(create_db_repo, ConsistencyMode.EXCLUSIVE)
+    repo.add(example_snippet_1)
+    repo.toggle_favorite(example_snippet_1.id)
+
+    def fail(*args, **kwargs):
+        raise AssertionError("read went to the database")
+
+    monkeypatch.setattr(create_db_repo, "get", fail)
+    monkeypatch.setattr(create_db_repo, "list", fail)
+    monkeypatch.setattr(create_db_repo, "search", fail)
+
+    assert repo.get(example_snippet_1.id).favorite
+    assert len(repo.list()) == 1
+    assert len(repo.search("hello", tag_name="beginner")) == 1
+
+
+def test_tiered_repo_own_writes_keep_tier(
+    create_db_repo, example_snippet_1, example_snippet_2, monkeypatch
+):
+    repo = TieredSnippetRepository(create_db_repo, ConsistencyMode.STRICT)
+    repo.add(example_snippet_1)
+    warm_ups = []
+    monkeypatch.setattr(repo, "warm_up", lambda: warm_ups.append(1))
+
+    repo.add(example_snippet_2)
+    repo.tag(example_snippet_2.id, Tag(name="beginner"))
+    repo.delete(example_snippet_1.id)
+
+    assert warm_ups == []
+    assert [s.id for s in repo.search("", tag_name="beginner")] == [2]
+
+
+def test_tiered_repo_tier_keeps_no_change_log(
+    create_db_repo, example_snippet_1, example_snippet_2
+):
+    repo = TieredSnippetRepository(create_db_repo, ConsistencyMode.STRICT)
+    create_db_repo.add(example_snippet_1)
+    repo.warm_up()
+    repo.add(example_snippet_2)
+    repo.toggle_favorite(example_snippet_1.id)
+    create_db_repo.delete(example_snippet_2.id)  # another process writing
+
+    assert [s.id for s in repo.list()] == [example_snippet_1.id]
+    assert repo._tier._changes == []
+    assert len(repo.changes()) == 4
+
+
+def test_tiered_repo_failed_write_leaves_tier(create_db_repo, example_snippet_1):
+    repo = TieredSnippetRepository(create_db_repo)
+    repo.add(example_snippet_1)
+
+    with pytest.raises(SnippetNotFoundError):
+        repo.toggle_favorite(99)
+    assert len(repo.list()) == 1
+
+
+def test_tiered_repo_passes_fields_to_tier(
+    create_db_repo, example_snippet_1, monkeypatch
+):
+    repo = TieredSnippetRepository(create_db_repo)
+    repo.add(example_snippet_1)
+    seen = []
+    for method in ("list", "get_many", "search"):
+        original = getattr(InMemorySnippetRepository, method)
+
+        def spy(self, *args, fields=None, _original=original, **kwargs):
+            seen.append(fields)
+            return _original(self, *args, fields=fields, **kwargs)
+
+        monkeypatch.setattr(InMemorySnippetRepository, method, spy)
+
+    repo.list(fields=["id", "title"])
+    repo.get_many([1], fields=["id"])
+    repo.search("first", fields=["title"])
+
+    assert seen == [["id", "title"], ["id"], ["title"]]
+
+
+def test_batches(repo, add_snippets):
+    batches = list(repo.batches(batch_size=2))
+
+    assert [[s.id for s in batch] for batch in batches] == [[1, 2], [3]]
+    assert "beginner" in [t.name for t in batches[0][0].tags]
+    assert list(repo.batches(batch_size=3))[-1][-1].id == 3
+
+
+def test_changes_logged(repo, add_snippets):
+    repo.tag(2, Tag(name="perf"))
+    repo.toggle_favorite(1)
+    repo.delete(3)
+
+    changes = repo.changes()
+    assert [(c.cursor, c.snippet_id, c.operation) for c in changes] == [
+        (1, 1, ChangeOperation.UPSERT),
+        (2, 2, ChangeOperation.UPSERT),
+        (3, 3, ChangeOperation.UPSERT),
+        (4, 2, ChangeOperation.UPSERT),
+        (5, 1, ChangeOperation.UPSERT),
+        (6, 3, ChangeOperation.DELETE),
+    ]
+    assert [c.cursor for c in repo.changes(since=3, limit=2)] == [4, 5]
+    assert repo.changes(since=6) == []
+
+
+def test_changes_logged_for_any_session_db(create_db_repo, example_snippet_2):
+    engine = create_db_repo._engine
+    with Session(engine) as session:
+        session.add(example_snippet_2)
+        session.commit()
+        snippet_id = example_snippet_2.id
+    with Session(engine) as session:
+        session.add(Snippet(title="Never saved", code="", language=LangEnum.SQL))
+        session.flush()
+        session.rollback()
+
+    changes = create_db_repo.changes()
+    assert [(c.snippet_id, c.operation) for c in changes] == [
+        (snippet_id, ChangeOperation.UPSERT)
+    ]
+    assert create_db_repo.latest_cursor() == changes[-1].cursor
+
+
+def test_tiered_repo_applies_external_changes(
+    create_db_repo, example_snippet_1, example_snippet_2, monkeypatch
+):
+    repo = TieredSnippetRepository(create_db_repo, ConsistencyMode.STRICT)
+    repo.add(example_snippet_1)
+    repo.add(example_snippet_2)
+    monkeypatch.setattr(repo, "warm_up", lambda: pytest.fail("tier reloaded"))
+
+    create_db_repo.delete(example_snippet_1.id)
+    create_db_repo.tag(example_snippet_2.id, Tag(name="perf"))
+
+    assert [s.id for s in repo.list()] == [example_snippet_2.id]
+    assert [t.name for t in repo.get(example_snippet_2.id).tags] == ["perf"]
+
+
+def make_copy(snippet: Snippet, **kwargs) -> Snippet:
+    return Snippet(
+        title=f"Copy of {snippet.title}",
+        code=f"\n{snippet.code}  \n",
+        language=snippet.language,
+        **kwargs,
+    )
+
+
+def test_add_duplicate_allowed(repo, add_snippets):
+    repo.add(make_copy(add_snippets[1]))
+
+    assert len(repo.list()) == 4
+    assert repo.find_duplicate(repo.get(4)).id == 2
+    assert repo.find_duplicate(repo.get(2)).id == 4
+    assert repo.find_duplicate(repo.get(3)) is None
+
+
+def test_add_duplicate_rejected(repo, add_snippets):
+    with pytest.raises(DuplicateSnippetError) as exc_info:
+        repo.add(make_copy(add_snippets[1]), DuplicatePolicy.REJECT)
+
+    assert exc_info.value.existing_id == 2
+    assert len(repo.list()) == 3
+
+
+def test_add_duplicate_merged(repo, add_snippets):
+    copy = make_copy(add_snippets[1], favorite=True, tags=[Tag(name="etl")])
+    repo.add(copy, DuplicatePolicy.MERGE)
+
+    assert copy.id is None
+    assert copy.duplicate_of == 2
+    assert len(repo.list()) == 3
+    snippet = repo.get(2)
+    assert snippet.favorite
+    assert [tag.name for tag in snippet.tags] == ["etl"]
+
+
+def test_add_duplicate_linked(repo, add_snippets):
+    repo.add(make_copy(add_snippets[1]), DuplicatePolicy.LINK)
+    repo.add(make_copy(add_snippets[2]), DuplicatePolicy.LINK)
+
+    assert [snippet.duplicate_of for snippet in repo.list()] == [None, None, None, 2, 3]
+
+
+def test_dedupe(repo, add_snippets):
+    repo.add(make_copy(add_snippets[0], tags=[Tag(name="python")]))
+    repo.add(make_copy(add_snippets[1], favorite=True))
+    repo.add(make_copy(add_snippets[0]))
+
+    assert repo.duplicate_groups() == [[1, 4, 6], [2, 5]]
+    assert repo.dedupe(dry_run=True) == {4: 1, 6: 1, 5: 2}
+    assert len(repo.list()) == 6
+
+    assert repo.dedupe() == {4: 1, 6: 1, 5: 2}
+    assert [snippet.id for snippet in repo.list()] == [1, 2, 3]
+    assert [tag.name for tag in repo.get(1).tags] == ["beginner", "training", "python"]
+    assert repo.get(2).favorite
+    assert repo.duplicate_groups() == []
+    assert repo.dedupe() == {}
+
+
+@pytest.fixture()
+def add_similar_snippets(repo, add_snippets) -> list[Snippet]:
+    code = (
+        "def fib(n):\n"
+        "    a, b = 0, 1\n"
+        "    for _ in range(n):\n"
+        "        a, b = b, a + b\n"
+        "    return a"
+    )
+    snippets = [
+        Snippet(title="Fibonacci", code=code, language=LangEnum.PYTHON),
+        Snippet(
+            title="Fibonacci again",
+            code=code.replace("fib", "fibonacci"),
+            language=LangEnum.PYTHON,
+        ),
+    ]
+    for snippet in snippets:
+        repo.add(snippet)
+    return snippets
+
+
+def test_related(repo, add_similar_snippets):
+    related = repo.related(4)
+
+    assert [(snippet.id, snippet.title) for snippet, _ in related] == [
+        (5, "Fibonacci again")
+    ]
+    assert related[0][1] > 0.8
+    assert repo.related(4, threshold=1.0) == []
+    assert repo.related(1) == []
+
+
+def test_related_follows_deletes(repo, add_similar_snippets):
+    repo.delete(5)
+    assert repo.related(4) == []
+
+
+def test_related_snippet_not_found(repo):
+    with pytest.raises(SnippetNotFoundError):
+        repo.related(1)
+
+
+def test_near_duplicates(repo, add_similar_snippets):
+    pairs = repo.near_duplicates(threshold=0.8)
+
+    assert [(first, second) for first, second, _ in pairs] == [(4, 5)]
+    assert pairs[0][2] > 0.8
+    assert repo.near_duplicates(threshold=1.0) == []
+
+
+def test_near_duplicates_pair_copies_once(repo, add_similar_snippets):
+    for _ in range(3):
+        repo.add(
+            Snippet(
+                title="Fibonacci copy",
+                code=add_similar_snippets[0].code,
+                language=LangEnum.PYTHON,
+            )
+        )
+
+    pairs = repo.near_duplicates(threshold=0.8)
+
+    assert [(first, second) for first, second, _ in pairs] == [(4, 5)]
+
+
+@pytest.fixture()
+def compression(monkeypatch):
+    monkeypatch.setenv("SNIPSTER_COMPRESSION", "zlib")
+    monkeypatch.setenv("SNIPSTER_COMPRESS_MIN_SIZE", "256")
+    get_compressor.cache_clear()
+    yield
+    get_compressor.cache_clear()
+
+
+@pytest.fixture()
+def large_snippet() -> Snippet:
+    return Snippet(
+        title="Big query",
+        code="SELECT id, title FROM snippet WHERE language = 'sql';\n" * 50,
+        description="Pick snippets by language. " * 20,
+        language=LangEnum.SQL,
+    )
+
+
+def test_compressed_snippet_round_trip(repo, compression, add_snippets, large_snippet):
+    code, description = large_snippet.code, large_snippet.description
+    repo.add(large_snippet)
+
+    snippet = repo.get(large_snippet.id)
+    assert snippet.code == code
+    assert snippet.description == description
+    assert [s.id for s in repo.search("language = 'sql'")] == [large_snippet.id]
+    assert repo.find_duplicate(Snippet(code=code, title="t", language="sql"))
+
+
+def test_large_text_searched_without_normalized_copy(
+    repo, compression, add_snippets, large_snippet
+):
+    repo.add(large_snippet)
+
+    assert repo.get(large_snippet.id).code_norm is None
+    assert [s.id for s in repo.search("WHERE   LANGUAGE")] == [large_snippet.id]
+    assert [s.id for s in repo.search("by language.")] == [large_snippet.id]
+    regex_results = repo.search(r"language = '\w+'", mode=SearchMode.REGEX)
+    assert [s.id for s in regex_results] == [large_snippet.id]
+    assert repo.facets("where language").total == 1
+
+
+def test_compressed_snippet_stored_as_blob_db(
+    create_db_repo, compression, example_snippet_1, large_snippet
+):
+    repo = create_db_repo
+    repo.add(example_snippet_1)
+    repo.add(large_snippet)
+
+    with Session(repo._engine) as session:
+        rows = session.exec(
+            text("SELECT typeof(code), code, length(description) FROM snippet")
+        ).all()
+    assert rows[0] == ("blob", b"print('hello world')", len(b"Good day, Snipster!"))
+    assert rows[1][0] == "blob"
+    assert len(rows[1][1]) < len(large_snippet.code)
+    assert rows[1][2] < len(large_snippet.description)
+
+    with Session(repo._engine) as session:
+        norms = session.exec(text("SELECT code_norm, description_norm FROM snippet"))
+        assert norms.all() == [
+            ("print('hello world')", "good day, snipster!"),
+            (None, None),
+        ]
+
+
+def test_compressed_snippet_stored_packed_json(
+    tmp_path, compression, example_snippet_1, large_snippet
+):
+    repo = JSONSnippetRepository(tmp_path)
+    repo.add(example_snippet_1)
+    repo.add(large_snippet)
+
+    data = json.loads((tmp_path / "snippets.json").read_text())
+    assert data["1"]["code"] == "print('hello world')"
+    assert data["2"]["code"]["codec"] == "zlib"
+    assert data["2"]["description"]["codec"] == "zlib"
+    assert data["2"]["code_norm"] is None
+    assert data["2"]["description_norm"] is None
@@ -0,0 +1,30 @@
+import json
+from datetime import datetime, timezone
+
+import pytest
+
+from src.snipster.models import LangEnum, Snippet, SnippetRead, Tag
+from src.snipster.responses import dumps
+
+
+@pytest.mark.parametrize(
+    "created_at",
+    [
+        datetime(2025, 6, 1, 12, 30, 15, 250000, tzinfo=timezone.utc),
+        datetime(2025, 6, 1, 12, 30, 15),
+    ],
+)
+def test_dumps_matches_snippet_read(created_at):
+    snippet = Snippet(
+        id=7,
+        title="First snip",
+        code="print('hello world')",
+        description=None,
+        language=LangEnum.PYTHON,
+        created_at=created_at,
+        tags=[Tag(id=1, name="beginner")],
+    )
+    expected = SnippetRead.model_validate(snippet).model_dump_json()
+
+    assert dumps(snippet).decode() == expected
+    assert json.loads(dumps([snippet])) == [json.loads(expected)]
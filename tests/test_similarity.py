@@ -0,0 +1,64 @@
+from src.snipster.similarity import (
+    MAX_BUCKET_SIZE,
+    LSHIndex,
+    candidate_pairs,
+    decode_signature,
+    encode_signature,
+    minhash,
+    similarity,
+)
+
+FIBONACCI = """def fib(n):
+    a, b = 0, 1
+    for _ in range(n):
+        a, b = b, a + b
+    return a"""
+
+
+def test_similarity_estimates():
+    signature = minhash(FIBONACCI)
+
+    assert similarity(signature, minhash(FIBONACCI.upper())) == 1.0
+    assert similarity(signature, minhash(FIBONACCI.replace("fib", "fibo"))) > 0.8
+    assert similarity(signature, minhash("SELECT * FROM MY_TABLE;")) < 0.2
+
+
+def test_signature_round_trip():
+    signature = minhash(FIBONACCI)
+    assert decode_signature(encode_signature(signature)) == signature
+    assert len(encode_signature(minhash(""))) == len(encode_signature(signature))
+
+
+def test_lsh_index_candidates():
+    signatures = {
+        1: minhash(FIBONACCI),
+        2: minhash(FIBONACCI.replace("fib", "fibo")),
+        3: minhash("SELECT * FROM MY_TABLE;"),
+    }
+    index = LSHIndex()
+    for snippet_id, signature in signatures.items():
+        index.add(snippet_id, signature)
+
+    assert index.candidates(signatures[1]) == {1, 2}
+    assert index.candidate_pairs(str) == {(1, 2)}
+
+    index.remove(2, signatures[2])
+    assert index.candidates(signatures[1]) == {1}
+    assert index.candidate_pairs(str) == set()
+
+
+def test_candidate_pairs_collapse_copies():
+    content_hashes = {1: "a", 2: "a", 3: "b", 4: "a", 5: "c"}
+    groups = [[1, 2, 3, 4], [2, 4, 5]]
+
+    assert candidate_pairs(groups, content_hashes.__getitem__) == {
+        (1, 3),
+        (1, 5),
+    }
+
+
+def test_candidate_pairs_skip_oversized_buckets():
+    crowded = list(range(MAX_BUCKET_SIZE + 1))
+    groups = [crowded, [0, 1000]]
+
+    assert candidate_pairs(groups, str) == {(0, 1000)}
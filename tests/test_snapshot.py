@@ -0,0 +1,235 @@
+import pickle
+import struct
+from zlib import crc32
+
+import pytest
+from sqlmodel import SQLModel, create_engine
+
+from src.snipster.autocomplete import CompletionField
+from src.snipster.exceptions import InvalidSnapshotError
+from src.snipster.models import LangEnum, Snippet, Tag
+from src.snipster.repo import (
+    ConsistencyMode,
+    DBSnippetRepository,
+    InMemorySnippetRepository,
+    TieredSnippetRepository,
+)
+from src.snipster.snapshot import (
+    FORMAT_VERSION,
+    MAGIC,
+    read_snapshot,
+    write_snapshot,
+)
+
+
+@pytest.fixture()
+def memory_repo() -> InMemorySnippetRepository:
+    repo = InMemorySnippetRepository()
+    repo.add(
+        Snippet(
+            title="Hello world",
+            code="print('Hello, world!')",
+            language=LangEnum.PYTHON,
+            tags=[Tag(name="beginner")],
+        )
+    )
+    repo.add(Snippet(title="Select all", code="SELECT *", language=LangEnum.SQL))
+    return repo
+
+
+@pytest.fixture()
+def example_snippet() -> Snippet:
+    return Snippet(
+        title="Hello world",
+        code="print('Hello, world!')",
+        language=LangEnum.PYTHON,
+    )
+
+
+def test_round_trip(tmp_path, memory_repo):
+    path = tmp_path / "tier.snap"
+    memory_repo.save_snapshot(path, source="test", version=7)
+
+    loaded, version = InMemorySnippetRepository.load_snapshot(path, source="test")
+
+    assert version == 7
+    assert [s.id for s in loaded.list()] == [1, 2]
+    assert [s.id for s in loaded.search("hello", tag_name="beginner")] == [1]
+    assert loaded.autocomplete(CompletionField.TAG, "beg") == [("beginner", 1)]
+    assert loaded.facets().languages == memory_repo.facets().languages
+
+
+def test_loaded_repo_takes_writes(tmp_path, memory_repo):
+    path = tmp_path / "tier.snap"
+    memory_repo.save_snapshot(path)
+    loaded, version = InMemorySnippetRepository.load_snapshot(path)
+
+    loaded.add(Snippet(title="Hello again", code="pass", language=LangEnum.PYTHON))
+    loaded.delete(1)
+
+    assert version == 2
+    assert [s.id for s in loaded.search("hello")] == [3]
+
+
+def test_wrong_source(tmp_path, memory_repo):
+    path = tmp_path / "tier.snap"
+    memory_repo.save_snapshot(path, source="sqlite:///a.sqlite")
+
+    with pytest.raises(InvalidSnapshotError, match="taken from"):
+        InMemorySnippetRepository.load_snapshot(path, source="sqlite:///b.sqlite")
+
+
+def test_wrong_identity(tmp_path, memory_repo):
+    path = tmp_path / "tier.snap"
+    memory_repo.save_snapshot(path, source="db", identity="1@2026-01-01")
+
+    loaded, _ = InMemorySnippetRepository.load_snapshot(path, "db", "1@2026-01-01")
+    assert len(loaded.list()) == 2
+    with pytest.raises(InvalidSnapshotError, match="another store"):
+        InMemorySnippetRepository.load_snapshot(path, "db", "1@2026-02-01")
+
+
+@pytest.mark.parametrize("content", [b"", b"SNIP", b"NOTASNAPSHOT" * 4])
+def test_not_a_snapshot(tmp_path, content):
+    path = tmp_path / "tier.snap"
+    path.write_bytes(content)
+
+    with pytest.raises(InvalidSnapshotError):
+        read_snapshot(path, "memory")
+
+
+def test_missing_file(tmp_path):
+    with pytest.raises(InvalidSnapshotError):
+        read_snapshot(tmp_path / "missing.snap", "memory")
+
+
+def test_damaged_payload(tmp_path, memory_repo):
+    path = tmp_path / "tier.snap"
+    memory_repo.save_snapshot(path)
+    data = bytearray(path.read_bytes())
+    data[-10] ^= 0xFF
+    path.write_bytes(bytes(data))
+
+    with pytest.raises(InvalidSnapshotError, match="damaged"):
+        read_snapshot(path, "memory")
+
+
+def test_other_format_version(tmp_path):
+    path = tmp_path / "tier.snap"
+    write_snapshot(path, {}, "memory", 0)
+    data = bytearray(path.read_bytes())
+    struct.pack_into("<H", data, len(MAGIC), 99)
+    path.write_bytes(bytes(data))
+
+    with pytest.raises(InvalidSnapshotError, match="format 99"):
+        read_snapshot(path, "memory")
+
+
+def test_disallowed_global(tmp_path):
+    path = tmp_path / "tier.snap"
+    write_snapshot(path, pickle.loads, "memory", 0)
+
+    with pytest.raises(InvalidSnapshotError, match="not allowed"):
+        read_snapshot(path, "memory")
+
+
+@pytest.mark.parametrize(
+    "module, name",
+    [
+        ("src.snipster.snapshot", "os.system"),
+        ("src.snipster.repo", "InMemorySnippetRepository.load_snapshot"),
+        ("src.snipster.snapshot", "write_snapshot"),
+    ],
+)
+def test_disallowed_package_global(tmp_path, module, name):
+    path = tmp_path / "tier.snap"
+    # GLOBAL, then call it with an empty tuple and return the result
+    payload = f"c{module}\n{name}\n)R.".encode()
+    header = struct.pack(
+        "<8sHQIHH", MAGIC, FORMAT_VERSION, 0, crc32(payload), len("memory"), 0
+    )
+    path.write_bytes(header + b"memory" + payload)
+
+    with pytest.raises(InvalidSnapshotError, match="not allowed"):
+        read_snapshot(path, "memory")
+
+
+def test_snapshot_of_other_state(tmp_path):
+    path = tmp_path / "tier.snap"
+    write_snapshot(path, {"snippets": []}, "memory", 0)
+
+    with pytest.raises(InvalidSnapshotError, match="InMemorySnippetRepository"):
+        InMemorySnippetRepository.load_snapshot(path)
+
+
+def test_tiered_repo_saves_snapshot_on_warm_up(
+    tmp_path, create_db_repo, example_snippet
+):
+    path = tmp_path / "tier.snap"
+    create_db_repo.add(example_snippet)
+    TieredSnippetRepository(create_db_repo, snapshot_path=path).warm_up()
+
+    loaded, version = InMemorySnippetRepository.load_snapshot(
+        path, create_db_repo.url, create_db_repo.identity()
+    )
+    assert [s.title for s in loaded.list()] == [example_snippet.title]
+    assert version == create_db_repo.latest_cursor()
+    assert loaded.changes() == []
+
+
+def test_tiered_repo_warms_up_from_snapshot(
+    tmp_path, create_db_repo, example_snippet, monkeypatch
+):
+    path = tmp_path / "tier.snap"
+    create_db_repo.add(example_snippet)
+    TieredSnippetRepository(create_db_repo, snapshot_path=path).warm_up()
+    # changes made while no tier was running
+    create_db_repo.add(Snippet(title="Hello SQL", code="", language=LangEnum.SQL))
+    create_db_repo.tag(example_snippet.id, Tag(name="greeting"))
+
+    monkeypatch.setattr(
+        create_db_repo, "list", lambda: pytest.fail("loaded from the database")
+    )
+    repo = TieredSnippetRepository(
+        create_db_repo, ConsistencyMode.EXCLUSIVE, snapshot_path=path
+    )
+    repo.warm_up()
+
+    assert [s.id for s in repo.search("hello")] == [1, 2]
+    assert [s.id for s in repo.search("", tag_name="greeting")] == [1]
+
+
+def test_tiered_repo_ignores_snapshot_ahead_of_database(
+    tmp_path, create_db_repo, example_snippet
+):
+    path = tmp_path / "tier.snap"
+    memory_repo = InMemorySnippetRepository()
+    memory_repo.add(Snippet(title="Gone", code="", language=LangEnum.SQL))
+    memory_repo.save_snapshot(path, create_db_repo.url, version=50)
+    create_db_repo.add(example_snippet)
+
+    repo = TieredSnippetRepository(create_db_repo, snapshot_path=path)
+    repo.warm_up()
+
+    assert [s.title for s in repo.list()] == [example_snippet.title]
+
+
+def test_tiered_repo_ignores_snapshot_of_replaced_database(
+    tmp_path, create_db_repo, example_snippet
+):
+    path = tmp_path / "tier.snap"
+    create_db_repo.add(Snippet(title="Gone", code="", language=LangEnum.SQL))
+    TieredSnippetRepository(create_db_repo, snapshot_path=path).warm_up()
+    # a new database at the same URL, already past the snapshot's cursor
+    engine = create_engine(create_db_repo.url)
+    SQLModel.metadata.create_all(engine)
+    db = DBSnippetRepository(engine)
+    db.add(example_snippet)
+    db.add(Snippet(title="Select all", code="SELECT *", language=LangEnum.SQL))
+    assert db.url == create_db_repo.url
+    assert db.latest_cursor() > create_db_repo.latest_cursor()
+
+    repo = TieredSnippetRepository(db, snapshot_path=path)
+    repo.warm_up()
+
+    assert [s.title for s in repo.list()] == [example_snippet.title, "Select all"]
@@ -0,0 +1,92 @@
+import random
+
+import pytest
+
+from src.snipster.spelling import BKTree, edit_distance
+
+
+@pytest.mark.parametrize(
+    "a, b, expected",
+    [
+        ("", "", 0),
+        ("sql", "", 3),
+        ("python", "python", 0),
+        ("pyhton", "python", 2),
+        ("pytohn", "python", 2),
+        ("postgre", "postgres", 1),
+        ("kitten", "sitting", 3),
+    ],
+)
+def test_edit_distance(a, b, expected):
+    assert edit_distance(a, b) == expected
+    assert edit_distance(b, a) == expected
+
+
+def test_edit_distance_limit():
+    assert edit_distance("kitten", "sitting", limit=3) == 3
+    assert edit_distance("kitten", "sitting", limit=1) == 2
+    assert edit_distance("sql", "postgres", limit=2) == 3
+
+
+@pytest.fixture()
+def tree() -> BKTree:
+    tree = BKTree()
+    for word in ["python", "pyspark", "postgres", "rust", "sql", "psql", "pytest"]:
+        tree.add(word)
+    return tree
+
+
+def test_search(tree):
+    assert tree.search("pyhton", 2) == [(2, "python")]
+    assert tree.search("sql", 1) == [(0, "sql"), (1, "psql")]
+    assert tree.search("pytest", 3) == [(0, "pytest"), (3, "python")]
+    assert tree.search("golang", 1) == []
+    assert BKTree().search("sql", 2) == []
+
+
+def test_add_is_idempotent(tree):
+    tree.add("rust")
+    assert len(tree) == 7
+    assert tree.search("rust", 0) == [(0, "rust")]
+
+
+def test_remove(tree):
+    tree.remove("sql")
+    tree.remove("missing")
+
+    assert "sql" not in tree
+    assert len(tree) == 6
+    assert tree.search("sql", 1) == [(1, "psql")]
+
+    tree.add("sql")
+    assert tree.search("sql", 1) == [(0, "sql"), (1, "psql")]
+
+
+def test_remove_most_words_rebuilds(tree):
+    for word in ["python", "pyspark", "postgres", "rust", "sql"]:
+        tree.remove(word)
+
+    assert len(tree) == 2
+    assert tree.search("pytest", 6) == [(0, "pytest"), (5, "psql")]
+
+
+def test_search_matches_brute_force():
+    rng = random.Random(7)
+    words = {
+        "".join(rng.choice("abcde") for _ in range(rng.randint(1, 7)))
+        for _ in range(300)
+    }
+    tree = BKTree()
+    for word in words:
+        tree.add(word)
+    for word in list(words)[::3]:
+        tree.remove(word)
+        words.discard(word)
+
+    for query in ["abc", "eeee", "dacba", "b"]:
+        expected = sorted(
+            (edit_distance(query, word), word)
+            for word in words
+            if edit_distance(query, word) <= 2
+        )
+        assert tree.search(query, 2) == expected
@@ -0,0 +1,46 @@
+import asyncio
+import json
+
+from src.snipster.models import LangEnum, Snippet
+from src.snipster.repo import InMemorySnippetRepository
+from src.snipster.sync import change_events
+
+
+def collect_events(repo, since, count, **kwargs) -> list[str]:
+    async def run():
+        events = []
+
+        async def is_disconnected():
+            return len(events) >= count
+
+        async for event in change_events(repo, since, is_disconnected, **kwargs):
+            events.append(event)
+        return events
+
+    return asyncio.run(run())
+
+
+def test_change_events():
+    repo = InMemorySnippetRepository()
+    for title in ("First", "Second"):
+        repo.add(Snippet(title=title, code="", language=LangEnum.PYTHON))
+    repo.delete(1)
+
+    events = collect_events(repo, since=0, count=2, poll_interval=0)
+
+    assert events[0].startswith("id: 2\nevent: change\ndata: ")
+    data = json.loads(events[0].split("data: ", 1)[1])
+    assert data["snippet"]["title"] == "Second"
+    assert events[1].startswith("id: 3\n")
+    assert json.loads(events[1].split("data: ", 1)[1])["operation"] == "delete"
+
+
+def test_change_events_resume_and_keep_alive():
+    repo = InMemorySnippetRepository()
+    repo.add(Snippet(title="First", code="", language=LangEnum.PYTHON))
+
+    events = collect_events(
+        repo, since=1, count=1, poll_interval=0.01, heartbeat_interval=0.01
+    )
+
+    assert events == [": keep-alive\n\n"]